@@ -0,0 +1,181 @@
+"""Harness de contenção de escrita no arquivo SQLite.
+
+Vários threads (ou processos) salvam as mesmas ordens "quentes" enquanto outros
+listam /api/orders, que também escreve quando algum status vence. Sem a
+política de transação isso aparece como 500 com "database is locked".
+
+Exemplos (a partir de ordens-marcenaria-backend/):
+    python -m benchmarks.contention --threads 8 --seconds 10
+    python -m benchmarks.contention --processes 4 --threads 4
+    python -m benchmarks.contention --threads 8 --retries 0 --no-immediate   # comportamento antigo
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+from benchmarks.run import admin_token, ensure_seeded, load_app, percentile
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Harness de contenção de escrita (SQLite)')
+    parser.add_argument('--threads', type=int, default=8, help='threads por processo')
+    parser.add_argument('--processes', type=int, default=1)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--orders', type=int, default=2000, help='tamanho do banco semeado')
+    parser.add_argument('--hot-orders', type=int, default=20, help='ordens disputadas pelas escritas')
+    parser.add_argument('--read-ratio', type=float, default=0.3, help='fração de GET /api/orders')
+    parser.add_argument('--retries', type=int, help='TRANSACTION_MAX_RETRIES (padrão da aplicação)')
+    parser.add_argument('--no-immediate', action='store_true', help='usa BEGIN comum (deferred)')
+    parser.add_argument('--busy-timeout-ms', type=int, help='SQLITE_BUSY_TIMEOUT_MS')
+    parser.add_argument('--db', help='arquivo SQLite (padrão: diretório temporário)')
+    return parser.parse_args(argv)
+
+
+def configure_environment(args):
+    if args.retries is not None:
+        os.environ['TRANSACTION_MAX_RETRIES'] = str(args.retries)
+    if args.no_immediate:
+        os.environ['TRANSACTION_IMMEDIATE'] = '0'
+    if args.busy_timeout_ms is not None:
+        os.environ['SQLITE_BUSY_TIMEOUT_MS'] = str(args.busy_timeout_ms)
+
+
+def worker_process(args, db_path, index, results):
+    """Um processo com N threads; devolve status, latências e estatísticas de transação"""
+    configure_environment(args)
+    app = load_app(db_path, reseed=False)
+    token = admin_token(app)
+    headers = {'Authorization': f'Bearer {token}'}
+    hot_ids = [f'ORD-{i:07d}' for i in range(1, args.hot_orders + 1)]
+    deadline = time.time() + args.seconds
+
+    statuses = Counter()
+    locked_500 = Counter()
+    busy_503 = Counter()
+    latencies = {'write': [], 'read': []}
+    lock = threading.Lock()
+
+    def run_thread(thread_index):
+        rng = random.Random(index * 1000 + thread_index)
+        client = app.test_client()
+        while time.time() < deadline:
+            start = time.perf_counter()
+            if rng.random() < args.read_ratio:
+                kind = 'read'
+                response = client.get('/api/orders', headers=headers)
+            else:
+                kind = 'write'
+                # Datas no passado/hoje forçam o GET /api/orders a escrever status também
+                exit_date = date.today() + timedelta(days=rng.randint(-2, 2))
+                response = client.put(f'/api/orders/{rng.choice(hot_ids)}', headers=headers, json={
+                    'description': f'Editada pela thread {index}.{thread_index}',
+                    'exitDate': exit_date.isoformat(),
+                    'materials': [{'description': 'MDF branco 15mm', 'quantity': rng.randint(1, 5)}],
+                })
+            elapsed = time.perf_counter() - start
+            body = response.get_data(as_text=True)
+            with lock:
+                statuses[(kind, response.status_code)] += 1
+                latencies[kind].append(elapsed)
+                if response.status_code == 500 and 'locked' in body:
+                    locked_500[kind] += 1
+                elif response.status_code == 503:
+                    busy_503[kind] += 1
+
+    threads = [threading.Thread(target=run_thread, args=(i,)) for i in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    policy = app.extensions.get('transaction_policy')
+    results.put({
+        'statuses': dict(statuses),
+        'locked_500': dict(locked_500),
+        'busy_503': dict(busy_503),
+        'latencies': latencies,
+        'transactions': policy.stats() if policy else {},
+    })
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    db_path = args.db or os.path.join(tempfile.gettempdir(), f'ordens-contention-{args.orders}.db')
+
+    # Semeia uma vez no processo principal, antes de disparar os workers
+    configure_environment(args)
+    app = load_app(db_path, reseed=True)
+    ensure_seeded(app, args.orders, 42)
+
+    print(f'🔒 {args.processes} processo(s) x {args.threads} threads por {args.seconds:.0f}s '
+          f'em {args.hot_orders} ordens quentes')
+
+    if args.processes == 1:
+        results = _ListQueue()
+        worker_process(args, db_path, 0, results)
+        outputs = results.items
+    else:
+        queue = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=worker_process, args=(args, db_path, i, queue))
+                     for i in range(args.processes)]
+        for process in processes:
+            process.start()
+        outputs = [queue.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+    statuses, locked_500, busy_503 = Counter(), Counter(), Counter()
+    latencies = {'write': [], 'read': []}
+    transactions = Counter()
+    for output in outputs:
+        statuses.update(output['statuses'])
+        locked_500.update(output['locked_500'])
+        busy_503.update(output['busy_503'])
+        for kind in latencies:
+            latencies[kind].extend(output['latencies'][kind])
+        transactions.update(output['transactions'])
+
+    print()
+    for kind in ('write', 'read'):
+        values = sorted(latencies[kind])
+        codes = {code: n for (k, code), n in sorted(statuses.items()) if k == kind}
+        print(f'{kind:>5}: {len(values)} req  status={codes}  500 locked={locked_500[kind]}  '
+              f'503 ocupado={busy_503[kind]}  '
+              f'p50={percentile(values, 50) * 1000:.1f}ms p95={percentile(values, 95) * 1000:.1f}ms '
+              f'p99={percentile(values, 99) * 1000:.1f}ms')
+
+    commits = transactions.get('commits', 0)
+    if commits:
+        print(f'commits={commits}  latência média de commit='
+              f'{transactions["commit_seconds_total"] / commits * 1000:.2f}ms  '
+              f'novas tentativas={transactions.get("retries", 0)}  '
+              f'esgotadas (503)={transactions.get("exhausted", 0)}')
+
+    failures = sum(locked_500.values()) + sum(busy_503.values())
+    if failures:
+        print(f'\n❌ {failures} requisições falharam por banco bloqueado/ocupado')
+        return 1
+    print('\n✅ Nenhuma requisição falhou por banco bloqueado')
+    return 0
+
+
+class _ListQueue:
+    """Substituto de multiprocessing.Queue quando tudo roda no mesmo processo"""
+
+    def __init__(self):
+        self.items = []
+
+    def put(self, item):
+        self.items.append(item)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""Latência de leitura com um escritor ocupado: journal DELETE x WAL x WAL + pools separados.
+
+Cada modo roda em um processo novo (a configuração do banco é lida no import da
+aplicação) sobre uma cópia do mesmo banco semeado. Em cada modo, threads leem
+GET /api/orders/<id> e GET /api/carpenters primeiro com o banco ocioso e depois
+enquanto um escritor segura transações longas (UPDATE em todas as ordens) e
+outra thread salva ordens pela API.
+
+Exemplos (a partir de ordens-marcenaria-backend/):
+    python -m benchmarks.read_routing --orders 20000 --seconds 5
+    python -m benchmarks.read_routing --modes wal routed --hold-ms 500
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+from benchmarks.run import admin_token, ensure_seeded, load_app, percentile
+
+# Modo -> (SQLITE_JOURNAL_MODE, DB_READ_ROUTING)
+MODES = {
+    'delete': ('DELETE', '0'),
+    'wal': ('WAL', '0'),
+    'routed': ('WAL', '1'),
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Leituras com escritor ocupado (roteamento leitura/escrita)')
+    parser.add_argument('--orders', type=int, default=20000, help='tamanho do banco semeado')
+    parser.add_argument('--readers', type=int, default=4, help='threads de leitura')
+    parser.add_argument('--seconds', type=float, default=5, help='duração de cada fase (ocioso e ocupado)')
+    parser.add_argument('--hold-ms', type=int, default=300, help='tempo que o escritor segura cada transação')
+    parser.add_argument('--modes', nargs='+', choices=sorted(MODES), default=['delete', 'wal', 'routed'])
+    parser.add_argument('--db', help='banco semeado de origem (padrão: diretório temporário)')
+    return parser.parse_args(argv)
+
+
+def seed_database(db_path, order_count):
+    app = load_app(db_path, reseed=False)
+    ensure_seeded(app, order_count, 42)
+    # Status por data já atualizados: as leituras medidas não escrevem
+    app.test_client().get('/api/orders', headers={'Authorization': f'Bearer {admin_token(app)}'})
+
+
+def slow_writer(db_path, hold_ms, stop):
+    """Transações longas fora da aplicação, como um arquivamento ou atribuição em lote"""
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    transactions = 0
+    while not stop.is_set():
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute('UPDATE "order" SET updated_at = ?', (time.strftime('%Y-%m-%d %H:%M:%S'),))
+        time.sleep(hold_ms / 1000)
+        conn.execute('COMMIT')
+        transactions += 1
+        time.sleep(0.01)
+    conn.close()
+    return transactions
+
+
+def run_mode(mode, db_path, args, results):
+    journal_mode, routing = MODES[mode]
+    os.environ['SQLITE_JOURNAL_MODE'] = journal_mode
+    os.environ['DB_READ_ROUTING'] = routing
+    app = load_app(db_path, reseed=False)
+    headers = {'Authorization': f'Bearer {admin_token(app)}'}
+    order_ids = [f'ORD-{i:07d}' for i in range(1, args.orders + 1)]
+
+    def read_phase(label):
+        latencies, errors = [], 0
+        lock = threading.Lock()
+        deadline = time.time() + args.seconds
+
+        def reader(index):
+            nonlocal errors
+            rng = random.Random(index)
+            client = app.test_client()
+            while time.time() < deadline:
+                url = '/api/carpenters' if rng.random() < 0.2 else f'/api/orders/{rng.choice(order_ids)}'
+                start = time.perf_counter()
+                response = client.get(url, headers=headers)
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies.append(elapsed)
+                    errors += response.status_code >= 500
+
+        threads = [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return label, sorted(latencies), errors
+
+    phases = [read_phase('ocioso')]
+
+    stop = threading.Event()
+    writes = {'slow': 0, 'api': 0}
+
+    def run_slow_writer():
+        writes['slow'] = slow_writer(db_path, args.hold_ms, stop)
+
+    def api_writer():
+        client = app.test_client()
+        rng = random.Random(7)
+        while not stop.is_set():
+            exit_date = date.today() + timedelta(days=rng.randint(5, 60))
+            response = client.put(f'/api/orders/{rng.choice(order_ids[:50])}', headers=headers, json={
+                'description': 'Editada durante o benchmark', 'exitDate': exit_date.isoformat()})
+            writes['api'] += response.status_code == 200
+
+    writers = [threading.Thread(target=run_slow_writer), threading.Thread(target=api_writer)]
+    for thread in writers:
+        thread.start()
+    phases.append(read_phase('escritor ocupado'))
+    stop.set()
+    for thread in writers:
+        thread.join()
+
+    results.put((mode, phases, writes))
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    source = args.db or os.path.join(tempfile.gettempdir(), f'ordens-read-routing-{args.orders}.db')
+    workdir = tempfile.mkdtemp(prefix='ordens-read-routing-')
+    # spawn: cada modo importa a aplicação do zero com a própria configuração
+    context = multiprocessing.get_context('spawn')
+
+    seeder = context.Process(target=seed_database, args=(source, args.orders))
+    seeder.start()
+    seeder.join()
+
+    print(f'📖 {args.readers} leitores, {args.seconds:.0f}s por fase, escritor segurando {args.hold_ms}ms por transação\n')
+    try:
+        for mode in args.modes:
+            db_path = os.path.join(workdir, f'{mode}.db')
+            shutil.copyfile(source, db_path)
+            queue = context.Queue()
+            process = context.Process(target=run_mode, args=(mode, db_path, args, queue))
+            process.start()
+            _, phases, writes = queue.get()
+            process.join()
+
+            print(f'{mode} (escritas: {writes["slow"]} lentas, {writes["api"]} pela API)')
+            for label, values, errors in phases:
+                print(f'  {label:>16}: {len(values):6d} leituras  5xx={errors:<4d} '
+                      f'p50={percentile(values, 50) * 1000:7.1f}ms p95={percentile(values, 95) * 1000:7.1f}ms '
+                      f'p99={percentile(values, 99) * 1000:7.1f}ms máx={values[-1] * 1000 if values else 0:7.1f}ms')
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,338 @@
+"""Benchmark reproduzível do backend.
+
+Exemplos (a partir de ordens-marcenaria-backend/):
+    python -m benchmarks.run --scale small --mix polling --requests 500
+    python -m benchmarks.run --scale medium --mix mixed --threads 4 --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run --scale medium --mix mixed --threads 4 --baseline benchmarks/baseline.json
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from json import dumps as json_dumps, loads as json_loads
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def peak_rss_mb():
+    """Pico de RSS do processo inteiro desde o início (não é atribuível a um endpoint)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB, macOS em bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+class Recorder:
+    """Latências, status e (com --memory) pico de alocação por label de endpoint.
+
+    O pico de alocação vem do tracemalloc, zerado antes de cada requisição: mede
+    quanto a própria requisição alocou acima do que já estava em uso. Só é exato
+    com uma requisição por vez (--threads 1) e deixa as latências mais altas.
+    """
+
+    def __init__(self, trace_memory=False):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.peak_alloc = {}
+        self.trace_memory = trace_memory
+        self.lock = threading.Lock()
+
+    def start(self):
+        """Chamado antes da requisição; devolve a memória em uso para o record()"""
+        if not self.trace_memory:
+            return None
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        return current
+
+    def record(self, label, elapsed, status, memory_before=None):
+        peak = None
+        if memory_before is not None:
+            peak = (tracemalloc.get_traced_memory()[1] - memory_before) / (1024 * 1024)
+        with self.lock:
+            self.latencies[label].append(elapsed)
+            self.statuses[label][status] += 1
+            if status >= 500:
+                self.errors[label] += 1
+            if peak is not None:
+                self.peak_alloc[label] = max(self.peak_alloc.get(label, 0), peak)
+
+
+class FlaskTestClient:
+    """Chama os blueprints reais pelo test client do Flask (sem rede)"""
+
+    def __init__(self, app, token, recorder):
+        self.client = app.test_client()
+        self.headers = {'Authorization': f'Bearer {token}'}
+        self.recorder = recorder
+
+    def request(self, label, method, url, json=None):
+        memory_before = self.recorder.start()
+        start = time.perf_counter()
+        response = self.client.open(url, method=method, json=json, headers=self.headers)
+        self.recorder.record(label, time.perf_counter() - start, response.status_code, memory_before)
+        return response.get_json(silent=True)
+
+
+class LocalHTTPClient:
+    """Chama o servidor HTTP local (werkzeug), incluindo o custo de rede/serialização"""
+
+    def __init__(self, port, token, recorder):
+        self.port = port
+        self.headers = {'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'}
+        self.recorder = recorder
+
+    def request(self, label, method, url, json=None):
+        body = None if json is None else json_dumps(json)
+        # O servidor roda neste processo: o tracemalloc vê as alocações dele também
+        memory_before = self.recorder.start()
+        start = time.perf_counter()
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=300)
+        try:
+            conn.request(method, url, body=body, headers=self.headers)
+            response = conn.getresponse()
+            data = response.read()
+            status = response.status
+        finally:
+            conn.close()
+        self.recorder.record(label, time.perf_counter() - start, status, memory_before)
+        try:
+            return json_loads(data)
+        except ValueError:
+            return None
+
+
+def parse_args(argv=None):
+    from benchmarks.scenarios import MIXES
+    from benchmarks.seed import SCALES
+
+    parser = argparse.ArgumentParser(description='Benchmark do backend de ordens de marcenaria')
+    parser.add_argument('--scale', default='small',
+                        help=f'{"/".join(SCALES)} ou um número de ordens (padrão: small)')
+    parser.add_argument('--mix', default='mixed', choices=sorted(MIXES))
+    parser.add_argument('--requests', type=int, default=300, help='total de operações')
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--mode', default='client', choices=['client', 'http'])
+    parser.add_argument('--db', help='arquivo SQLite do benchmark (padrão: diretório temporário)')
+    parser.add_argument('--reseed', action='store_true', help='recria o banco antes de rodar')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--baseline', help='compara com um baseline salvo e falha em regressão')
+    parser.add_argument('--save-baseline', help='salva o resultado como baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='piora relativa aceita em p95 e throughput (padrão: 0.25)')
+    parser.add_argument('--memory', action='store_true',
+                        help='pico de alocação por endpoint (tracemalloc; exige --threads 1, mais lento)')
+    parser.add_argument('--json', help='grava o resultado completo em JSON')
+    return parser.parse_args(argv)
+
+
+def resolve_scale(scale):
+    from benchmarks.seed import SCALES
+    return SCALES[scale] if scale in SCALES else int(scale)
+
+
+def load_app(db_path, reseed):
+    """Importa a aplicação apontando para o banco do benchmark (antes do import de src.main)"""
+    if reseed and os.path.exists(db_path):
+        os.remove(db_path)
+    os.environ['DATABASE_PATH'] = db_path
+    os.environ.setdefault('RATE_LIMIT_ENABLED', '0')
+    sys.path.insert(0, BACKEND_DIR)
+    from src.main import app
+    return app
+
+
+def ensure_seeded(app, order_count, seed_value):
+    from src.models.user import db, Carpenter, Delivery, Order
+    from benchmarks.seed import seed
+
+    with app.app_context():
+        existing = db.session.query(Order).count()
+        if existing == 0:
+            print(f'🌱 Gerando {order_count} ordens...')
+            start = time.perf_counter()
+            seed(order_count, seed_value=seed_value)
+            print(f'✅ Banco semeado em {time.perf_counter() - start:.1f}s')
+        elif existing != order_count:
+            print(f'⚠️  O banco já tem {existing} ordens (use --reseed para recriar com {order_count})')
+
+        return {
+            'order_count': db.session.query(Order).count(),
+            'delivery_count': db.session.query(Delivery).count(),
+            'carpenters': [c.name for c in Carpenter.query.filter_by(is_active=True).all()],
+        }
+
+
+def admin_token(app):
+    client = app.test_client()
+    response = client.post('/api/auth/login', json={'username': 'admin', 'password': 'admin_password'})
+    if response.status_code != 200:
+        raise SystemExit(f'❌ Login do admin falhou: {response.status_code} {response.get_data(as_text=True)}')
+    return response.get_json()['token']
+
+
+def run_load(make_client, mix, total_requests, threads, seed_value, dataset):
+    from benchmarks.scenarios import BenchmarkState
+
+    operations = [op for op, _ in mix]
+    weights = [weight for _, weight in mix]
+    per_thread = [total_requests // threads + (1 if i < total_requests % threads else 0)
+                  for i in range(threads)]
+
+    def worker(index):
+        rng = random.Random(seed_value + index)
+        state = BenchmarkState(dataset['order_count'], dataset['delivery_count'], dataset['carpenters'])
+        client = make_client()
+        for _ in range(per_thread[index]):
+            rng.choices(operations, weights)[0](client, rng, state)
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def summarize(recorder, elapsed):
+    endpoints = {}
+    for label, values in sorted(recorder.latencies.items()):
+        values = sorted(values)
+        endpoints[label] = {
+            'count': len(values),
+            'errors': recorder.errors[label],
+            'p50_ms': percentile(values, 50) * 1000,
+            'p95_ms': percentile(values, 95) * 1000,
+            'p99_ms': percentile(values, 99) * 1000,
+            'throughput_rps': len(values) / elapsed if elapsed else 0.0,
+            'peak_alloc_mb': recorder.peak_alloc.get(label),
+            'statuses': dict(recorder.statuses[label]),
+        }
+    total = sum(e['count'] for e in endpoints.values())
+    return {
+        'elapsed_s': elapsed,
+        'total_requests': total,
+        'throughput_rps': total / elapsed if elapsed else 0.0,
+        'peak_rss_mb': peak_rss_mb(),
+        'endpoints': endpoints,
+    }
+
+
+def print_report(result):
+    print()
+    header = f'{"endpoint":<42} {"n":>6} {"err":>4} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"req/s":>8} {"pico MB":>8}'
+    print(header)
+    print('-' * len(header))
+    for label, e in result['endpoints'].items():
+        alloc = f'{e["peak_alloc_mb"]:.1f}' if e.get('peak_alloc_mb') is not None else '-'
+        print(f'{label:<42} {e["count"]:>6} {e["errors"]:>4} {e["p50_ms"]:>9.2f} {e["p95_ms"]:>9.2f} '
+              f'{e["p99_ms"]:>9.2f} {e["throughput_rps"]:>8.1f} {alloc:>8}')
+    print('-' * len(header))
+    rss = f', pico de RSS do processo {result["peak_rss_mb"]:.0f} MB' if result['peak_rss_mb'] is not None else ''
+    print(f'Total: {result["total_requests"]} requisições em {result["elapsed_s"]:.2f}s '
+          f'({result["throughput_rps"]:.1f} req/s){rss}')
+
+
+def compare_with_baseline(result, baseline, tolerance):
+    """Lista de regressões (p95 ou throughput piores que o baseline além da tolerância)"""
+    regressions = []
+    if baseline.get('config') != result.get('config'):
+        print(f'⚠️  Configuração diferente do baseline: {baseline.get("config")} != {result.get("config")}')
+    for label, base in baseline.get('endpoints', {}).items():
+        current = result['endpoints'].get(label)
+        if current is None:
+            continue
+        if current['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append(f'{label}: p95 {current["p95_ms"]:.2f} ms > baseline {base["p95_ms"]:.2f} ms')
+        if current['throughput_rps'] < base['throughput_rps'] * (1 - tolerance):
+            regressions.append(f'{label}: throughput {current["throughput_rps"]:.1f} req/s < '
+                               f'baseline {base["throughput_rps"]:.1f} req/s')
+        if current['errors'] > base.get('errors', 0):
+            regressions.append(f'{label}: {current["errors"]} erros 5xx (baseline {base.get("errors", 0)})')
+    return regressions
+
+
+def main(argv=None):
+    from benchmarks.scenarios import MIXES
+
+    args = parse_args(argv)
+    if args.memory and args.threads != 1:
+        raise SystemExit('❌ --memory mede uma requisição por vez: use --threads 1')
+    order_count = resolve_scale(args.scale)
+    db_path = args.db or os.path.join(tempfile.gettempdir(), f'ordens-bench-{order_count}.db')
+
+    app = load_app(db_path, args.reseed)
+    dataset = ensure_seeded(app, order_count, args.seed)
+    token = admin_token(app)
+    recorder = Recorder(trace_memory=args.memory)
+    if args.memory:
+        tracemalloc.start()
+
+    server = None
+    if args.mode == 'http':
+        from werkzeug.serving import make_server
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        make_client = lambda: LocalHTTPClient(server.server_port, token, recorder)
+    else:
+        make_client = lambda: FlaskTestClient(app, token, recorder)
+
+    print(f'🏁 mix={args.mix} requisições={args.requests} threads={args.threads} modo={args.mode}')
+    try:
+        elapsed = run_load(make_client, MIXES[args.mix], args.requests, args.threads, args.seed, dataset)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    result = summarize(recorder, elapsed)
+    result['config'] = {'orders': dataset['order_count'], 'mix': args.mix,
+                        'threads': args.threads, 'mode': args.mode}
+    print_report(result)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f'💾 Baseline salvo em {args.save_baseline}')
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(result, baseline, args.tolerance)
+        if regressions:
+            print('\n❌ REGRESSÃO DE PERFORMANCE:')
+            for line in regressions:
+                print(f'   - {line}')
+            return 1
+        print('\n✅ Sem regressões em relação ao baseline')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""Misturas de requisições usadas pelo benchmark (polling, edição de ordens, churn de materiais)"""
+
+from benchmarks.seed import MATERIALS, STATUSES, delivery_id, order_id
+
+
+class BenchmarkState:
+    """Dados conhecidos do banco semeado, compartilhados pelas operações de uma thread"""
+
+    def __init__(self, order_count, delivery_count, carpenters):
+        self.order_count = order_count
+        self.delivery_count = delivery_count
+        self.carpenters = carpenters
+        self.created_materials = []
+
+    def random_order(self, rng):
+        return order_id(rng.randint(1, self.order_count))
+
+    def random_delivery(self, rng):
+        return delivery_id(rng.randint(1, max(1, self.delivery_count)))
+
+
+# Cada operação recebe (client, rng, state) e faz uma ou mais requisições
+# via client.request(label, method, url, json=None); o label agrupa o relatório.
+
+def list_orders(client, rng, state):
+    client.request('GET /api/orders', 'GET', '/api/orders')
+
+
+def list_deliveries(client, rng, state):
+    client.request('GET /api/deliveries', 'GET', '/api/deliveries')
+
+
+def list_carpenters(client, rng, state):
+    client.request('GET /api/carpenters', 'GET', '/api/carpenters')
+
+
+def carpenter_names(client, rng, state):
+    client.request('GET /api/carpenters/names', 'GET', '/api/carpenters/names')
+
+
+def backend_url(client, rng, state):
+    client.request('GET /api/system/config/backend-url', 'GET', '/api/system/config/backend-url')
+
+
+def get_order(client, rng, state):
+    client.request('GET /api/orders/<id>', 'GET', f'/api/orders/{state.random_order(rng)}')
+
+
+def get_delivery(client, rng, state):
+    client.request('GET /api/deliveries/<id>', 'GET', f'/api/deliveries/{state.random_delivery(rng)}')
+
+
+def edit_order(client, rng, state):
+    payload = {'status': rng.choice(STATUSES)}
+    if rng.random() < 0.5:
+        payload['carpenter'] = rng.choice(state.carpenters)
+    if rng.random() < 0.3:
+        payload['description'] = f'Ordem editada no benchmark {rng.randint(1, 10**6)}'
+    client.request('PUT /api/orders/<id>', 'PUT', f'/api/orders/{state.random_order(rng)}', json=payload)
+
+
+def add_material(client, rng, state):
+    oid = state.random_order(rng)
+    body = client.request('POST /api/orders/<id>/materials', 'POST', f'/api/orders/{oid}/materials',
+                          json={'description': rng.choice(MATERIALS), 'quantity': rng.randint(1, 10)})
+    if body and 'material' in body:
+        state.created_materials.append((oid, body['material']['id']))
+
+
+def update_material(client, rng, state):
+    if not state.created_materials:
+        return add_material(client, rng, state)
+    oid, material_id = rng.choice(state.created_materials)
+    client.request('PUT /api/orders/<id>/materials/<id>', 'PUT',
+                   f'/api/orders/{oid}/materials/{material_id}', json={'quantity': rng.randint(1, 10)})
+
+
+def delete_material(client, rng, state):
+    if not state.created_materials:
+        return add_material(client, rng, state)
+    oid, material_id = state.created_materials.pop(rng.randrange(len(state.created_materials)))
+    client.request('DELETE /api/orders/<id>/materials/<id>', 'DELETE',
+                   f'/api/orders/{oid}/materials/{material_id}')
+
+
+MIXES = {
+    # Abas abertas recarregando a cada 30 s: quase só leituras de listas completas
+    'polling': [
+        (list_orders, 3), (list_deliveries, 2), (list_carpenters, 2),
+        (carpenter_names, 1), (backend_url, 2),
+    ],
+    # Marceneiros abrindo e salvando ordens
+    'edits': [
+        (get_order, 3), (edit_order, 3), (get_delivery, 1), (list_carpenters, 1),
+    ],
+    # Inclusão, ajuste e remoção de materiais
+    'materials': [
+        (add_material, 4), (update_material, 3), (delete_material, 3), (get_order, 2),
+    ],
+}
+MIXES['mixed'] = MIXES['polling'] + MIXES['edits'] + MIXES['materials']
@@ -0,0 +1,132 @@
+"""Gerador de dados sintéticos da marcenaria para benchmarks"""
+
+import random
+from datetime import date, datetime, timedelta
+
+from src.models.user import db, Carpenter, Delivery, Material, Order
+from src.utils.material_catalog import link_uncataloged_materials
+
+SCALES = {
+    'small': 1_000,
+    'medium': 100_000,
+    'large': 1_000_000,
+}
+
+BATCH_SIZE = 10_000
+
+STATUSES = ['recebida', 'emProcesso', 'concluida', 'atrasada', 'paraHoje']
+STATUS_WEIGHTS = [15, 20, 55, 7, 3]
+DELIVERY_STATUSES = ['pendente', 'entregue', 'cancelada']
+
+FURNITURE = ['Armário', 'Guarda-roupa', 'Mesa', 'Estante', 'Cozinha planejada', 'Painel de TV',
+             'Cama box', 'Escrivaninha', 'Balcão', 'Rack', 'Prateleira', 'Porta']
+ROOMS = ['sala', 'cozinha', 'quarto', 'escritório', 'banheiro', 'lavanderia', 'varanda']
+MATERIALS = ['MDF branco 15mm', 'MDF branco 18mm', 'MDF carvalho 18mm', 'Compensado 10mm',
+             'Dobradiça 35mm', 'Corrediça telescópica 45cm', 'Puxador alumínio 128mm',
+             'Fita de borda branca', 'Parafuso 4x40', 'Cola branca', 'Verniz fosco',
+             'Pé regulável', 'Vidro 6mm', 'Espelho 4mm', 'Trilho porta de correr']
+STREETS = ['Rua das Flores', 'Av. Brasil', 'Rua XV de Novembro', 'Rua São João',
+           'Av. Paulista', 'Rua do Comércio', 'Rua Sete de Setembro']
+FIRST_NAMES = ['João', 'Maria', 'Pedro', 'Ana', 'Carlos', 'Paulo', 'Lucas', 'Marcos', 'José', 'Rafael']
+LAST_NAMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Lima', 'Pereira', 'Costa', 'Ferreira']
+
+
+def order_id(index):
+    return f'ORD-{index:07d}'
+
+
+def delivery_id(index):
+    return f'ENT-{index:07d}'
+
+
+def carpenter_names(count):
+    names = []
+    for index in range(count):
+        first = FIRST_NAMES[index % len(FIRST_NAMES)]
+        last = LAST_NAMES[(index // len(FIRST_NAMES)) % len(LAST_NAMES)]
+        suffix = index // (len(FIRST_NAMES) * len(LAST_NAMES))
+        names.append(f'{first} {last}' + (f' {suffix + 1}' if suffix else ''))
+    return names
+
+
+def _insert(model, rows):
+    if rows:
+        db.session.execute(model.__table__.insert(), rows)
+
+
+def seed(order_count, seed_value=42, delivery_ratio=0.3, max_materials=5, log=print):
+    """Popula o banco com order_count ordens, seus materiais, marceneiros e entregas.
+
+    Deve ser chamado dentro de um app context com o banco vazio. As ordens se
+    espalham pelos últimos ~3 anos (mais as próximas semanas) e os IDs seguem
+    order_id()/delivery_id(), para que os cenários possam sorteá-los.
+    """
+    rng = random.Random(seed_value)
+    today = date.today()
+    now = datetime.utcnow()
+
+    names = carpenter_names(max(5, order_count // 2000))
+    _insert(Carpenter, [{'name': name, 'is_active': True, 'created_at': now} for name in names])
+
+    orders, materials, deliveries = [], [], []
+    delivery_count = 0
+    for index in range(1, order_count + 1):
+        entry_date = today - timedelta(days=rng.randint(0, 3 * 365))
+        exit_date = entry_date + timedelta(days=rng.randint(3, 60))
+        status = rng.choices(STATUSES, STATUS_WEIGHTS)[0]
+        oid = order_id(index)
+        completed_at = None
+        if status == 'concluida':
+            # Conclusão espalhada em torno da data de saída, para os relatórios terem atrasos
+            completed_on = min(exit_date + timedelta(days=rng.randint(-5, 15)), today)
+            completed_at = datetime.combine(max(completed_on, entry_date), datetime.min.time()) + timedelta(hours=rng.randint(8, 18))
+        orders.append({
+            'id': oid,
+            'description': f'{rng.choice(FURNITURE)} para {rng.choice(ROOMS)}',
+            'entry_date': entry_date,
+            'exit_date': exit_date,
+            'carpenter': rng.choice(names) if rng.random() > 0.05 else None,
+            'status': status,
+            'created_at': now,
+            'updated_at': now,
+            'completed_at': completed_at,
+        })
+        for _ in range(rng.randint(0, max_materials)):
+            materials.append({
+                'description': rng.choice(MATERIALS),
+                'quantity': rng.randint(1, 20),
+                'order_id': oid,
+            })
+        if rng.random() < delivery_ratio:
+            delivery_count += 1
+            deliveries.append({
+                'id': delivery_id(delivery_count),
+                'order_id': oid,
+                'delivery_date': exit_date + timedelta(days=rng.randint(0, 7)),
+                'delivery_status': rng.choice(DELIVERY_STATUSES),
+                'delivery_address': f'{rng.choice(STREETS)}, {rng.randint(1, 3000)}',
+                'notes': None,
+                'created_at': now,
+                'updated_at': now,
+            })
+
+        if len(orders) >= BATCH_SIZE:
+            _flush_batch(orders, materials, deliveries)
+            log(f'  {index}/{order_count} ordens...')
+
+    _flush_batch(orders, materials, deliveries)
+    # Inserções em massa não passam pelo before_flush do catálogo
+    link_uncataloged_materials(db.session.connection())
+    db.session.commit()
+    return {'orders': order_count, 'deliveries': delivery_count, 'carpenters': len(names)}
+
+
+def _flush_batch(orders, materials, deliveries):
+    # Ordens primeiro por causa das chaves estrangeiras de materiais e entregas
+    _insert(Order, orders)
+    _insert(Material, materials)
+    _insert(Delivery, deliveries)
+    db.session.commit()
+    orders.clear()
+    materials.clear()
+    deliveries.clear()
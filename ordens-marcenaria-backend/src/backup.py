@@ -0,0 +1,108 @@
+import os
+import sys
+import argparse
+# Mesmo ajuste de path do main.py, para rodar como "python src/backup.py"
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from src.main import app
+from src.models.user import db
+from src.utils.backup import create_backup, list_backups, restore_backup, verify_database
+from src.utils.tenancy import DEFAULT_TENANT, tenant_registry
+
+
+def database_path(tenant):
+    if tenant == DEFAULT_TENANT:
+        return db.engine.url.database
+    if not tenant_registry.exists(tenant):
+        sys.exit(f'Oficina não encontrada: {tenant}')
+    return tenant_registry.database_path(tenant)
+
+
+def cmd_create(args):
+    """Cópia online agora, mesmo com o servidor rodando"""
+    tenants = tenant_registry.known_tenants() if args.all else [args.tenant]
+    for tenant in tenants:
+        result = create_backup(database_path(tenant), args.dest, tenant,
+                               pages=app.config['BACKUP_PAGES_PER_STEP'],
+                               sleep=app.config['BACKUP_STEP_SLEEP_MS'] / 1000,
+                               keep=None if args.no_prune else app.config['BACKUP_KEEP'])
+        wait = result['writeLockWait']
+        print(f"✅ {tenant}: {result['file']}")
+        print(f"   {result['databaseBytes'] / 1024 / 1024:.1f} MB -> {result['archiveBytes'] / 1024 / 1024:.1f} MB, "
+              f"cópia {result['copySeconds']}s em {result['steps']} passos ({result['restarts']} recomeços"
+              f"{', terminada em um passo' if result['singleStep'] else ''}), total {result['totalSeconds']}s")
+        if wait['samples']:
+            print(f"   espera pelo lock de escrita durante a cópia: p50={wait['p50Ms']}ms "
+                  f"p99={wait['p99Ms']}ms máx={wait['maxMs']}ms ({wait['samples']} amostras)")
+        for name in result['removed']:
+            print(f'   🗑️  removida pela retenção: {name}')
+
+
+def cmd_list(args):
+    for backup in list_backups(args.dest, None if args.all else args.tenant):
+        print(f"{backup['createdAt']}  {backup['bytes'] / 1024 / 1024:8.1f} MB  {backup['file']}")
+
+
+def cmd_verify(args):
+    """Descompacta em um arquivo temporário e roda integrity_check"""
+    import gzip
+    import shutil
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as workdir:
+        temp_path = os.path.join(workdir, 'verify.db')
+        with gzip.open(args.file, 'rb') as packed, open(temp_path, 'wb') as raw:
+            shutil.copyfileobj(packed, raw, 1024 * 1024)
+        problems = verify_database(temp_path)
+    if problems:
+        sys.exit('❌ ' + '\n❌ '.join(problems[:20]))
+    print(f'✅ {args.file}: íntegra')
+
+
+def cmd_restore(args):
+    """Substitui o banco pela cópia (verificada antes); pare o servidor e o worker antes"""
+    target = database_path(args.tenant)
+    if not args.yes:
+        answer = input(f'Restaurar {args.file} sobre {target}? O servidor deve estar parado. [s/N] ')
+        if answer.strip().lower() not in ('s', 'sim', 'y', 'yes'):
+            sys.exit('Cancelado')
+    # Nenhuma conexão da aplicação pode ficar aberta sobre o arquivo durante a troca
+    db.engine.dispose()
+    safety_path = restore_backup(args.file, target)
+    print(f'✅ {target} restaurado de {args.file}')
+    if safety_path:
+        print(f'   banco anterior guardado em {safety_path}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backups online do banco SQLite')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def add_command(name, func, help_text):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument('--tenant', default=DEFAULT_TENANT, help='oficina (padrão: banco principal)')
+        command.add_argument('--dest', default=app.config['BACKUP_DIR'], help='diretório das cópias')
+        command.set_defaults(func=func)
+        return command
+
+    create = add_command('create', cmd_create, 'Gera uma cópia agora')
+    create.add_argument('--all', action='store_true', help='todas as oficinas')
+    create.add_argument('--no-prune', action='store_true', help='não aplica BACKUP_KEEP')
+
+    listing = add_command('list', cmd_list, 'Lista as cópias')
+    listing.add_argument('--all', action='store_true', help='cópias de todas as oficinas')
+
+    verify = add_command('verify', cmd_verify, 'Verifica uma cópia sem restaurar')
+    verify.add_argument('file')
+
+    restore = add_command('restore', cmd_restore, 'Restaura uma cópia (com o servidor parado)')
+    restore.add_argument('file')
+    restore.add_argument('--yes', action='store_true', help='não pede confirmação')
+
+    args = parser.parse_args()
+    with app.app_context():
+        args.func(args)
+
+
+if __name__ == '__main__':
+    main()
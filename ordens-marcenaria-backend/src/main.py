@@ -3,7 +3,7 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory, jsonify, request
+from flask import Flask, Response, send_from_directory, jsonify, request
 from flask_cors import CORS
 from src.models.user import db, User, Carpenter
 from src.routes.user import user_bp
@@ -13,24 +13,198 @@ from src.routes.carpenters import carpenters_bp
 from src.routes.deliveries import deliveries_bp
 from src.models.user import db, User, Carpenter, SystemConfig
 from src.routes.system_config import system_config_bp
+from src.routes.archive import archive_bp
+from src.routes.jobs import jobs_bp
+from src.routes.analytics import analytics_bp
+from src.routes.materials import materials_bp
+from src.routes.scheduling import scheduling_bp
+from src.routes.backups import backups_bp
+from src.routes.digest import digest_bp
+from src.routes.profiles import profiles_bp
+from src.routes.autocomplete import autocomplete_bp
+from src.utils.cache import reference_cache
+from src.utils.response_cache import response_cache
+from src.utils.autocomplete import autocomplete_index
+from src.utils.coalescing import request_coalescer
+from src.utils.rate_limit import rate_limiter
+from src.utils.admission import admission_controller
+from src.utils.metrics import request_metrics
+from src.utils.sql_profiler import sql_profiler
+from src.utils.request_profiler import request_profiler
+from src.utils.transactions import transaction_policy, configure_sqlite_engine
+from src.utils.tenancy import tenant_registry
+from src.utils.db_routing import db_router
+from src.utils.schema import upgrade_schema
+from src.utils.material_catalog import register_catalog_events
+from src.utils.static_assets import static_assets
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'a1b9f7c3e8d2a6b0f4c5d9e1a7b8f3c2d6e0a9b4f8c1d5e7'
 
 # Configuração do banco de dados - SQLite Local
-database_path = os.path.join(os.path.dirname(__file__), 'database', 'ordens_marcenaria.db')
+# DATABASE_PATH permite apontar para outro arquivo (benchmarks, testes de carga)
+database_path = os.environ.get('DATABASE_PATH') or os.path.join(os.path.dirname(__file__), 'database', 'ordens_marcenaria.db')
 os.makedirs(os.path.dirname(database_path), exist_ok=True)
 app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{database_path}"
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
+# Várias oficinas na mesma instalação: um arquivo SQLite por oficina em TENANTS_DIR, escolhido
+# pelo token, pelo cabeçalho X-Tenant-ID ou pelo subdomínio (<oficina>.TENANT_BASE_DOMAIN)
+app.config["TENANCY_ENABLED"] = os.environ.get('TENANCY_ENABLED', '0') == '1'
+app.config["TENANTS_DIR"] = os.environ.get('TENANTS_DIR') or os.path.join(os.path.dirname(database_path), 'tenants')
+app.config["TENANT_BASE_DOMAIN"] = os.environ.get('TENANT_BASE_DOMAIN')
+app.config["TENANT_MAX_ENGINES"] = int(os.environ.get('TENANT_MAX_ENGINES', 32))
+app.config["TENANT_POOL_SIZE"] = int(os.environ.get('TENANT_POOL_SIZE', 5))
+
+# Versões do cache de tabelas de referência (compartilhadas entre processos)
+app.config["REFERENCE_CACHE_DIR"] = os.path.join(os.path.dirname(database_path), 'cache_versions')
+
+# Cache das respostas GET de leitura (lista/detalhe de ordens, entregas, marceneiros), invalidado
+# por escrita nas tabelas de cada rota. Com mais de um worker, RESPONSE_CACHE_STORAGE=sqlite:///caminho
+app.config["RESPONSE_CACHE_ENABLED"] = os.environ.get('RESPONSE_CACHE_ENABLED', '1') == '1'
+app.config["RESPONSE_CACHE_STORAGE"] = os.environ.get('RESPONSE_CACHE_STORAGE', 'memory')
+app.config["RESPONSE_CACHE_MAX_ENTRIES"] = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 512))
+app.config["RESPONSE_CACHE_MAX_BYTES"] = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+# Leituras GET idênticas e simultâneas (abas com o polling sincronizado, reinício do servidor)
+# viram uma execução só; as demais esperam até COALESCE_WAIT_SECONDS pela resposta dela
+app.config["COALESCE_ENABLED"] = os.environ.get('COALESCE_ENABLED', '1') == '1'
+app.config["COALESCE_WAIT_SECONDS"] = float(os.environ.get('COALESCE_WAIT_SECONDS', 30))
+
+# Rate limiting das rotas públicas/caras (ver DEFAULT_RATE_LIMITS em src/utils/rate_limit.py).
+# Com mais de um worker, use RATE_LIMIT_STORAGE=sqlite:///caminho/rate_limits.db
+app.config["RATE_LIMIT_ENABLED"] = os.environ.get('RATE_LIMIT_ENABLED', '1') == '1'
+app.config["RATE_LIMIT_STORAGE"] = os.environ.get('RATE_LIMIT_STORAGE', 'memory')
+# Proxies confiáveis na frente do servidor (o ngrok é 1; o start_server.py já define). Com 0 o
+# X-Forwarded-For é ignorado: o cliente pode escrever o que quiser nele
+app.config["RATE_LIMIT_PROXY_HOPS"] = int(os.environ.get('RATE_LIMIT_PROXY_HOPS', 0))
+
+# Controle de admissão: execuções simultâneas e fila por classe de rota (auth, write, read;
+# ver DEFAULT_ADMISSION_LIMITS em src/utils/admission.py). Na sobrecarga responde 503 + Retry-After
+# em vez de deixar todas as requisições lentas
+app.config["ADMISSION_ENABLED"] = os.environ.get('ADMISSION_ENABLED', '1') == '1'
+app.config["ADMISSION_MAX_CONCURRENT"] = int(os.environ.get('ADMISSION_MAX_CONCURRENT', 8))
+
+# Token opcional para o Prometheus ler /api/metrics através do túnel público
+app.config["METRICS_TOKEN"] = os.environ.get('METRICS_TOKEN')
+
+# Profiling de SQL (query lenta + EXPLAIN QUERY PLAN, detecção de N+1); desligado por padrão
+app.config["SQL_PROFILING"] = os.environ.get('SQL_PROFILING', '0') == '1'
+app.config["SQL_SLOW_QUERY_MS"] = int(os.environ.get('SQL_SLOW_QUERY_MS', 100))
+app.config["SQL_N_PLUS_ONE_THRESHOLD"] = int(os.environ.get('SQL_N_PLUS_ONE_THRESHOLD', 5))
+
+# Profiling de requisições (cProfile + linha do tempo de SQL, auth e serialização); desligado por padrão.
+# Ligado, perfila as requisições com X-Profile: 1 (token de administrador) e uma amostra de
+# REQUEST_PROFILE_SAMPLE_PERCENT % das demais; lista e download em /api/admin/profiles
+app.config["REQUEST_PROFILING"] = os.environ.get('REQUEST_PROFILING', '0') == '1'
+app.config["REQUEST_PROFILE_SAMPLE_PERCENT"] = float(os.environ.get('REQUEST_PROFILE_SAMPLE_PERCENT', 0))
+app.config["REQUEST_PROFILE_DIR"] = os.environ.get('REQUEST_PROFILE_DIR') or os.path.join(os.path.dirname(database_path), 'profiles')
+app.config["REQUEST_PROFILE_KEEP"] = int(os.environ.get('REQUEST_PROFILE_KEEP', 200))
+app.config["REQUEST_PROFILE_MAX_MB"] = int(os.environ.get('REQUEST_PROFILE_MAX_MB', 100))
+
+# Escritas concorrentes no mesmo arquivo SQLite: BEGIN IMMEDIATE + novas tentativas com jitter
+app.config["SQLITE_BUSY_TIMEOUT_MS"] = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 1000))
+app.config["TRANSACTION_MAX_RETRIES"] = int(os.environ.get('TRANSACTION_MAX_RETRIES', 5))
+app.config["TRANSACTION_IMMEDIATE"] = os.environ.get('TRANSACTION_IMMEDIATE', '1') == '1'
+
+# WAL: leitores não esperam o escritor. Com DB_READ_ROUTING, GET/HEAD leem por um pool
+# somente leitura e as escritas passam por um pool pequeno (padrão 1 conexão por processo)
+app.config["SQLITE_JOURNAL_MODE"] = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+app.config["DB_READ_ROUTING"] = os.environ.get('DB_READ_ROUTING', '1') == '1'
+app.config["DB_READ_POOL_SIZE"] = int(os.environ.get('DB_READ_POOL_SIZE', 4))
+app.config["DB_WRITE_POOL_SIZE"] = int(os.environ.get('DB_WRITE_POOL_SIZE', 1))
+app.config["DB_POOL_TIMEOUT"] = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+if app.config["DB_READ_ROUTING"]:
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        'pool_size': app.config["DB_WRITE_POOL_SIZE"],
+        'max_overflow': 0,
+        'pool_timeout': app.config["DB_POOL_TIMEOUT"],
+    }
+
+# Arquivamento: ordens concluídas há mais de N dias saem das tabelas ativas
+app.config["ARCHIVE_AFTER_DAYS"] = int(os.environ.get('ARCHIVE_AFTER_DAYS', 180))
+app.config["ARCHIVE_BATCH_SIZE"] = int(os.environ.get('ARCHIVE_BATCH_SIZE', 500))
+
+# Relatórios de produção: período padrão (dias) e validade do cache (segundos)
+app.config["ANALYTICS_DEFAULT_DAYS"] = int(os.environ.get('ANALYTICS_DEFAULT_DAYS', 90))
+app.config["ANALYTICS_CACHE_SECONDS"] = int(os.environ.get('ANALYTICS_CACHE_SECONDS', 300))
+app.config["ANALYTICS_CLOSED_PERIOD_TTL"] = int(os.environ.get('ANALYTICS_CLOSED_PERIOD_TTL', 86400))
+
+# Sugestão de atribuição: dias de trabalho estimados por ordem na fila de cada marceneiro
+app.config["SCHEDULING_DAYS_PER_ORDER"] = float(os.environ.get('SCHEDULING_DAYS_PER_ORDER', 2))
+
+# Idempotency-Key: quanto tempo a primeira resposta fica guardada e quanto uma requisição
+# em andamento segura a chave antes de ser considerada abandonada (segundos)
+app.config["IDEMPOTENCY_TTL_SECONDS"] = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', 86400))
+app.config["IDEMPOTENCY_LOCK_SECONDS"] = int(os.environ.get('IDEMPOTENCY_LOCK_SECONDS', 60))
+
+# Backups online (API de backup do SQLite em passos de N páginas, com pausa entre eles),
+# compactados em BACKUP_DIR; BACKUP_KEEP cópias por banco
+app.config["BACKUP_DIR"] = os.environ.get('BACKUP_DIR') or os.path.join(os.path.dirname(database_path), 'backups')
+app.config["BACKUP_KEEP"] = int(os.environ.get('BACKUP_KEEP', 14))
+app.config["BACKUP_PAGES_PER_STEP"] = int(os.environ.get('BACKUP_PAGES_PER_STEP', 256))
+app.config["BACKUP_STEP_SLEEP_MS"] = int(os.environ.get('BACKUP_STEP_SLEEP_MS', 50))
+
+# Frontend compilado (dist): diretório servido em "/" e max-age dos arquivos sem hash no nome.
+# As variantes .gz/.br saem do build (python -m src.utils.static_assets <dist>); com
+# STATIC_PRECOMPRESS=1 as que faltam são geradas na inicialização, dentro do STATIC_DIR
+app.config["STATIC_DIR"] = os.environ.get('STATIC_DIR')
+app.config["STATIC_MAX_AGE"] = int(os.environ.get('STATIC_MAX_AGE', 3600))
+app.config["STATIC_PRECOMPRESS"] = os.environ.get('STATIC_PRECOMPRESS', '0') == '1'
+
+# Jobs em segundo plano (processo src/worker.py): threads, intervalo de polling e tarefas periódicas (segundos)
+app.config["JOB_WORKERS"] = int(os.environ.get('JOB_WORKERS', 2))
+app.config["JOB_POLL_SECONDS"] = float(os.environ.get('JOB_POLL_SECONDS', 2))
+app.config["JOB_SCHEDULE"] = {
+    'refresh_order_statuses': 3600,
+    'archive_orders': 86400,
+    'sweep_idempotency_keys': 3600,
+    'backup_database': int(os.environ.get('BACKUP_INTERVAL_SECONDS', 86400)),
+}
+
 # Inicializar SQLAlchemy com a aplicação Flask
 db.init_app(app)
+# Antes do rate limiter e das métricas: o before_request da oficina precisa rodar primeiro
+tenant_registry.init_app(app)
+reference_cache.init_app(app)
+# Resumos por período dependem de ordens e entregas: qualquer commit nelas invalida
+reference_cache.invalidate_on_write('digest', 'order', 'delivery')
+response_cache.init_app(app)
+# Sugestões de materiais e endereços: atualizadas a cada commit, remontadas quando a versão muda
+autocomplete_index.init_app(app)
+request_coalescer.init_app(app)
+rate_limiter.init_app(app)
+request_metrics.init_app(app)
+# Depois do rate limiter (recusa barata, sem ocupar vaga) e das métricas (a espera na fila entra na latência)
+admission_controller.init_app(app)
+# Depois da admissão: o profile mede a execução, não a espera na fila
+request_profiler.init_app(app)
+request_metrics.register_collector(request_profiler.collect_metrics)
+request_metrics.register_collector(admission_controller.collect_metrics)
+request_metrics.register_collector(rate_limiter.collect_metrics)
+request_metrics.register_collector(response_cache.collect_metrics)
+request_metrics.register_collector(request_coalescer.collect_metrics)
+request_metrics.register_collector(autocomplete_index.collect_metrics)
+sql_profiler.init_app(app)
+transaction_policy.init_app(app)
+db_router.init_app(app)
+register_catalog_events()
+static_assets.init_app(app)
+request_metrics.register_collector(transaction_policy.collect_metrics)
+request_metrics.register_collector(db_router.collect_metrics)
+# Cada banco de oficina recebe os mesmos PRAGMAs e é migrado na primeira abertura
+tenant_registry.add_engine_setup(lambda engine: configure_sqlite_engine(
+    engine, app.config["SQLITE_BUSY_TIMEOUT_MS"], journal_mode=app.config["SQLITE_JOURNAL_MODE"]))
+tenant_registry.add_engine_setup(upgrade_schema)
+request_metrics.register_collector(tenant_registry.collect_metrics)
 
 # CORS CORRIGIDO - Configuração mais específica para o Vercel
 CORS(app, 
      resources={r"/api/*": {"origins": ["*"]}},
-     allow_headers=["Content-Type", "Authorization", "ngrok-skip-browser-warning", "Accept", "X-Requested-With"],
-     methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+     allow_headers=["Content-Type", "Authorization", "ngrok-skip-browser-warning", "Accept", "X-Requested-With",
+                    "If-Match", "If-None-Match", "Idempotency-Key", "X-Tenant-ID", "X-Request-Deadline", "X-Profile"],
+     expose_headers=["ETag", "Location", "Idempotent-Replayed", "Retry-After", "Date", "X-Profile-Id"],
+     methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
      supports_credentials=True)
 
 # Registrar blueprints
@@ -40,6 +214,15 @@ app.register_blueprint(orders_bp, url_prefix='/api')
 app.register_blueprint(carpenters_bp, url_prefix='/api')
 app.register_blueprint(deliveries_bp, url_prefix='/api')
 app.register_blueprint(system_config_bp, url_prefix="/api")
+app.register_blueprint(archive_bp, url_prefix='/api')
+app.register_blueprint(jobs_bp, url_prefix='/api')
+app.register_blueprint(analytics_bp, url_prefix='/api')
+app.register_blueprint(materials_bp, url_prefix='/api')
+app.register_blueprint(scheduling_bp, url_prefix='/api')
+app.register_blueprint(backups_bp, url_prefix='/api')
+app.register_blueprint(digest_bp, url_prefix='/api')
+app.register_blueprint(profiles_bp, url_prefix='/api')
+app.register_blueprint(autocomplete_bp, url_prefix='/api')
 
 def create_default_admin():
     """Cria usuário admin padrão se não existir"""
@@ -86,17 +269,20 @@ with app.app_context():
         
         if not db_exists:
             print("Banco de dados não existe. Criando novo banco...")
-            db.create_all()
+            upgrade_schema()
             create_default_admin()
             create_sample_data()
         else:
             print("Banco de dados existente encontrado. Verificando estrutura...")
-            # Apenas criar tabelas que não existem
-            db.create_all()
+            # Apenas criar tabelas e índices que não existem
+            upgrade_schema()
             # Verificar se admin existe
             admin = User.query.filter_by(username="admin").first()
             if not admin:
                 create_default_admin()
+
+        # Índice de sugestões pronto antes da primeira requisição
+        autocomplete_index.warm()
             
         print("Banco de dados SQLite inicializado com sucesso!")
         print(f"Banco de dados localizado em: {database_path}")
@@ -107,8 +293,8 @@ with app.app_context():
 @app.after_request
 def after_request(response):
     response.headers.add('Access-Control-Allow-Origin', '*')
-    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,ngrok-skip-browser-warning,Accept,X-Requested-With')
-    response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
+    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,ngrok-skip-browser-warning,Accept,X-Requested-With,If-Match,If-None-Match,Idempotency-Key,X-Tenant-ID,X-Request-Deadline')
+    response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,PATCH,POST,DELETE,OPTIONS')
     response.headers.add('Access-Control-Allow-Credentials', 'true')
     return response
 
@@ -120,6 +306,28 @@ def health_check():
         'cors_enabled': True
     }), 200
 
+def metrics_access_allowed():
+    """Métricas: acesso local direto, METRICS_TOKEN ou token de administrador"""
+    if request.remote_addr in ('127.0.0.1', '::1') and 'X-Forwarded-For' not in request.headers:
+        return True
+
+    auth_header = request.headers.get('Authorization', '')
+    if not auth_header.startswith('Bearer '):
+        return False
+    token = auth_header[len('Bearer '):]
+
+    metrics_token = app.config.get('METRICS_TOKEN')
+    if metrics_token and token == metrics_token:
+        return True
+    payload = User.verify_token(token, app.config['SECRET_KEY'])
+    return bool(payload and payload.get('role') == 'administrador')
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    if not metrics_access_allowed():
+        return jsonify({'message': 'Acesso negado às métricas'}), 403
+    return Response(request_metrics.render(), mimetype='text/plain; version=0.0.4')
+
 # Rota específica para testar CORS
 @app.route('/api/test-cors', methods=['GET', 'POST', 'OPTIONS'])
 def test_cors():
@@ -134,20 +342,19 @@ def test_cors():
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-        return jsonify({'message': 'API do Sistema de Ordens de Marcenaria'}), 200
-
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
-            return jsonify({'message': 'API do Sistema de Ordens de Marcenaria'}), 200
+    # Manifesto montado na inicialização: sem os.path.exists por requisição (src/utils/static_assets.py)
+    return static_assets.response(path)
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port, debug=True)
+    if os.environ.get('SERVER_FD'):
+        # Iniciado pelo start_server.py: socket compartilhado entre o processo atual e o
+        # novo durante o reload, sem o reloader/debugger do modo debug
+        from src.utils.serving import serve_supervised
+        ready_fd = os.environ.get('SERVER_READY_FD')
+        serve_supervised(app, int(os.environ['SERVER_FD']), port=port,
+                         ready_fd=int(ready_fd) if ready_fd else None,
+                         drain_seconds=int(os.environ.get('SERVER_DRAIN_SECONDS', 30)))
+    else:
+        app.run(host='0.0.0.0', port=port, debug=True)
 
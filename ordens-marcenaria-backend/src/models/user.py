@@ -1,10 +1,18 @@
+import json
+import unicodedata
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import validates
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 import jwt
 from datetime import datetime, timedelta
+from src.utils.cache import reference_cache
+from src.utils.tenancy import current_tenant
+from src.utils.db_routing import RoutingSession
 
-db = SQLAlchemy()
+# A sessão escolhe o banco da oficina atual (src/utils/tenancy.py) e, em GET/HEAD,
+# o pool somente leitura (src/utils/db_routing.py)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 # Adicione esta classe no início do arquivo
 class SystemConfig(db.Model):
@@ -34,9 +42,13 @@ class SystemConfig(db.Model):
 
     @staticmethod
     def get_config(key, default_value=None):
-        """Busca uma configuração pelo key"""
-        config = SystemConfig.query.filter_by(key=key).first()
-        return config.value if config else default_value
+        """Busca uma configuração pelo key (via cache de referência)"""
+        def load():
+            config = SystemConfig.query.filter_by(key=key).first()
+            return config.value if config else None
+
+        value = reference_cache.get('system_config', key, load)
+        return value if value is not None else default_value
 
     @staticmethod
     def set_config(key, value, description=None, user_id=None):
@@ -57,8 +69,21 @@ class SystemConfig(db.Model):
             db.session.add(config)
         
         db.session.commit()
+        reference_cache.invalidate('system_config')
         return config
 
+    @staticmethod
+    def delete_config(key):
+        """Remove uma configuração; retorna False se ela não existir"""
+        config = SystemConfig.query.filter_by(key=key).first()
+        if not config:
+            return False
+
+        db.session.delete(config)
+        db.session.commit()
+        reference_cache.invalidate('system_config')
+        return True
+
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
@@ -84,6 +109,9 @@ class User(db.Model):
             'role': self.role,
             'exp': datetime.utcnow() + timedelta(hours=24)
         }
+        # Com várias oficinas, o token só vale na oficina em que o login foi feito
+        if current_tenant() is not None:
+            payload['tenant'] = current_tenant()
         return jwt.encode(payload, secret_key, algorithm='HS256')
 
     @staticmethod
@@ -115,13 +143,36 @@ class Order(db.Model):
     status = db.Column(db.String(20), nullable=False, default='recebida')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    completed_at = db.Column(db.DateTime)
     created_by = db.Column(db.Integer, db.ForeignKey('user.id'))
+    # Controle de concorrência otimista: todo UPDATE do ORM confere e incrementa
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
 
     materials = db.relationship('Material', backref='order', lazy=True, cascade='all, delete-orphan')
 
+    __mapper_args__ = {'version_id_col': version}
+
+    __table_args__ = (
+        db.Index('ix_order_status_updated_at', 'status', 'updated_at'),
+        # Lotes do arquivamento e relatórios de produção por período de conclusão
+        db.Index('ix_order_status_completed_at', 'status', 'completed_at'),
+        # Resumos por período (hoje/amanhã/semana) e atrasadas
+        db.Index('ix_order_exit_date', 'exit_date'),
+    )
+
     def __repr__(self):
         return f' <Order {self.id}>'
 
+    @validates('status')
+    def validate_status(self, key, status):
+        """Registra quando a ordem foi concluída (e limpa se ela for reaberta)"""
+        if status == 'concluida':
+            if self.status != 'concluida' or self.completed_at is None:
+                self.completed_at = datetime.utcnow()
+        else:
+            self.completed_at = None
+        return status
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -132,14 +183,55 @@ class Order(db.Model):
             'status': self.status,
             'materials': [material.to_dict() for material in self.materials],
             'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None,
+            'version': self.version
+        }
+
+    def to_summary_dict(self):
+        """Resumo compacto da ordem (sem materiais) para embutir em outras listagens"""
+        return {
+            'id': self.id,
+            'description': self.description,
+            'exitDate': self.exit_date.isoformat() if self.exit_date else None,
+            'carpenter': self.carpenter,
+            'status': self.status
+        }
+
+class MaterialCatalog(db.Model):
+    __tablename__ = 'material_catalog'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(255), nullable=False)
+    normalized_name = db.Column(db.String(255), nullable=False, unique=True, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f' <MaterialCatalog {self.name}>'
+
+    @staticmethod
+    def normalize(description):
+        """Chave de deduplicação: sem acentos, minúsculas e espaços simples ("MDF  Branco" == "mdf branco")"""
+        text = unicodedata.normalize('NFKD', description or '')
+        text = ''.join(char for char in text if not unicodedata.combining(char))
+        return ' '.join(text.lower().split())
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'normalizedName': self.normalized_name
         }
 
 class Material(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     description = db.Column(db.String(255), nullable=False)
     quantity = db.Column(db.Integer, nullable=False, default=1)
-    order_id = db.Column(db.String(50), db.ForeignKey('order.id'), nullable=False)
+    order_id = db.Column(db.String(50), db.ForeignKey('order.id'), nullable=False, index=True)
+    # Preenchido automaticamente no flush (src/utils/material_catalog.py)
+    catalog_id = db.Column(db.Integer, db.ForeignKey('material_catalog.id'), index=True)
+
+    catalog = db.relationship('MaterialCatalog', lazy=True)
 
     def __repr__(self):
         return f' <Material {self.description}>'
@@ -148,7 +240,8 @@ class Material(db.Model):
         return {
             'id': self.id,
             'description': self.description,
-            'quantity': self.quantity
+            'quantity': self.quantity,
+            'catalogId': self.catalog_id
         }
 
 class Carpenter(db.Model):
@@ -170,20 +263,129 @@ class Carpenter(db.Model):
 
 class Delivery(db.Model):
     id = db.Column(db.String(50), primary_key=True)
-    order_id = db.Column(db.String(50), db.ForeignKey("order.id"), nullable=True)
+    order_id = db.Column(db.String(50), db.ForeignKey("order.id"), nullable=True, index=True)
     order = db.relationship("Order", backref="deliveries", lazy=True)
-    delivery_date = db.Column(db.Date, nullable=False)
+    delivery_date = db.Column(db.Date, nullable=False, index=True)
     delivery_status = db.Column(db.String(50), nullable=False, default='pendente')
     delivery_address = db.Column(db.Text, nullable=False)
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+
+    __mapper_args__ = {'version_id_col': version}
 
     def __repr__(self):
         return f' <Delivery {self.id}>'
 
+    def to_dict(self, include_order=False):
+        data = {
+            'id': self.id,
+            'order_id': self.order_id,
+            'deliveryDate': self.delivery_date.isoformat() if self.delivery_date else None,
+            'deliveryStatus': self.delivery_status,
+            'deliveryAddress': self.delivery_address,
+            'notes': self.notes,
+            'createdAt': self.created_at.isoformat() if self.created_at else None,
+            'updatedAt': self.updated_at.isoformat() if self.updated_at else None,
+            'version': self.version
+        }
+        if include_order:
+            data['order'] = self.order.to_summary_dict() if self.order else None
+        return data
+
+
+
+# Tabelas de arquivo: ordens concluídas antigas saem das tabelas "quentes" (ver src/utils/archive.py)
+class ArchivedOrder(db.Model):
+    __tablename__ = 'archived_order'
+
+    id = db.Column(db.String(50), primary_key=True)
+    description = db.Column(db.Text, nullable=False)
+    entry_date = db.Column(db.Date, nullable=False)
+    exit_date = db.Column(db.Date, nullable=False)
+    carpenter = db.Column(db.String(100))
+    status = db.Column(db.String(20), nullable=False)
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    completed_at = db.Column(db.DateTime)
+    created_by = db.Column(db.Integer)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    materials = db.relationship('ArchivedMaterial', backref='order', lazy=True, cascade='all, delete-orphan')
+
+    __table_args__ = (
+        db.Index('ix_archived_order_status_completed_at', 'status', 'completed_at'),
+    )
+
+    def __repr__(self):
+        return f' <ArchivedOrder {self.id}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'description': self.description,
+            'entryDate': self.entry_date.isoformat() if self.entry_date else None,
+            'exitDate': self.exit_date.isoformat() if self.exit_date else None,
+            'carpenter': self.carpenter,
+            'status': self.status,
+            'materials': [material.to_dict() for material in self.materials],
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None,
+            'archived': True,
+            'archivedAt': self.archived_at.isoformat() if self.archived_at else None
+        }
+
+    def to_summary_dict(self):
+        return {
+            'id': self.id,
+            'description': self.description,
+            'exitDate': self.exit_date.isoformat() if self.exit_date else None,
+            'carpenter': self.carpenter,
+            'status': self.status
+        }
+
+class ArchivedMaterial(db.Model):
+    __tablename__ = 'archived_material'
+
+    id = db.Column(db.Integer, primary_key=True)
+    description = db.Column(db.String(255), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False, default=1)
+    order_id = db.Column(db.String(50), db.ForeignKey('archived_order.id'), nullable=False, index=True)
+    catalog_id = db.Column(db.Integer)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f' <ArchivedMaterial {self.description}>'
+
     def to_dict(self):
         return {
+            'id': self.id,
+            'description': self.description,
+            'quantity': self.quantity,
+            'catalogId': self.catalog_id
+        }
+
+class ArchivedDelivery(db.Model):
+    __tablename__ = 'archived_delivery'
+
+    id = db.Column(db.String(50), primary_key=True)
+    order_id = db.Column(db.String(50), db.ForeignKey('archived_order.id'), nullable=True, index=True)
+    order = db.relationship('ArchivedOrder', backref='deliveries', lazy=True)
+    delivery_date = db.Column(db.Date, nullable=False)
+    delivery_status = db.Column(db.String(50), nullable=False)
+    delivery_address = db.Column(db.Text, nullable=False)
+    notes = db.Column(db.Text)
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f' <ArchivedDelivery {self.id}>'
+
+    def to_dict(self, include_order=False):
+        data = {
             'id': self.id,
             'order_id': self.order_id,
             'deliveryDate': self.delivery_date.isoformat() if self.delivery_date else None,
@@ -191,7 +393,75 @@ class Delivery(db.Model):
             'deliveryAddress': self.delivery_address,
             'notes': self.notes,
             'createdAt': self.created_at.isoformat() if self.created_at else None,
-            'updatedAt': self.updated_at.isoformat() if self.updated_at else None
+            'updatedAt': self.updated_at.isoformat() if self.updated_at else None,
+            'archived': True,
+            'archivedAt': self.archived_at.isoformat() if self.archived_at else None
         }
+        if include_order:
+            data['order'] = self.order.to_summary_dict() if self.order else None
+        return data
 
+class Job(db.Model):
+    """Tarefa em segundo plano executada pelo worker (src/worker.py)"""
+    __tablename__ = 'job'
+
+    id = db.Column(db.String(32), primary_key=True)
+    type = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pendente')  # pendente, executando, concluido, falhou
+    payload = db.Column(db.Text)
+    result = db.Column(db.Text)
+    error = db.Column(db.Text)
+    progress = db.Column(db.Float, nullable=False, default=0.0)
+    progress_message = db.Column(db.String(255))
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String(100))
+    locked_at = db.Column(db.DateTime)
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
 
+    __table_args__ = (
+        db.Index('ix_job_status_run_after', 'status', 'run_after'),
+        db.Index('ix_job_type_created_at', 'type', 'created_at'),
+    )
+
+    def __repr__(self):
+        return f' <Job {self.type} {self.id}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'type': self.type,
+            'status': self.status,
+            'payload': json.loads(self.payload) if self.payload else None,
+            'result': json.loads(self.result) if self.result else None,
+            'error': self.error,
+            'progress': self.progress,
+            'progressMessage': self.progress_message,
+            'attempts': self.attempts,
+            'maxAttempts': self.max_attempts,
+            'runAfter': self.run_after.isoformat() if self.run_after else None,
+            'createdAt': self.created_at.isoformat() if self.created_at else None,
+            'startedAt': self.started_at.isoformat() if self.started_at else None,
+            'finishedAt': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class IdempotencyRecord(db.Model):
+    """Primeira resposta de um POST com Idempotency-Key, por usuário, até expirar (src/utils/idempotency.py)"""
+    __tablename__ = 'idempotency_record'
+
+    user_id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(255), primary_key=True)
+    request_hash = db.Column(db.String(64), nullable=False)
+    # None enquanto a primeira requisição ainda está em andamento
+    status_code = db.Column(db.Integer)
+    response_body = db.Column(db.Text)
+    response_headers = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f' <IdempotencyRecord {self.user_id}:{self.key}>'
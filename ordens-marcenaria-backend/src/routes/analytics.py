@@ -0,0 +1,105 @@
+from datetime import date
+from flask import Blueprint, request, jsonify, current_app
+from src.routes.auth import token_required
+from src.utils.cache import reference_cache
+from src.utils.coalescing import coalesced, shared_key
+from src.utils.analytics import (GROUP_BY_OPTIONS, parse_period, lead_times, on_time_rate,
+                                 weekly_throughput, backlog_age)
+
+analytics_bp = Blueprint('analytics', __name__)
+
+def analytics_params():
+    """Período, marceneiro e agrupamento comuns a todos os relatórios"""
+    start, end = parse_period(request.args, current_app.config['ANALYTICS_DEFAULT_DAYS'])
+    group_by = request.args.get('groupBy', 'carpenter')
+    if group_by not in GROUP_BY_OPTIONS:
+        raise ValueError(f"groupBy deve ser um de: {', '.join(GROUP_BY_OPTIONS)}")
+    return start, end, request.args.get('carpenter') or None, group_by
+
+def cached_report(name, params, loader, closed=False):
+    """Resultado em cache por relatório e período; períodos já encerrados ficam mais tempo"""
+    ttl = current_app.config['ANALYTICS_CLOSED_PERIOD_TTL' if closed else 'ANALYTICS_CACHE_SECONDS']
+    return reference_cache.get('analytics', (name,) + params, loader, ttl=ttl)
+
+def period_response(name, start, end, carpenter, group_by, data):
+    return jsonify({
+        'report': name,
+        'period': {'from': start.isoformat(), 'to': end.isoformat()},
+        'carpenter': carpenter,
+        'groupBy': group_by,
+        'data': data
+    }), 200
+
+@analytics_bp.route('/analytics/lead-times', methods=['GET'])
+@token_required
+@coalesced(key=shared_key)
+def get_lead_times(current_user):
+    """Lead time (entrada → conclusão) das ordens concluídas no período"""
+    try:
+        start, end, carpenter, group_by = analytics_params()
+        data = cached_report('lead-times', (start, end, carpenter, group_by),
+                             lambda: lead_times(start, end, carpenter, group_by),
+                             closed=end < date.today())
+        return period_response('lead-times', start, end, carpenter, group_by, data)
+    except ValueError as e:
+        return jsonify({'message': f'Parâmetros inválidos: {str(e)}'}), 400
+    except Exception as e:
+        return jsonify({'message': f'Erro interno: {str(e)}'}), 500
+
+@analytics_bp.route('/analytics/on-time', methods=['GET'])
+@token_required
+@coalesced(key=shared_key)
+def get_on_time(current_user):
+    """Taxa de entrega no prazo (conclusão até a data de saída)"""
+    try:
+        start, end, carpenter, group_by = analytics_params()
+        data = cached_report('on-time', (start, end, carpenter, group_by),
+                             lambda: on_time_rate(start, end, carpenter, group_by),
+                             closed=end < date.today())
+        return period_response('on-time', start, end, carpenter, group_by, data)
+    except ValueError as e:
+        return jsonify({'message': f'Parâmetros inválidos: {str(e)}'}), 400
+    except Exception as e:
+        return jsonify({'message': f'Erro interno: {str(e)}'}), 500
+
+@analytics_bp.route('/analytics/throughput', methods=['GET'])
+@token_required
+@coalesced(key=shared_key)
+def get_throughput(current_user):
+    """Ordens concluídas por semana, no total e por marceneiro"""
+    try:
+        start, end, carpenter, _ = analytics_params()
+        data = cached_report('throughput', (start, end, carpenter),
+                             lambda: weekly_throughput(start, end, carpenter),
+                             closed=end < date.today())
+        return period_response('throughput', start, end, carpenter, 'week', data)
+    except ValueError as e:
+        return jsonify({'message': f'Parâmetros inválidos: {str(e)}'}), 400
+    except Exception as e:
+        return jsonify({'message': f'Erro interno: {str(e)}'}), 500
+
+@analytics_bp.route('/analytics/backlog', methods=['GET'])
+@token_required
+@coalesced(key=shared_key)
+def get_backlog(current_user):
+    """Idade das ordens em aberto hoje (groupBy=carpenter ou none)"""
+    try:
+        group_by = request.args.get('groupBy', 'carpenter')
+        if group_by not in ('carpenter', 'none'):
+            raise ValueError('groupBy deve ser carpenter ou none')
+        carpenter = request.args.get('carpenter') or None
+        today = date.today()
+        
+        data = cached_report('backlog', (today, carpenter, group_by),
+                             lambda: backlog_age(carpenter, group_by, as_of=today))
+        return jsonify({
+            'report': 'backlog',
+            'asOf': today.isoformat(),
+            'carpenter': carpenter,
+            'groupBy': group_by,
+            'data': data
+        }), 200
+    except ValueError as e:
+        return jsonify({'message': f'Parâmetros inválidos: {str(e)}'}), 400
+    except Exception as e:
+        return jsonify({'message': f'Erro interno: {str(e)}'}), 500
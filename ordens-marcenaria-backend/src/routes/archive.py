@@ -0,0 +1,49 @@
+from flask import Blueprint, request, jsonify, current_app
+from sqlalchemy.exc import OperationalError
+from src.models.user import db, Order, ArchivedOrder, ArchivedDelivery
+from src.routes.auth import token_required, admin_required
+from src.utils.archive import archive_completed_orders, archive_parameters
+
+archive_bp = Blueprint('archive', __name__)
+
+@archive_bp.route('/archive/run', methods=['POST'])
+@token_required
+@admin_required
+def run_archive(current_user):
+    """Arquiva agora as ordens concluídas mais antigas que o limite configurado"""
+    try:
+        data = request.get_json(silent=True) or {}
+        try:
+            older_than_days, batch_size = archive_parameters(data)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        
+        totals = archive_completed_orders(older_than_days, batch_size=batch_size)
+        
+        return jsonify({
+            'message': 'Arquivamento concluído',
+            'archived': totals
+        }), 200
+        
+    except OperationalError as e:
+        db.session.rollback()
+        response = jsonify({'message': f'Banco de dados ocupado, lotes já arquivados foram mantidos: {str(e)}'})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'Erro interno: {str(e)}'}), 500
+
+@archive_bp.route('/archive/stats', methods=['GET'])
+@token_required
+def get_archive_stats(current_user):
+    """Tamanho do conjunto ativo e do arquivo"""
+    try:
+        return jsonify({
+            'active_orders': db.session.query(Order.id).count(),
+            'archived_orders': db.session.query(ArchivedOrder.id).count(),
+            'archived_deliveries': db.session.query(ArchivedDelivery.id).count(),
+            'archive_after_days': current_app.config['ARCHIVE_AFTER_DAYS']
+        }), 200
+    except Exception as e:
+        return jsonify({'message': f'Erro interno: {str(e)}'}), 500
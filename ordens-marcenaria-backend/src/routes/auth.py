@@ -1,6 +1,10 @@
 from flask import Blueprint, request, jsonify, current_app
 from src.models.user import db, User
 from functools import wraps
+from sqlalchemy.exc import OperationalError
+from src.utils.transactions import transactional
+from src.utils.request_profiler import profile_phase
+from src.utils.tenancy import DEFAULT_TENANT, current_tenant, tenant_registry, token_payload_tenant
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -20,14 +24,21 @@ def token_required(f):
             return jsonify({'message': 'Token é obrigatório'}), 401
         
         try:
-            data = User.verify_token(token, current_app.config['SECRET_KEY'])
-            if data is None:
-                return jsonify({'message': 'Token inválido ou expirado'}), 401
-            
-            current_user = User.query.get(data['user_id'])
+            with profile_phase('auth'):
+                data = User.verify_token(token, current_app.config['SECRET_KEY'])
+                if data is None:
+                    return jsonify({'message': 'Token inválido ou expirado'}), 401
+                # Ids de usuário se repetem entre oficinas: o token só vale na oficina em que foi emitido
+                if tenant_registry.enabled and token_payload_tenant(data) != (current_tenant() or DEFAULT_TENANT):
+                    return jsonify({'message': 'Token pertence a outra oficina'}), 403
+
+                current_user = User.query.get(data['user_id'])
             if not current_user or not current_user.is_active:
                 return jsonify({'message': 'Usuário não encontrado ou inativo'}), 401
                 
+        except OperationalError:
+            # Banco ocupado não invalida o token; o @transactional tenta de novo
+            raise
         except Exception as e:
             return jsonify({'message': 'Token inválido'}), 401
         
@@ -52,6 +63,7 @@ def admin_or_carpenter_required(f):
     return decorated
 
 @auth_bp.route('/register', methods=['POST'])
+@transactional()
 def register():
     try:
         data = request.get_json()
@@ -82,6 +94,8 @@ def register():
             'user': user.to_dict()
         }), 201
         
+    except OperationalError:
+        raise
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': f'Erro interno: {str(e)}'}), 500
@@ -131,6 +145,7 @@ def get_users(current_user):
         return jsonify({'message': f'Erro interno: {str(e)}'}), 500
 
 @auth_bp.route('/users/<int:user_id>', methods=['PUT'])
+@transactional()
 @token_required
 @admin_required
 def update_user(current_user, user_id):
@@ -152,6 +167,8 @@ def update_user(current_user, user_id):
             'user': user.to_dict()
         }), 200
         
+    except OperationalError:
+        raise
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': f'Erro interno: {str(e)}'}), 500
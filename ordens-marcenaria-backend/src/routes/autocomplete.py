@@ -0,0 +1,30 @@
+from flask import Blueprint, jsonify, request
+from src.routes.auth import token_required
+from src.utils.autocomplete import FIELDS, autocomplete_index
+
+autocomplete_bp = Blueprint('autocomplete', __name__)
+
+MAX_SUGGESTIONS = 50
+
+
+@autocomplete_bp.route('/autocomplete', methods=['GET'])
+@token_required
+def get_autocomplete(current_user):
+    """Sugestões para ?field=material|address começando por ?prefix=, das mais usadas para as menos.
+
+    Responde do índice em memória (src/utils/autocomplete.py), sem consultar o banco.
+    """
+    try:
+        field = request.args.get('field')
+        if field not in FIELDS:
+            return jsonify({'message': f'field deve ser um de: {", ".join(FIELDS)}'}), 400
+        prefix = request.args.get('prefix', '')
+        limit = max(1, min(request.args.get('limit', 10, type=int), MAX_SUGGESTIONS))
+
+        return jsonify({
+            'field': field,
+            'prefix': prefix,
+            'suggestions': autocomplete_index.search(field, prefix, limit),
+        }), 200
+    except Exception as e:
+        return jsonify({'message': f'Erro interno: {str(e)}'}), 500
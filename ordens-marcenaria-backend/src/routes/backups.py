@@ -0,0 +1,28 @@
+from flask import Blueprint, jsonify
+from src.models.user import Job
+from src.routes.auth import token_required, admin_required
+from src.utils.backup import backup_directory, current_database, list_backups
+
+backups_bp = Blueprint('backups', __name__)
+
+@backups_bp.route('/backups', methods=['GET'])
+@token_required
+@admin_required
+def get_backups(current_user):
+    """Cópias disponíveis do banco e o resultado dos últimos jobs de backup.
+
+    Para gerar uma cópia agora: POST /api/jobs com {"type": "backup_database"}.
+    """
+    try:
+        name, _ = current_database()
+        recent_jobs = (Job.query.filter_by(type='backup_database')
+                       .order_by(Job.created_at.desc()).limit(10).all())
+        backups = list_backups(backup_directory(), name)
+        for backup in backups:
+            del backup['path']
+        return jsonify({
+            'backups': backups,
+            'jobs': [job.to_dict() for job in recent_jobs]
+        }), 200
+    except Exception as e:
+        return jsonify({'message': f'Erro interno: {str(e)}'}), 500
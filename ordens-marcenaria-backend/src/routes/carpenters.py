@@ -1,27 +1,54 @@
 from flask import Blueprint, request, jsonify
 from src.models.user import db, Carpenter, Order
 from src.routes.auth import token_required, admin_or_carpenter_required
+from sqlalchemy import func
+from src.utils.cache import reference_cache
+from src.utils.response_cache import cached_response
+from sqlalchemy.exc import OperationalError
+from src.utils.transactions import transactional
 
 carpenters_bp = Blueprint('carpenters', __name__)
 
+# Lista de nomes muda poucas vezes por ano; o cache do servidor é invalidado nas escritas
+CARPENTER_NAMES_CACHE_CONTROL = 'private, max-age=60'
+
+def load_active_carpenter_names():
+    """Nomes dos marceneiros ativos, via cache de referência"""
+    def load():
+        carpenters = Carpenter.query.filter_by(is_active=True).all()
+        return [carpenter.name for carpenter in carpenters]
+
+    return reference_cache.get('carpenters', 'active_names', load)
+
 @carpenters_bp.route('/carpenters', methods=['GET'])
 @token_required
+@cached_response('carpenter', 'order')
 def get_carpenters(current_user):
     try:
         carpenters = Carpenter.query.filter_by(is_active=True).all()
         
-        # Adicionar estatísticas para cada marceneiro
+        # Estatísticas de todos os marceneiros em um único GROUP BY
+        counts = {}
+        names = [carpenter.name for carpenter in carpenters]
+        if names:
+            rows = (db.session.query(Order.carpenter, Order.status, func.count(Order.id))
+                    .filter(Order.carpenter.in_(names))
+                    .group_by(Order.carpenter, Order.status)
+                    .all())
+            for name, status, count in rows:
+                counts.setdefault(name, {})[status] = count
+        
         carpenters_with_stats = []
         for carpenter in carpenters:
-            orders = Order.query.filter_by(carpenter=carpenter.name).all()
+            status_counts = counts.get(carpenter.name, {})
             
             stats = {
-                'total': len(orders),
-                'atrasada': len([o for o in orders if o.status == 'atrasada']),
-                'paraHoje': len([o for o in orders if o.status == 'paraHoje']),
-                'emProcesso': len([o for o in orders if o.status == 'emProcesso']),
-                'recebida': len([o for o in orders if o.status == 'recebida']),
-                'concluida': len([o for o in orders if o.status == 'concluida'])
+                'total': sum(status_counts.values()),
+                'atrasada': status_counts.get('atrasada', 0),
+                'paraHoje': status_counts.get('paraHoje', 0),
+                'emProcesso': status_counts.get('emProcesso', 0),
+                'recebida': status_counts.get('recebida', 0),
+                'concluida': status_counts.get('concluida', 0)
             }
             
             carpenter_data = carpenter.to_dict()
@@ -36,6 +63,7 @@ def get_carpenters(current_user):
         return jsonify({'message': f'Erro interno: {str(e)}'}), 500
 
 @carpenters_bp.route('/carpenters', methods=['POST'])
+@transactional()
 @token_required
 @admin_or_carpenter_required
 def create_carpenter(current_user):
@@ -54,6 +82,7 @@ def create_carpenter(current_user):
                 # Reativar marceneiro inativo
                 existing_carpenter.is_active = True
                 db.session.commit()
+                reference_cache.invalidate('carpenters')
                 return jsonify({
                     'message': 'Marceneiro reativado com sucesso',
                     'carpenter': existing_carpenter.to_dict()
@@ -63,17 +92,22 @@ def create_carpenter(current_user):
         
         db.session.add(carpenter)
         db.session.commit()
+        reference_cache.invalidate('carpenters')
         
         return jsonify({
             'message': 'Marceneiro criado com sucesso',
             'carpenter': carpenter.to_dict()
         }), 201
         
+    except OperationalError:
+        # Banco ocupado: o @transactional faz rollback e repete a requisição
+        raise
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': f'Erro interno: {str(e)}'}), 500
 
 @carpenters_bp.route('/carpenters/<int:carpenter_id>', methods=['PUT'])
+@transactional()
 @token_required
 @admin_or_carpenter_required
 def update_carpenter(current_user, carpenter_id):
@@ -104,17 +138,21 @@ def update_carpenter(current_user, carpenter_id):
                     order.carpenter = None
         
         db.session.commit()
+        reference_cache.invalidate('carpenters')
         
         return jsonify({
             'message': 'Marceneiro atualizado com sucesso',
             'carpenter': carpenter.to_dict()
         }), 200
         
+    except OperationalError:
+        raise
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': f'Erro interno: {str(e)}'}), 500
 
 @carpenters_bp.route('/carpenters/<int:carpenter_id>', methods=['DELETE'])
+@transactional()
 @token_required
 @admin_or_carpenter_required
 def delete_carpenter(current_user, carpenter_id):
@@ -130,9 +168,12 @@ def delete_carpenter(current_user, carpenter_id):
         carpenter.is_active = False
         
         db.session.commit()
+        reference_cache.invalidate('carpenters')
         
         return jsonify({'message': 'Marceneiro removido com sucesso'}), 200
         
+    except OperationalError:
+        raise
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': f'Erro interno: {str(e)}'}), 500
@@ -142,12 +183,13 @@ def delete_carpenter(current_user, carpenter_id):
 def get_carpenter_names(current_user):
     """Retorna apenas os nomes dos marceneiros ativos para compatibilidade com o frontend"""
     try:
-        carpenters = Carpenter.query.filter_by(is_active=True).all()
-        names = [carpenter.name for carpenter in carpenters]
+        names = load_active_carpenter_names()
         
-        return jsonify({
+        response = jsonify({
             'carpenters': names
-        }), 200
+        })
+        response.headers['Cache-Control'] = CARPENTER_NAMES_CACHE_CONTROL
+        return response, 200
         
     except Exception as e:
         return jsonify({'message': f'Erro interno: {str(e)}'}), 500
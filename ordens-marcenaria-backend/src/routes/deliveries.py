@@ -1,22 +1,81 @@
-from flask import Blueprint, request, jsonify
-from src.models.user import db, Delivery, Order
+from flask import Blueprint, request, jsonify, current_app
+from src.models.user import db, Delivery, Order, ArchivedDelivery, ArchivedOrder
 from src.routes.auth import token_required, admin_or_carpenter_required
+from sqlalchemy.orm import contains_eager
 from datetime import datetime, date
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm.exc import StaleDataError
+from src.utils.concurrency import if_match_failed, not_modified, versioned, precondition_failed
+from src.utils.transactions import transactional
+from src.utils.idempotency import idempotent
+from src.utils.archive import archived_requested
+from src.utils.response_cache import cached_response
 
 deliveries_bp = Blueprint('deliveries', __name__)
 
+def include_order_requested():
+    """Verifica se o cliente pediu o resumo da ordem (?include=order)"""
+    include = request.args.get('include', '')
+    return 'order' in [part.strip() for part in include.split(',')]
+
+def deliveries_with_order_query(archived=False):
+    """Entregas com o resumo da ordem carregado no mesmo SELECT (LEFT JOIN)"""
+    delivery_model, order_model = (ArchivedDelivery, ArchivedOrder) if archived else (Delivery, Order)
+    return (delivery_model.query
+            .outerjoin(delivery_model.order)
+            .options(contains_eager(delivery_model.order).load_only(
+                order_model.id, order_model.description, order_model.exit_date,
+                order_model.carpenter, order_model.status)))
+
+# Campos aceitos no PATCH /deliveries/<id>
+DELIVERY_PATCH_FIELDS = {'orderId', 'deliveryDate', 'deliveryStatus', 'deliveryAddress', 'notes'}
+
+def apply_delivery_changes(delivery, data):
+    """Aplica só os campos enviados; devolve uma mensagem de erro ou None"""
+    if 'orderId' in data:
+        order_id = data['orderId']
+        if order_id and not Order.query.get(order_id):
+            return 'Ordem com o ID fornecido não existe'
+        delivery.order_id = order_id
+    if 'deliveryDate' in data:
+        delivery.delivery_date = datetime.strptime(data['deliveryDate'], '%Y-%m-%d').date()
+    if 'deliveryStatus' in data:
+        delivery.delivery_status = data['deliveryStatus']
+    if 'deliveryAddress' in data:
+        delivery.delivery_address = data['deliveryAddress']
+    if 'notes' in data:
+        delivery.notes = data['notes']
+    
+    delivery.updated_at = datetime.utcnow()
+    return None
+
+def delivery_conflict(delivery_id):
+    """Resposta para quando o UPDATE/DELETE versionado não encontrou a versão esperada"""
+    delivery = Delivery.query.get(delivery_id)
+    if delivery is None:
+        return jsonify({'message': 'Entrega não encontrada'}), 404
+    return precondition_failed('delivery', delivery.to_dict())
+
 @deliveries_bp.route('/deliveries', methods=['GET'])
 @token_required
+@cached_response('delivery', 'order', 'archived_delivery', 'archived_order')
 def get_deliveries(current_user):
     try:
-        deliveries = Delivery.query.all()
+        include_order = include_order_requested()
+        archived = archived_requested(request.args)
+        if include_order:
+            deliveries = deliveries_with_order_query(archived).all()
+        else:
+            deliveries = (ArchivedDelivery if archived else Delivery).query.all()
         return jsonify({
-            'deliveries': [delivery.to_dict() for delivery in deliveries]
+            'deliveries': [delivery.to_dict(include_order=include_order) for delivery in deliveries]
         }), 200
     except Exception as e:
         return jsonify({'message': f'Erro interno: {str(e)}'}), 500
 
 @deliveries_bp.route('/deliveries', methods=['POST'])
+@idempotent
+@transactional()
 @token_required
 @admin_or_carpenter_required
 def create_delivery(current_user):
@@ -26,7 +85,7 @@ def create_delivery(current_user):
         if not data or not data.get("id") or not data.get("deliveryDate") or not data.get("deliveryAddress"):
             return jsonify({"message": "ID, data de entrega e endereço de entrega são obrigatórios"}), 400
         
-        if Delivery.query.get(data['id']):
+        if Delivery.query.get(data['id']) or ArchivedDelivery.query.get(data['id']):
             return jsonify({'message': 'ID da entrega já existe'}), 400
         order_id = data.get("orderId")
         if order_id:
@@ -53,6 +112,9 @@ def create_delivery(current_user):
         
     except ValueError as e:
         return jsonify({'message': 'Formato de data inválido. Use YYYY-MM-DD'}), 400
+    except OperationalError:
+        # Banco ocupado: o @transactional faz rollback e repete a requisição
+        raise
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': f'Erro interno: {str(e)}'}), 500
@@ -61,60 +123,118 @@ def create_delivery(current_user):
 @token_required
 def get_delivery(current_user, delivery_id):
     try:
-        delivery = Delivery.query.get_or_404(delivery_id)
-        return jsonify({'delivery': delivery.to_dict()}), 200
+        include_order = include_order_requested()
+        if include_order:
+            delivery = deliveries_with_order_query().filter(Delivery.id == delivery_id).first_or_404()
+        else:
+            delivery = Delivery.query.get_or_404(delivery_id)
+        
+        if not_modified(delivery.version):
+            return versioned(current_app.response_class(status=304), delivery.version)
+        
+        return versioned(jsonify({'delivery': delivery.to_dict(include_order=include_order)}),
+                         delivery.version), 200
     except Exception as e:
         return jsonify({'message': f'Erro interno: {str(e)}'}), 500
 
 @deliveries_bp.route('/deliveries/<string:delivery_id>', methods=['PUT'])
+@transactional()
 @token_required
 @admin_or_carpenter_required
 def update_delivery(current_user, delivery_id):
     try:
         delivery = Delivery.query.get_or_404(delivery_id)
+        if if_match_failed(delivery.version):
+            return precondition_failed('delivery', delivery.to_dict())
+        
         data = request.get_json()
+        error = apply_delivery_changes(delivery, data)
+        if error:
+            return jsonify({'message': error}), 400
+        
+        db.session.commit()
+        
+        return versioned(jsonify({
+            'message': 'Entrega atualizada com sucesso',
+            'delivery': delivery.to_dict()
+        }), delivery.version), 200
+        
+    except ValueError as e:
+        return jsonify({'message': 'Formato de data inválido. Use YYYY-MM-DD'}), 400
+    except StaleDataError:
+        db.session.rollback()
+        return delivery_conflict(delivery_id)
+    except OperationalError:
+        raise
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'Erro interno: {str(e)}'}), 500
+
+@deliveries_bp.route('/deliveries/<string:delivery_id>', methods=['PATCH'])
+@transactional()
+@token_required
+@admin_or_carpenter_required
+def patch_delivery(current_user, delivery_id):
+    """Altera só os campos enviados; com If-Match, responde 412 se a entrega mudou desde a leitura"""
+    try:
+        data = request.get_json(silent=True)
+        if not data:
+            return jsonify({'message': 'Nenhum campo para atualizar'}), 400
+        
+        unknown = sorted(set(data) - DELIVERY_PATCH_FIELDS)
+        if unknown:
+            return jsonify({
+                'message': 'Campos não suportados',
+                'fields': unknown,
+                'allowed_fields': sorted(DELIVERY_PATCH_FIELDS)
+            }), 400
+        
+        delivery = Delivery.query.get_or_404(delivery_id)
+        if if_match_failed(delivery.version):
+            return precondition_failed('delivery', delivery.to_dict())
         
-        if 'orderId' in data:
-            order_id = data['orderId']
-            if order_id and not Order.query.get(order_id):
-                return jsonify({'message': 'Ordem com o ID fornecido não existe'}), 400
-            delivery.order_id = order_id
-        if 'deliveryDate' in data:
-            delivery.delivery_date = datetime.strptime(data['deliveryDate'], '%Y-%m-%d').date()
-        if 'deliveryStatus' in data:
-            delivery.delivery_status = data['deliveryStatus']
-        if 'deliveryAddress' in data:
-            delivery.delivery_address = data['deliveryAddress']
-        if 'notes' in data:
-            delivery.notes = data['notes']
-        
-        delivery.updated_at = datetime.utcnow()
+        error = apply_delivery_changes(delivery, data)
+        if error:
+            return jsonify({'message': error}), 400
         
         db.session.commit()
         
-        return jsonify({
+        return versioned(jsonify({
             'message': 'Entrega atualizada com sucesso',
             'delivery': delivery.to_dict()
-        }), 200
+        }), delivery.version), 200
         
     except ValueError as e:
         return jsonify({'message': 'Formato de data inválido. Use YYYY-MM-DD'}), 400
+    except StaleDataError:
+        db.session.rollback()
+        return delivery_conflict(delivery_id)
+    except OperationalError:
+        raise
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': f'Erro interno: {str(e)}'}), 500
 
 @deliveries_bp.route('/deliveries/<string:delivery_id>', methods=['DELETE'])
+@transactional()
 @token_required
 @admin_or_carpenter_required
 def delete_delivery(current_user, delivery_id):
     try:
         delivery = Delivery.query.get_or_404(delivery_id)
+        if if_match_failed(delivery.version):
+            return precondition_failed('delivery', delivery.to_dict())
         
         db.session.delete(delivery)
         db.session.commit()
         
         return jsonify({'message': 'Entrega excluída com sucesso'}), 200
         
+    except StaleDataError:
+        db.session.rollback()
+        return delivery_conflict(delivery_id)
+    except OperationalError:
+        raise
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': f'Erro interno: {str(e)}'}), 500
\ No newline at end of file
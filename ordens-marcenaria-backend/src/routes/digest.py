@@ -0,0 +1,30 @@
+from datetime import date
+from flask import Blueprint, request, jsonify
+from src.routes.auth import token_required
+from src.utils.cache import reference_cache
+from src.utils.coalescing import coalesced, shared_key
+from src.utils.digest import PERIODS, build_digest, seconds_until_tomorrow
+
+digest_bp = Blueprint('digest', __name__)
+
+@digest_bp.route('/digest', methods=['GET'])
+@token_required
+@coalesced(key=shared_key)
+def get_digest(current_user):
+    """Resumo de hoje/amanhã/semana (ordens, atrasadas e entregas) com as mensagens do WhatsApp.
+
+    Fica em cache até o próximo commit que escrever em order/delivery (em qualquer
+    processo) ou até a virada do dia, que entra na chave.
+    """
+    try:
+        period = request.args.get('period', 'today')
+        if period not in PERIODS:
+            return jsonify({'message': f"period deve ser um de: {', '.join(PERIODS)}"}), 400
+        
+        today = date.today()
+        digest = reference_cache.get('digest', (period, today.isoformat()),
+                                     lambda: build_digest(period, today),
+                                     ttl=seconds_until_tomorrow())
+        return jsonify(digest), 200
+    except Exception as e:
+        return jsonify({'message': f'Erro interno: {str(e)}'}), 500
@@ -0,0 +1,87 @@
+from datetime import datetime
+from flask import Blueprint, request, jsonify
+from sqlalchemy.exc import OperationalError
+from src.models.user import db, Job
+from src.routes.auth import token_required, admin_required
+from src.utils.transactions import transactional
+from src.utils.jobs import JOB_HANDLERS, enqueue
+
+jobs_bp = Blueprint('jobs', __name__)
+
+@jobs_bp.route('/jobs', methods=['POST'])
+@transactional()
+@token_required
+@admin_required
+def create_job(current_user):
+    """Enfileira uma tarefa pesada e responde 202 na hora; acompanhe por GET /api/jobs/<id>"""
+    try:
+        data = request.get_json()
+        
+        if not data or not data.get('type'):
+            return jsonify({'message': 'Tipo do job é obrigatório'}), 400
+        
+        if data['type'] not in JOB_HANDLERS:
+            return jsonify({
+                'message': 'Tipo de job desconhecido',
+                'available_types': sorted(JOB_HANDLERS)
+            }), 400
+        
+        run_after = None
+        if data.get('runAfter'):
+            run_after = datetime.fromisoformat(data['runAfter'])
+        
+        job = enqueue(data['type'], data.get('payload') or {}, user_id=current_user.id, run_after=run_after)
+        db.session.commit()
+        
+        response = jsonify({
+            'message': 'Job enfileirado',
+            'job': job.to_dict()
+        })
+        response.headers['Location'] = f'/api/jobs/{job.id}'
+        return response, 202
+        
+    except ValueError:
+        return jsonify({'message': 'runAfter deve estar no formato ISO 8601'}), 400
+    except OperationalError:
+        raise
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'Erro interno: {str(e)}'}), 500
+
+@jobs_bp.route('/jobs/<string:job_id>', methods=['GET'])
+@token_required
+def get_job(current_user, job_id):
+    try:
+        job = Job.query.get(job_id)
+        if not job:
+            return jsonify({'message': 'Job não encontrado'}), 404
+        
+        if current_user.role != 'administrador' and job.created_by != current_user.id:
+            return jsonify({'message': 'Acesso negado'}), 403
+        
+        return jsonify({'job': job.to_dict()}), 200
+    except Exception as e:
+        return jsonify({'message': f'Erro interno: {str(e)}'}), 500
+
+@jobs_bp.route('/jobs', methods=['GET'])
+@token_required
+@admin_required
+def get_jobs(current_user):
+    """Jobs mais recentes, opcionalmente filtrados por ?status= e ?type="""
+    try:
+        query = Job.query
+        if request.args.get('status'):
+            query = query.filter_by(status=request.args['status'])
+        if request.args.get('type'):
+            query = query.filter_by(type=request.args['type'])
+        limit = min(int(request.args.get('limit', 50)), 500)
+        
+        jobs = query.order_by(Job.created_at.desc()).limit(limit).all()
+        return jsonify({
+            'jobs': [job.to_dict() for job in jobs],
+            'available_types': sorted(JOB_HANDLERS)
+        }), 200
+    except ValueError:
+        return jsonify({'message': 'limit deve ser um número inteiro'}), 400
+    except Exception as e:
+        return jsonify({'message': f'Erro interno: {str(e)}'}), 500
@@ -0,0 +1,90 @@
+from datetime import datetime
+from flask import Blueprint, request, jsonify
+from sqlalchemy import func, distinct
+from src.models.user import db, Order, Material, MaterialCatalog
+from src.routes.auth import token_required
+
+materials_bp = Blueprint('materials', __name__)
+
+# Sem ?status=, o rollup considera as ordens em aberto
+OPEN_STATUSES = ('recebida', 'emProcesso', 'paraHoje', 'atrasada')
+
+@materials_bp.route('/materials/rollup', methods=['GET'])
+@token_required
+def get_materials_rollup(current_user):
+    """Quantidade total de cada item do catálogo nas ordens filtradas (um único GROUP BY).
+
+    Filtros: ?status=recebida,emProcesso  ?carpenter=  ?dueFrom=YYYY-MM-DD  ?dueTo=YYYY-MM-DD
+    """
+    try:
+        statuses = [s for s in request.args.get('status', '').split(',') if s] or list(OPEN_STATUSES)
+        carpenter = request.args.get('carpenter')
+        due_from = request.args.get('dueFrom')
+        due_to = request.args.get('dueTo')
+        
+        total_quantity = func.sum(Material.quantity).label('total_quantity')
+        query = (db.session.query(MaterialCatalog.id,
+                                  MaterialCatalog.name,
+                                  total_quantity,
+                                  func.count(Material.id),
+                                  func.count(distinct(Material.order_id)))
+                 .join(Material, Material.catalog_id == MaterialCatalog.id)
+                 .join(Order, Order.id == Material.order_id)
+                 .filter(Order.status.in_(statuses)))
+        if carpenter:
+            query = query.filter(Order.carpenter == carpenter)
+        if due_from:
+            query = query.filter(Order.exit_date >= datetime.strptime(due_from, '%Y-%m-%d').date())
+        if due_to:
+            query = query.filter(Order.exit_date <= datetime.strptime(due_to, '%Y-%m-%d').date())
+        
+        rows = (query.group_by(MaterialCatalog.id, MaterialCatalog.name)
+                .order_by(total_quantity.desc(), MaterialCatalog.name)
+                .all())
+        
+        return jsonify({
+            'filters': {
+                'status': statuses,
+                'carpenter': carpenter,
+                'dueFrom': due_from,
+                'dueTo': due_to
+            },
+            'materials': [{
+                'catalogId': catalog_id,
+                'name': name,
+                'totalQuantity': quantity,
+                'lines': lines,
+                'orders': orders
+            } for catalog_id, name, quantity, lines, orders in rows]
+        }), 200
+        
+    except ValueError:
+        return jsonify({'message': 'Formato de data inválido. Use YYYY-MM-DD'}), 400
+    except Exception as e:
+        return jsonify({'message': f'Erro interno: {str(e)}'}), 500
+
+@materials_bp.route('/materials/catalog', methods=['GET'])
+@token_required
+def get_material_catalog(current_user):
+    """Itens do catálogo (opcionalmente filtrados por ?q=) com o número de usos nas ordens ativas"""
+    try:
+        query = (db.session.query(MaterialCatalog, func.count(Material.id))
+                 .outerjoin(Material, Material.catalog_id == MaterialCatalog.id))
+        search = MaterialCatalog.normalize(request.args.get('q'))
+        if search:
+            # % e _ digitados são texto, não curingas do LIKE
+            escaped = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            query = query.filter(MaterialCatalog.normalized_name.like(f'%{escaped}%', escape='\\'))
+        
+        rows = query.group_by(MaterialCatalog.id).order_by(MaterialCatalog.name).all()
+        
+        catalog = []
+        for entry, usage in rows:
+            entry_data = entry.to_dict()
+            entry_data['usage'] = usage
+            catalog.append(entry_data)
+        
+        return jsonify({'catalog': catalog}), 200
+        
+    except Exception as e:
+        return jsonify({'message': f'Erro interno: {str(e)}'}), 500
@@ -1,7 +1,16 @@
-from flask import Blueprint, request, jsonify
-from src.models.user import db, Order, Material
+from flask import Blueprint, request, jsonify, current_app
+from src.models.user import db, Order, Material, ArchivedOrder
 from src.routes.auth import token_required, admin_or_carpenter_required
+from sqlalchemy.orm import selectinload
 from datetime import datetime, date
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm.exc import StaleDataError
+from src.utils.concurrency import if_match_failed, not_modified, versioned, precondition_failed
+from src.utils.transactions import transactional, immediate_transaction
+from src.utils.idempotency import idempotent
+from src.utils.archive import archived_requested
+from src.utils.jobs import job_handler
+from src.utils.response_cache import cached_response
 
 orders_bp = Blueprint('orders', __name__)
 
@@ -20,28 +29,113 @@ def update_order_status(order):
     
     return order.status
 
+def refresh_order_statuses():
+    """Atualiza em lote (dois UPDATEs) os status que dependem da data; não faz commit.
+
+    UPDATEs em lote não passam pelo version_id_col, então a versão é incrementada
+    aqui para invalidar as ETags que os clientes já têm.
+    """
+    today = date.today()
+    late = (Order.query
+            .filter(Order.status.notin_(['concluida', 'atrasada']), Order.exit_date < today)
+            .update({'status': 'atrasada', 'version': Order.version + 1}, synchronize_session=False))
+    due = (Order.query
+           .filter(Order.status.notin_(['concluida', 'paraHoje']), Order.exit_date == today)
+           .update({'status': 'paraHoje', 'version': Order.version + 1}, synchronize_session=False))
+    return late + due
+
+def touch_order(order):
+    """Os materiais fazem parte da representação da ordem: o UPDATE de updated_at passa
+    pelo version_id_col e troca a versão (e a ETag) junto com a escrita no material"""
+    order.updated_at = datetime.utcnow()
+
+# Campos aceitos no PATCH /orders/<id>
+ORDER_PATCH_FIELDS = {'description', 'entryDate', 'exitDate', 'carpenter', 'status', 'materials'}
+
+def apply_order_changes(order, data):
+    """Aplica só os campos enviados; materiais, quando enviados, substituem a lista inteira"""
+    if 'description' in data:
+        order.description = data['description']
+    if 'entryDate' in data:
+        order.entry_date = datetime.strptime(data['entryDate'], '%Y-%m-%d').date()
+    if 'exitDate' in data:
+        order.exit_date = datetime.strptime(data['exitDate'], '%Y-%m-%d').date()
+    if 'carpenter' in data:
+        order.carpenter = data['carpenter']
+    if 'status' in data:
+        order.status = data['status']
+    
+    # Atualizar materiais se fornecidos
+    if 'materials' in data:
+        # Remover materiais existentes
+        Material.query.filter_by(order_id=order.id).delete()
+        
+        # Adicionar novos materiais
+        for material_data in data['materials']:
+            material = Material(
+                description=material_data['description'],
+                quantity=material_data.get('quantity', 1),
+                order_id=order.id
+            )
+            db.session.add(material)
+    
+    order.updated_at = datetime.utcnow()
+    
+    # Atualizar status automaticamente se não foi definido manualmente
+    if 'status' not in data:
+        order.status = update_order_status(order)
+
+def order_conflict(order_id):
+    """Resposta para quando o UPDATE/DELETE versionado não encontrou a versão esperada"""
+    order = Order.query.get(order_id)
+    if order is None:
+        return jsonify({'message': 'Ordem não encontrada'}), 404
+    return precondition_failed('order', order.to_dict())
+
+@job_handler('refresh_order_statuses')
+def refresh_order_statuses_job(payload, context):
+    """Atualização periódica dos status por data, sem depender de alguém abrir a lista"""
+    with immediate_transaction():
+        updated = refresh_order_statuses()
+    return {'updated': updated}
+
 @orders_bp.route('/orders', methods=['GET'])
+@transactional(immediate=False)
 @token_required
+@cached_response('order', 'material', 'archived_order', 'archived_material')
 def get_orders(current_user):
     try:
-        orders = Order.query.all()
-        
-        # Atualizar status automaticamente
-        for order in orders:
-            new_status = update_order_status(order)
-            if new_status != order.status:
-                order.status = new_status
-        
-        db.session.commit()
+        # Ordens arquivadas só quando pedidas explicitamente (?archived=true)
+        if archived_requested(request.args):
+            archived = ArchivedOrder.query.options(selectinload(ArchivedOrder.materials)).all()
+            return jsonify({
+                'orders': [order.to_dict() for order in archived]
+            }), 200
+        
+        # Materiais carregados em um único SELECT ... IN em vez de um por ordem
+        orders_query = Order.query.options(selectinload(Order.materials))
+        orders = orders_query.all()
+        
+        # Atualizar status automaticamente: a escrita só acontece quando algum
+        # status venceu, e em lote, para segurar o lock de escrita o mínimo possível
+        if any(update_order_status(order) != order.status for order in orders):
+            with immediate_transaction():
+                refresh_order_statuses()
+            orders = orders_query.all()
         
         return jsonify({
             'orders': [order.to_dict() for order in orders]
         }), 200
         
+    except OperationalError:
+        # Banco ocupado: o @transactional faz rollback e repete a requisição
+        raise
     except Exception as e:
         return jsonify({'message': f'Erro interno: {str(e)}'}), 500
 
 @orders_bp.route('/orders', methods=['POST'])
+@idempotent
+@transactional()
 @token_required
 @admin_or_carpenter_required
 def create_order(current_user):
@@ -51,8 +145,8 @@ def create_order(current_user):
         if not data or not data.get('id') or not data.get('description'):
             return jsonify({'message': 'ID e descrição são obrigatórios'}), 400
         
-        # Verificar se ID já existe
-        if Order.query.get(data['id']):
+        # Verificar se ID já existe (também no arquivo: o arquivamento não aceita ids repetidos)
+        if Order.query.get(data['id']) or ArchivedOrder.query.get(data['id']):
             return jsonify({'message': 'ID da ordem já existe'}), 400
         
         # Converter datas
@@ -93,101 +187,147 @@ def create_order(current_user):
         
     except ValueError as e:
         return jsonify({'message': 'Formato de data inválido. Use YYYY-MM-DD'}), 400
+    except OperationalError:
+        raise
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': f'Erro interno: {str(e)}'}), 500
 
 @orders_bp.route('/orders/<string:order_id>', methods=['GET'])
+@transactional(immediate=False)
 @token_required
+@cached_response('order', 'material', 'archived_order', 'archived_material')
 def get_order(current_user, order_id):
     try:
+        if archived_requested(request.args):
+            order = ArchivedOrder.query.get_or_404(order_id)
+            return jsonify({'order': order.to_dict()}), 200
+        
         order = Order.query.get_or_404(order_id)
         
         # Atualizar status automaticamente
         new_status = update_order_status(order)
         if new_status != order.status:
-            order.status = new_status
-            db.session.commit()
+            with immediate_transaction():
+                Order.query.filter_by(id=order_id).update(
+                    {'status': new_status, 'version': Order.version + 1}, synchronize_session=False)
+        
+        if not_modified(order.version):
+            return versioned(current_app.response_class(status=304), order.version)
         
-        return jsonify({'order': order.to_dict()}), 200
+        return versioned(jsonify({'order': order.to_dict()}), order.version), 200
         
+    except OperationalError:
+        raise
     except Exception as e:
         return jsonify({'message': f'Erro interno: {str(e)}'}), 500
 
 @orders_bp.route('/orders/<string:order_id>', methods=['PUT'])
+@transactional()
 @token_required
 @admin_or_carpenter_required
 def update_order(current_user, order_id):
     try:
         order = Order.query.get_or_404(order_id)
+        if if_match_failed(order.version):
+            return precondition_failed('order', order.to_dict())
+        
         data = request.get_json()
+        apply_order_changes(order, data)
+        db.session.commit()
         
-        if 'description' in data:
-            order.description = data['description']
-        if 'entryDate' in data:
-            order.entry_date = datetime.strptime(data['entryDate'], '%Y-%m-%d').date()
-        if 'exitDate' in data:
-            order.exit_date = datetime.strptime(data['exitDate'], '%Y-%m-%d').date()
-        if 'carpenter' in data:
-            order.carpenter = data['carpenter']
-        if 'status' in data:
-            order.status = data['status']
-        
-        # Atualizar materiais se fornecidos
-        if 'materials' in data:
-            # Remover materiais existentes
-            Material.query.filter_by(order_id=order_id).delete()
-            
-            # Adicionar novos materiais
-            for material_data in data['materials']:
-                material = Material(
-                    description=material_data['description'],
-                    quantity=material_data.get('quantity', 1),
-                    order_id=order.id
-                )
-                db.session.add(material)
+        return versioned(jsonify({
+            'message': 'Ordem atualizada com sucesso',
+            'order': order.to_dict()
+        }), order.version), 200
         
-        order.updated_at = datetime.utcnow()
+    except ValueError as e:
+        return jsonify({'message': 'Formato de data inválido. Use YYYY-MM-DD'}), 400
+    except StaleDataError:
+        db.session.rollback()
+        return order_conflict(order_id)
+    except OperationalError:
+        raise
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'Erro interno: {str(e)}'}), 500
+
+@orders_bp.route('/orders/<string:order_id>', methods=['PATCH'])
+@transactional()
+@token_required
+@admin_or_carpenter_required
+def patch_order(current_user, order_id):
+    """Altera só os campos enviados; com If-Match, responde 412 se a ordem mudou desde a leitura"""
+    try:
+        data = request.get_json(silent=True)
+        if not data:
+            return jsonify({'message': 'Nenhum campo para atualizar'}), 400
+        
+        unknown = sorted(set(data) - ORDER_PATCH_FIELDS)
+        if unknown:
+            return jsonify({
+                'message': 'Campos não suportados',
+                'fields': unknown,
+                'allowed_fields': sorted(ORDER_PATCH_FIELDS)
+            }), 400
         
-        # Atualizar status automaticamente se não foi definido manualmente
-        if 'status' not in data:
-            order.status = update_order_status(order)
+        order = Order.query.get_or_404(order_id)
+        if if_match_failed(order.version):
+            return precondition_failed('order', order.to_dict())
         
+        apply_order_changes(order, data)
         db.session.commit()
         
-        return jsonify({
+        return versioned(jsonify({
             'message': 'Ordem atualizada com sucesso',
             'order': order.to_dict()
-        }), 200
+        }), order.version), 200
         
     except ValueError as e:
         return jsonify({'message': 'Formato de data inválido. Use YYYY-MM-DD'}), 400
+    except StaleDataError:
+        db.session.rollback()
+        return order_conflict(order_id)
+    except OperationalError:
+        raise
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': f'Erro interno: {str(e)}'}), 500
 
 @orders_bp.route('/orders/<string:order_id>', methods=['DELETE'])
+@transactional()
 @token_required
 @admin_or_carpenter_required
 def delete_order(current_user, order_id):
     try:
         order = Order.query.get_or_404(order_id)
+        if if_match_failed(order.version):
+            return precondition_failed('order', order.to_dict())
         
         db.session.delete(order)
         db.session.commit()
         
         return jsonify({'message': 'Ordem excluída com sucesso'}), 200
         
+    except StaleDataError:
+        db.session.rollback()
+        return order_conflict(order_id)
+    except OperationalError:
+        raise
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': f'Erro interno: {str(e)}'}), 500
 
 @orders_bp.route('/orders/<string:order_id>/materials', methods=['POST'])
+@idempotent
+@transactional()
 @token_required
 @admin_or_carpenter_required
 def add_material(current_user, order_id):
     try:
         order = Order.query.get_or_404(order_id)
+        if if_match_failed(order.version):
+            return precondition_failed('order', order.to_dict())
         data = request.get_json()
         
         if not data or not data.get('description'):
@@ -200,23 +340,33 @@ def add_material(current_user, order_id):
         )
         
         db.session.add(material)
+        touch_order(order)
         db.session.commit()
         
-        return jsonify({
+        return versioned(jsonify({
             'message': 'Material adicionado com sucesso',
             'material': material.to_dict()
-        }), 201
+        }), order.version), 201
         
+    except StaleDataError:
+        db.session.rollback()
+        return order_conflict(order_id)
+    except OperationalError:
+        raise
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': f'Erro interno: {str(e)}'}), 500
 
 @orders_bp.route('/orders/<string:order_id>/materials/<int:material_id>', methods=['PUT'])
+@transactional()
 @token_required
 @admin_or_carpenter_required
 def update_material(current_user, order_id, material_id):
     try:
+        order = Order.query.get_or_404(order_id)
         material = Material.query.filter_by(id=material_id, order_id=order_id).first_or_404()
+        if if_match_failed(order.version):
+            return precondition_failed('order', order.to_dict())
         data = request.get_json()
         
         if 'description' in data:
@@ -224,29 +374,45 @@ def update_material(current_user, order_id, material_id):
         if 'quantity' in data:
             material.quantity = data['quantity']
         
+        touch_order(order)
         db.session.commit()
         
-        return jsonify({
+        return versioned(jsonify({
             'message': 'Material atualizado com sucesso',
             'material': material.to_dict()
-        }), 200
+        }), order.version), 200
         
+    except StaleDataError:
+        db.session.rollback()
+        return order_conflict(order_id)
+    except OperationalError:
+        raise
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': f'Erro interno: {str(e)}'}), 500
 
 @orders_bp.route('/orders/<string:order_id>/materials/<int:material_id>', methods=['DELETE'])
+@transactional()
 @token_required
 @admin_or_carpenter_required
 def delete_material(current_user, order_id, material_id):
     try:
+        order = Order.query.get_or_404(order_id)
         material = Material.query.filter_by(id=material_id, order_id=order_id).first_or_404()
+        if if_match_failed(order.version):
+            return precondition_failed('order', order.to_dict())
         
         db.session.delete(material)
+        touch_order(order)
         db.session.commit()
         
-        return jsonify({'message': 'Material excluído com sucesso'}), 200
+        return versioned(jsonify({'message': 'Material excluído com sucesso'}), order.version), 200
         
+    except StaleDataError:
+        db.session.rollback()
+        return order_conflict(order_id)
+    except OperationalError:
+        raise
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': f'Erro interno: {str(e)}'}), 500
@@ -0,0 +1,82 @@
+from flask import Blueprint, current_app, jsonify, request, send_file
+from src.routes.auth import token_required, admin_required
+from src.utils.request_profiler import list_profiles, load_profile, profile_paths, top_functions
+from src.utils.tenancy import DEFAULT_TENANT, current_tenant
+
+profiles_bp = Blueprint('profiles', __name__)
+
+SORT_KEYS = ('cumulative', 'tottime', 'ncalls')
+
+
+def profile_directory():
+    return current_app.config['REQUEST_PROFILE_DIR']
+
+
+def tenant_profile(profile_id):
+    """Metadados do profile, só se ele for da oficina atual"""
+    metadata = load_profile(profile_directory(), profile_id)
+    if metadata is None or metadata.get('tenant') != (current_tenant() or DEFAULT_TENANT):
+        return None
+    return metadata
+
+
+@profiles_bp.route('/admin/profiles', methods=['GET'])
+@token_required
+@admin_required
+def get_profiles(current_user):
+    """Profiles de requisição gravados, do mais novo para o mais antigo.
+
+    Para perfilar uma requisição: REQUEST_PROFILING=1 no servidor e o cabeçalho
+    X-Profile: 1 (token de administrador); o id volta em X-Profile-Id.
+    """
+    try:
+        profiles = list_profiles(profile_directory(), current_tenant() or DEFAULT_TENANT)
+        endpoint = request.args.get('endpoint')
+        if endpoint:
+            profiles = [profile for profile in profiles if profile.get('endpoint') == endpoint]
+        return jsonify({
+            'enabled': current_app.config.get('REQUEST_PROFILING', False),
+            'profiles': profiles,
+        }), 200
+    except Exception as e:
+        return jsonify({'message': f'Erro interno: {str(e)}'}), 500
+
+
+@profiles_bp.route('/admin/profiles/<profile_id>', methods=['GET'])
+@token_required
+@admin_required
+def get_profile(current_user, profile_id):
+    """Linha do tempo (auth, sql, serialization) e as funções mais caras do profile.
+
+    ?sort=cumulative|tottime|ncalls e ?limit=N (padrão 30) escolhem as funções.
+    """
+    try:
+        metadata = tenant_profile(profile_id)
+        if metadata is None:
+            return jsonify({'message': 'Profile não encontrado'}), 404
+
+        sort = request.args.get('sort', 'cumulative')
+        if sort not in SORT_KEYS:
+            return jsonify({'message': f'sort deve ser um de: {", ".join(SORT_KEYS)}'}), 400
+        limit = min(request.args.get('limit', 30, type=int), 500)
+
+        _, prof_path = profile_paths(profile_directory(), profile_id)
+        metadata['functions'] = top_functions(prof_path, sort, limit)
+        return jsonify(metadata), 200
+    except Exception as e:
+        return jsonify({'message': f'Erro interno: {str(e)}'}), 500
+
+
+@profiles_bp.route('/admin/profiles/<profile_id>/download', methods=['GET'])
+@token_required
+@admin_required
+def download_profile(current_user, profile_id):
+    """Arquivo pstats do profile (python -m pstats arquivo.prof, snakeviz arquivo.prof)"""
+    try:
+        if tenant_profile(profile_id) is None:
+            return jsonify({'message': 'Profile não encontrado'}), 404
+        _, prof_path = profile_paths(profile_directory(), profile_id)
+        return send_file(prof_path, mimetype='application/octet-stream',
+                         as_attachment=True, download_name=f'{profile_id}.prof')
+    except Exception as e:
+        return jsonify({'message': f'Erro interno: {str(e)}'}), 500
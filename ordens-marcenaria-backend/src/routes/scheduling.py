@@ -0,0 +1,110 @@
+from datetime import datetime
+from flask import Blueprint, request, jsonify, current_app
+from sqlalchemy.exc import OperationalError
+from src.models.user import db
+from src.routes.auth import token_required, admin_required
+from src.routes.carpenters import load_active_carpenter_names
+from src.utils.transactions import transactional
+from src.utils.db_routing import use_reader
+from src.utils.scheduling import (MAX_ASSIGNMENTS_PER_APPLY, load_unassigned_orders, load_workloads,
+                                  suggest_assignments, apply_assignments, conflicting_orders)
+
+scheduling_bp = Blueprint('scheduling', __name__)
+
+@scheduling_bp.route('/scheduling/suggest', methods=['POST'])
+@use_reader
+@token_required
+@admin_required
+def suggest(current_user):
+    """Propõe marceneiros para as ordens em aberto sem marceneiro (não grava nada).
+
+    Body opcional: {"orderIds": [...], "carpenters": [...], "maxPerCarpenter": 10, "daysPerOrder": 2}
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        active = load_active_carpenter_names()
+        carpenters = data.get('carpenters') or active
+        unknown = [name for name in carpenters if name not in active]
+        if unknown:
+            return jsonify({'message': 'Marceneiros inexistentes ou inativos', 'carpenters': unknown}), 400
+        if not carpenters:
+            return jsonify({'message': 'Nenhum marceneiro ativo para receber ordens'}), 400
+        
+        max_per_carpenter = data.get('maxPerCarpenter')
+        if max_per_carpenter is not None:
+            max_per_carpenter = int(max_per_carpenter)
+        days_per_order = float(data.get('daysPerOrder', current_app.config['SCHEDULING_DAYS_PER_ORDER']))
+        if days_per_order <= 0 or (max_per_carpenter is not None and max_per_carpenter < 0):
+            return jsonify({'message': 'daysPerOrder e maxPerCarpenter devem ser positivos'}), 400
+        
+        orders = load_unassigned_orders(data.get('orderIds'))
+        workloads = load_workloads(carpenters)
+        assignments, left_over, workload_after = suggest_assignments(
+            orders, workloads, days_per_order, max_per_carpenter=max_per_carpenter)
+        
+        return jsonify({
+            'assignments': assignments,
+            'unassigned': left_over,
+            'atRisk': sum(1 for assignment in assignments if assignment['atRisk']),
+            'workloads': {
+                name: {'before': workloads[name], 'after': workload_after[name]}
+                for name in carpenters
+            }
+        }), 200
+        
+    except (TypeError, ValueError):
+        return jsonify({'message': 'maxPerCarpenter e daysPerOrder devem ser números'}), 400
+    except Exception as e:
+        return jsonify({'message': f'Erro interno: {str(e)}'}), 500
+
+@scheduling_bp.route('/scheduling/apply', methods=['POST'])
+@transactional()
+@token_required
+@admin_required
+def apply(current_user):
+    """Aplica um plano ({"assignments": [{"orderId", "carpenter"}]}) de forma atômica.
+
+    Se alguma ordem já tiver sido atribuída ou concluída desde a sugestão, nada
+    é gravado e a resposta 409 lista as ordens em conflito.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        assignments = data.get('assignments') or []
+        
+        if not assignments:
+            return jsonify({'message': 'Nenhuma atribuição informada'}), 400
+        if len(assignments) > MAX_ASSIGNMENTS_PER_APPLY:
+            return jsonify({'message': f'No máximo {MAX_ASSIGNMENTS_PER_APPLY} atribuições por vez'}), 400
+        if any(not a.get('orderId') or not a.get('carpenter') for a in assignments):
+            return jsonify({'message': 'Cada atribuição precisa de orderId e carpenter'}), 400
+        
+        order_ids = [a['orderId'] for a in assignments]
+        if len(set(order_ids)) != len(order_ids):
+            return jsonify({'message': 'Ordem repetida no plano'}), 400
+        
+        active = set(load_active_carpenter_names())
+        unknown = sorted({a['carpenter'] for a in assignments} - active)
+        if unknown:
+            return jsonify({'message': 'Marceneiros inexistentes ou inativos', 'carpenters': unknown}), 400
+        
+        updated = apply_assignments(assignments, datetime.utcnow())
+        if updated != len(assignments):
+            db.session.rollback()
+            return jsonify({
+                'message': 'O plano está desatualizado; nenhuma ordem foi alterada',
+                'conflicts': conflicting_orders(order_ids)
+            }), 409
+        
+        db.session.commit()
+        
+        return jsonify({
+            'message': 'Plano aplicado com sucesso',
+            'updated': updated
+        }), 200
+        
+    except OperationalError:
+        raise
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'Erro interno: {str(e)}'}), 500
@@ -1,9 +1,14 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from src.models.user import db, SystemConfig
 from src.routes.auth import token_required, admin_required
+from sqlalchemy.exc import OperationalError
+from src.utils.transactions import transactional
 
 system_config_bp = Blueprint("system_config", __name__)
 
+# O frontend consulta a URL global a cada 30 segundos; ela só muda quando o túnel muda
+BACKEND_URL_CACHE_CONTROL = "public, max-age=30"
+
 @system_config_bp.route("/system/config", methods=["GET"])
 @token_required
 def get_all_configs(current_user):
@@ -36,13 +41,16 @@ def get_backend_url():
     """Busca a URL do backend (rota pública para permitir configuração inicial)"""
     try:
         backend_url = SystemConfig.get_config("backend_url", "")
-        return jsonify({
+        response = jsonify({
             "backend_url": backend_url
-        }), 200
+        })
+        response.headers["Cache-Control"] = BACKEND_URL_CACHE_CONTROL
+        return response, 200
     except Exception as e:
         return jsonify({"message": f"Erro interno: {str(e)}"}), 500
 
 @system_config_bp.route("/system/config", methods=["POST"])
+@transactional()
 @token_required
 @admin_required
 def set_config(current_user):
@@ -75,11 +83,15 @@ def set_config(current_user):
             "config": config.to_dict()
         }), 200
         
+    except OperationalError:
+        # Banco ocupado: o @transactional faz rollback e repete a requisição
+        raise
     except Exception as e:
         db.session.rollback()
         return jsonify({"message": f"Erro interno: {str(e)}"}), 500
 
 @system_config_bp.route("/system/config/backend-url", methods=["POST"])
+@transactional()
 @token_required
 @admin_required
 def set_backend_url(current_user):
@@ -112,29 +124,41 @@ def set_backend_url(current_user):
             "backend_url": url
         }), 200
         
+    except OperationalError:
+        raise
     except Exception as e:
         db.session.rollback()
         return jsonify({"message": f"Erro interno: {str(e)}"}), 500
 
 @system_config_bp.route("/system/config/<string:key>", methods=["DELETE"])
+@transactional()
 @token_required
 @admin_required
 def delete_config(current_user, key):
     """Remove uma configuração"""
     try:
-        config = SystemConfig.query.filter_by(key=key).first()
-        if not config:
-            return jsonify({"message": "Configuração não encontrada"}), 404
-        
         # Não permitir deletar configurações críticas
         if key in ["backend_url"]:
             return jsonify({"message": "Esta configuração não pode ser removida"}), 400
         
-        db.session.delete(config)
-        db.session.commit()
+        if not SystemConfig.delete_config(key):
+            return jsonify({"message": "Configuração não encontrada"}), 404
         
         return jsonify({"message": "Configuração removida com sucesso"}), 200
         
+    except OperationalError:
+        raise
     except Exception as e:
         db.session.rollback()
-        return jsonify({"message": f"Erro interno: {str(e)}"}), 500
\ No newline at end of file
+        return jsonify({"message": f"Erro interno: {str(e)}"}), 500
+
+@system_config_bp.route("/system/rate-limits", methods=["GET"])
+@token_required
+@admin_required
+def get_rate_limit_stats(current_user):
+    """Contadores do rate limiter (requisições permitidas e limitadas por regra)"""
+    limiter = current_app.extensions.get("rate_limiter")
+    return jsonify({
+        "enabled": bool(limiter and limiter.enabled),
+        "rules": limiter.stats() if limiter else {}
+    }), 200
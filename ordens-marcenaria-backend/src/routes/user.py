@@ -1,5 +1,6 @@
 from flask import Blueprint, jsonify, request
 from src.models.user import User, db
+from src.utils.transactions import transactional
 
 user_bp = Blueprint('user', __name__)
 
@@ -9,6 +10,7 @@ def get_users():
     return jsonify([user.to_dict() for user in users])
 
 @user_bp.route('/users', methods=['POST'])
+@transactional()
 def create_user():
     
     data = request.json
@@ -23,6 +25,7 @@ def get_user(user_id):
     return jsonify(user.to_dict())
 
 @user_bp.route('/users/<int:user_id>', methods=['PUT'])
+@transactional()
 def update_user(user_id):
     user = User.query.get_or_404(user_id)
     data = request.json
@@ -32,6 +35,7 @@ def update_user(user_id):
     return jsonify(user.to_dict())
 
 @user_bp.route('/users/<int:user_id>', methods=['DELETE'])
+@transactional()
 def delete_user(user_id):
     user = User.query.get_or_404(user_id)
     db.session.delete(user)
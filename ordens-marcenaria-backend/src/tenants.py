@@ -0,0 +1,98 @@
+import os
+import sys
+import argparse
+# Mesmo ajuste de path do main.py, para rodar como "python src/tenants.py"
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from src.main import app
+from src.models.user import db, User
+from src.utils.backup import create_backup
+from src.utils.schema import upgrade_schema
+from src.utils.tenancy import DEFAULT_TENANT, tenant_registry, tenant_context, valid_tenant_name
+
+
+def database_path(tenant):
+    if tenant == DEFAULT_TENANT:
+        return db.engine.url.database
+    return tenant_registry.database_path(tenant)
+
+
+def selected_tenants(args):
+    if args.all:
+        return tenant_registry.known_tenants()
+    if not args.tenant:
+        sys.exit('Informe o nome da oficina ou --all')
+    if not tenant_registry.exists(args.tenant):
+        sys.exit(f'Oficina não encontrada: {args.tenant}')
+    return [args.tenant]
+
+
+def cmd_list(args):
+    for tenant in tenant_registry.known_tenants():
+        path = database_path(tenant)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        print(f'{tenant:30} {size / 1024 / 1024:8.1f} MB  {path}')
+
+
+def cmd_create(args):
+    """Cria o banco da oficina (tabelas e índices) com o administrador inicial"""
+    tenant = args.tenant
+    if not valid_tenant_name(tenant) or tenant == DEFAULT_TENANT:
+        sys.exit('Nome inválido: use letras minúsculas, números, "-" e "_"')
+    if tenant_registry.exists(tenant):
+        sys.exit(f'Oficina já existe: {tenant}')
+
+    os.makedirs(tenant_registry.directory, exist_ok=True)
+    with tenant_context(tenant):
+        admin = User(username='admin', email=args.admin_email, role='administrador')
+        admin.set_password(args.admin_password)
+        db.session.add(admin)
+        db.session.commit()
+    print(f'✅ Oficina {tenant} criada em {database_path(tenant)} (usuário admin)')
+
+
+def cmd_migrate(args):
+    """Aplica tabelas, colunas e índices novos em cada banco, um de cada vez"""
+    for tenant in selected_tenants(args):
+        engine = db.engine if tenant == DEFAULT_TENANT else tenant_registry.engine(tenant)
+        upgrade_schema(engine)
+        print(f'✅ {tenant}: esquema atualizado')
+
+
+def cmd_backup(args):
+    """Cópia online compactada de cada banco (ver src/backup.py para listar e restaurar)"""
+    for tenant in selected_tenants(args):
+        result = create_backup(database_path(tenant), args.dest, tenant,
+                               pages=app.config['BACKUP_PAGES_PER_STEP'],
+                               sleep=app.config['BACKUP_STEP_SLEEP_MS'] / 1000)
+        print(f"✅ {tenant}: {result['file']} ({result['copySeconds']}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Administração das oficinas (um banco SQLite por oficina)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('list', help='Lista as oficinas e o tamanho dos bancos').set_defaults(func=cmd_list)
+
+    create = commands.add_parser('create', help='Cria uma oficina nova')
+    create.add_argument('tenant')
+    create.add_argument('--admin-password', required=True)
+    create.add_argument('--admin-email', default='admin@example.com')
+    create.set_defaults(func=cmd_create)
+
+    for name, func, help_text in (('migrate', cmd_migrate, 'Atualiza o esquema do banco'),
+                                  ('backup', cmd_backup, 'Gera uma cópia do banco')):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument('tenant', nargs='?')
+        command.add_argument('--all', action='store_true', help='Todas as oficinas, inclusive a principal')
+        if name == 'backup':
+            command.add_argument('--dest', default=app.config['BACKUP_DIR'], help='Diretório das cópias')
+        command.set_defaults(func=func)
+
+    args = parser.parse_args()
+    with app.app_context():
+        args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+import math
+import threading
+import time
+from collections import deque
+
+from flask import g, jsonify, request
+
+from src.utils.metrics import LATENCY_BUCKETS, Histogram
+
+# Classes de rota em ordem de prioridade: login e escritas passam na frente das
+# leituras (o polling de 30s do frontend tenta de novo sozinho)
+ROUTE_CLASSES = ('auth', 'write', 'read')
+
+# Por classe: execuções simultâneas, fila de espera e espera máxima na fila (segundos).
+# Podem ser sobrescritos com app.config['ADMISSION_LIMITS'].
+# As escritas passam por uma conexão só (DB_WRITE_POOL_SIZE) e o GIL divide a CPU entre
+# as threads: mais vagas que isso só aumentam a latência de todas
+DEFAULT_ADMISSION_LIMITS = {
+    'auth': {'concurrency': 2, 'queue': 16, 'wait': 5},
+    'write': {'concurrency': 2, 'queue': 32, 'wait': 10},
+    'read': {'concurrency': 4, 'queue': 32, 'wait': 2},
+}
+
+# Fora do controle: o supervisor e o Prometheus precisam de resposta justamente na sobrecarga
+EXEMPT_ENDPOINTS = {'health_check', 'metrics', 'serve', 'static'}
+
+DEADLINE_HEADER = 'X-Request-Deadline'
+# Prazo vencido há mais que isso é relógio do cliente errado, não requisição atrasada: ignorado
+MAX_CLOCK_SKEW_SECONDS = 60
+
+
+class Shed(Exception):
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class RouteClassState:
+    def __init__(self, name, priority, concurrency, queue, wait):
+        self.name = name
+        self.priority = priority
+        self.concurrency = concurrency
+        self.max_queue = queue
+        self.max_wait = wait
+        self.in_flight = 0
+        self.waiting = deque()
+        self.admitted = 0
+        self.shed = {'queue_full': 0, 'timeout': 0, 'deadline': 0}
+        # Média móvel do tempo de execução, para estimar o Retry-After
+        self.service_time = 0.05
+        self.queue_wait = Histogram(LATENCY_BUCKETS)
+
+
+class AdmissionController:
+    """Controle de admissão por classe de rota (auth, write, read), em before_request.
+
+    Cada classe tem um limite de execuções simultâneas e uma fila limitada; o
+    total de execuções é limitado por ADMISSION_MAX_CONCURRENT. Quando há vaga,
+    ela vai para a fila de maior prioridade (auth, depois write, depois read).
+    A requisição é recusada com 503 + Retry-After quando a fila da classe está
+    cheia, quando a espera passa do máximo da classe ou quando o prazo enviado
+    pelo cliente (X-Request-Deadline, epoch em ms) já venceu ou vence na fila:
+    na sobrecarga quem entra continua rápido em vez de todas ficarem lentas.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self.max_concurrent = 8
+        self.classes = {}
+        self._cond = threading.Condition()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('ADMISSION_ENABLED', True)
+        self.max_concurrent = app.config.get('ADMISSION_MAX_CONCURRENT', 8)
+        limits = {name: dict(spec) for name, spec in DEFAULT_ADMISSION_LIMITS.items()}
+        for name, spec in app.config.get('ADMISSION_LIMITS', {}).items():
+            limits[name].update(spec)
+        self.classes = {
+            name: RouteClassState(name, priority, **limits[name])
+            for priority, name in enumerate(ROUTE_CLASSES)
+        }
+        app.before_request(self.admit_request)
+        app.teardown_request(self.release_request)
+        app.extensions['admission_controller'] = self
+
+    @staticmethod
+    def route_class(endpoint, method):
+        if endpoint.startswith('auth.'):
+            return 'auth'
+        return 'read' if method in ('GET', 'HEAD') else 'write'
+
+    @staticmethod
+    def client_deadline():
+        """Prazo do cliente em time.time(), ou None sem cabeçalho (ou com valor inválido)"""
+        value = request.headers.get(DEADLINE_HEADER)
+        if not value:
+            return None
+        try:
+            deadline = int(value) / 1000
+        except ValueError:
+            return None
+        return deadline if deadline > time.time() - MAX_CLOCK_SKEW_SECONDS else None
+
+    def _total_in_flight(self):
+        return sum(state.in_flight for state in self.classes.values())
+
+    def _has_room(self, state):
+        return state.in_flight < state.concurrency and self._total_in_flight() < self.max_concurrent
+
+    def _next_in_line(self, state):
+        """A vaga é desta classe se nenhuma classe mais prioritária tem fila e vaga para ela"""
+        for other in self.classes.values():
+            if other.priority < state.priority and other.waiting and self._has_room(other):
+                return False
+        return True
+
+    def _retry_after(self, state):
+        # Tempo para a fila atual andar, arredondado para cima (mínimo 1s)
+        backlog = (len(state.waiting) + state.in_flight + 1) * state.service_time
+        return max(1, math.ceil(backlog / max(1, state.concurrency)))
+
+    def acquire(self, name, deadline=None):
+        """Reserva uma vaga na classe (esperando na fila se preciso) ou levanta Shed"""
+        state = self.classes[name]
+        started = time.monotonic()
+        with self._cond:
+            if deadline is not None and deadline <= time.time():
+                state.shed['deadline'] += 1
+                raise Shed('deadline', self._retry_after(state))
+
+            if not state.waiting and self._has_room(state) and self._next_in_line(state):
+                state.in_flight += 1
+                state.admitted += 1
+                state.queue_wait.observe(0)
+                return
+
+            if len(state.waiting) >= state.max_queue:
+                state.shed['queue_full'] += 1
+                raise Shed('queue_full', self._retry_after(state))
+
+            ticket = object()
+            state.waiting.append(ticket)
+            wait_limit = state.max_wait
+            reason = 'timeout'
+            if deadline is not None and deadline - time.time() < wait_limit:
+                wait_limit = deadline - time.time()
+                reason = 'deadline'
+            give_up_at = started + wait_limit
+            try:
+                while not (state.waiting[0] is ticket and self._has_room(state) and self._next_in_line(state)):
+                    remaining = give_up_at - time.monotonic()
+                    if remaining <= 0:
+                        state.shed[reason] += 1
+                        raise Shed(reason, self._retry_after(state))
+                    self._cond.wait(remaining)
+                state.in_flight += 1
+                state.admitted += 1
+                state.queue_wait.observe(time.monotonic() - started)
+            finally:
+                state.waiting.remove(ticket)
+                # Quem estava atrás deste na fila pode ter virado o primeiro
+                self._cond.notify_all()
+
+    def release(self, name, elapsed):
+        state = self.classes[name]
+        with self._cond:
+            state.in_flight -= 1
+            state.service_time = state.service_time * 0.9 + elapsed * 0.1
+            self._cond.notify_all()
+
+    def admit_request(self):
+        if not self.enabled or request.method == 'OPTIONS' or not request.endpoint:
+            return None
+        if request.endpoint in EXEMPT_ENDPOINTS:
+            return None
+
+        name = self.route_class(request.endpoint, request.method)
+        try:
+            self.acquire(name, self.client_deadline())
+        except Shed as shed:
+            response = jsonify({
+                'message': 'Servidor sobrecarregado. Tente novamente em instantes.',
+                'reason': shed.reason,
+            })
+            response.status_code = 503
+            response.headers['Retry-After'] = str(shed.retry_after)
+            return response
+        g._admission = (name, time.monotonic())
+        return None
+
+    def release_request(self, exc):
+        # teardown roda mesmo com exceção na view: a vaga nunca vaza
+        admission = g.pop('_admission', None)
+        if admission is not None:
+            name, started = admission
+            self.release(name, time.monotonic() - started)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'maxConcurrent': self.max_concurrent,
+                'classes': {
+                    name: {
+                        'inFlight': state.in_flight,
+                        'queued': len(state.waiting),
+                        'admitted': state.admitted,
+                        'shed': dict(state.shed),
+                        'serviceTimeMs': round(state.service_time * 1000, 1),
+                    }
+                    for name, state in self.classes.items()
+                },
+            }
+
+    def collect_metrics(self):
+        """Vagas, filas e recusas no formato de RequestMetrics.register_collector"""
+        with self._cond:
+            states = list(self.classes.values())
+            in_flight = [({'class': state.name}, state.in_flight) for state in states]
+            queued = [({'class': state.name}, len(state.waiting)) for state in states]
+            admitted = [({'class': state.name}, state.admitted) for state in states]
+            shed = [({'class': state.name, 'reason': reason}, count)
+                    for state in states for reason, count in state.shed.items()]
+            waits = [sample for state in states
+                     for sample in state.queue_wait.samples('admission_queue_wait_seconds', {'class': state.name})]
+        return [
+            ('admission_in_flight', 'gauge', 'Requisições em execução por classe de rota', in_flight),
+            ('admission_queued', 'gauge', 'Requisições esperando vaga por classe de rota', queued),
+            ('admission_admitted_total', 'counter', 'Requisições admitidas por classe de rota', admitted),
+            ('admission_shed_total', 'counter',
+             'Requisições recusadas com 503 (queue_full, timeout na fila, deadline do cliente)', shed),
+            ('admission_queue_wait_seconds', 'histogram', 'Espera na fila antes da execução', waits),
+        ]
+
+
+admission_controller = AdmissionController()
@@ -0,0 +1,193 @@
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import Integer, case, cast, func, literal, select, union_all
+
+from src.models.user import db, Order, ArchivedOrder
+
+# Agrupamentos aceitos em ?groupBy=
+GROUP_BY_OPTIONS = ('carpenter', 'week', 'month', 'none')
+
+NO_CARPENTER = 'Sem marceneiro'
+
+# Faixas de idade (dias desde a entrada) do backlog
+BACKLOG_AGE_BUCKETS = ((0, 7), (8, 30), (31, 90), (91, None))
+
+
+def parse_period(args, default_days):
+    """Lê ?from= e ?to= (YYYY-MM-DD); sem eles, os últimos default_days dias até hoje"""
+    today = date.today()
+    end = datetime.strptime(args['to'], '%Y-%m-%d').date() if args.get('to') else today
+    start = (datetime.strptime(args['from'], '%Y-%m-%d').date() if args.get('from')
+             else end - timedelta(days=default_days - 1))
+    if start > end:
+        raise ValueError('from deve ser anterior a to')
+    return start, end
+
+
+def completed_orders(start, end, carpenter=None):
+    """Ordens concluídas no período, ativas e arquivadas, já com as colunas dos relatórios.
+
+    Cada lado do UNION filtra por (status, completed_at), que tem índice nas duas tabelas.
+    """
+    start_at = datetime.combine(start, datetime.min.time())
+    end_at = datetime.combine(end + timedelta(days=1), datetime.min.time())
+
+    selects = []
+    for model in (Order, ArchivedOrder):
+        query = (select(func.coalesce(model.carpenter, NO_CARPENTER).label('carpenter'),
+                        model.entry_date.label('entry_date'),
+                        model.exit_date.label('exit_date'),
+                        func.date(model.completed_at).label('completed_on'))
+                 .where(model.status == 'concluida',
+                        model.completed_at >= start_at,
+                        model.completed_at < end_at))
+        if carpenter:
+            query = query.where(model.carpenter == carpenter)
+        selects.append(query)
+    return union_all(*selects).subquery('completed')
+
+
+def group_column(source, group_by):
+    """Expressão de agrupamento sobre a data de conclusão ou o marceneiro"""
+    if group_by == 'carpenter':
+        return source.c.carpenter
+    if group_by == 'week':
+        # Segunda-feira da semana da conclusão
+        return func.date(source.c.completed_on, 'weekday 0', '-6 days')
+    if group_by == 'month':
+        return func.strftime('%Y-%m', source.c.completed_on)
+    return literal('total')
+
+
+def lead_times(start, end, carpenter=None, group_by='carpenter'):
+    """Lead time (entrada → conclusão, em dias): média, mínimo, máximo, p50 e p90 por grupo"""
+    source = completed_orders(start, end, carpenter)
+    group = group_column(source, group_by).label('grp')
+    lead = (func.julianday(source.c.completed_on) - func.julianday(source.c.entry_date)).label('lead')
+
+    # Percentis por posição (nearest-rank) com funções de janela
+    ranked = select(
+        group,
+        lead,
+        func.row_number().over(partition_by=group, order_by=lead).label('rn'),
+        func.count().over(partition_by=group).label('n'),
+    ).subquery('ranked')
+
+    def percentile(fraction):
+        position = cast(fraction * (ranked.c.n - 1), Integer) + 1
+        return func.max(case((ranked.c.rn == position, ranked.c.lead)))
+
+    rows = db.session.execute(
+        select(ranked.c.grp,
+               func.count(),
+               func.avg(ranked.c.lead),
+               func.min(ranked.c.lead),
+               func.max(ranked.c.lead),
+               percentile(0.5),
+               percentile(0.9))
+        .group_by(ranked.c.grp)
+        .order_by(ranked.c.grp)
+    ).all()
+
+    return [{
+        'group': grp,
+        'completed': count,
+        'avgDays': round(avg, 1),
+        'minDays': round(minimum, 1),
+        'maxDays': round(maximum, 1),
+        'p50Days': round(p50, 1),
+        'p90Days': round(p90, 1),
+    } for grp, count, avg, minimum, maximum, p50, p90 in rows]
+
+
+def on_time_rate(start, end, carpenter=None, group_by='carpenter'):
+    """Proporção de ordens concluídas até a data de saída prometida"""
+    source = completed_orders(start, end, carpenter)
+    group = group_column(source, group_by).label('grp')
+    on_time = func.sum(case((source.c.completed_on <= source.c.exit_date, 1), else_=0))
+    days_late = func.julianday(source.c.completed_on) - func.julianday(source.c.exit_date)
+
+    rows = db.session.execute(
+        select(group,
+               func.count(),
+               on_time,
+               func.avg(case((days_late > 0, days_late))))
+        .group_by(group)
+        .order_by(group)
+    ).all()
+
+    return [{
+        'group': grp,
+        'completed': count,
+        'onTime': punctual,
+        'late': count - punctual,
+        'onTimeRate': round(punctual / count, 3) if count else None,
+        'avgDaysLate': round(avg_late, 1) if avg_late is not None else None,
+    } for grp, count, punctual, avg_late in rows]
+
+
+def weekly_throughput(start, end, carpenter=None):
+    """Ordens concluídas por semana (segunda-feira) e por marceneiro, com semanas vazias zeradas"""
+    source = completed_orders(start, end, carpenter)
+    week = group_column(source, 'week').label('week')
+
+    rows = db.session.execute(
+        select(week, source.c.carpenter, func.count())
+        .group_by(week, source.c.carpenter)
+    ).all()
+
+    counts = {}
+    for week_start, name, count in rows:
+        counts.setdefault(week_start, {})[name] = count
+
+    weeks = []
+    week_start = start - timedelta(days=start.weekday())
+    while week_start <= end:
+        by_carpenter = counts.get(week_start.isoformat(), {})
+        weeks.append({
+            'weekStart': week_start.isoformat(),
+            'completed': sum(by_carpenter.values()),
+            'byCarpenter': by_carpenter,
+        })
+        week_start += timedelta(days=7)
+    return weeks
+
+
+def backlog_age(carpenter=None, group_by='carpenter', as_of=None):
+    """Ordens em aberto: quantidade, idade média/máxima, atrasadas e faixas de idade por grupo"""
+    as_of = as_of or date.today()
+    age = func.julianday(literal(as_of.isoformat())) - func.julianday(Order.entry_date)
+    group = (func.coalesce(Order.carpenter, NO_CARPENTER) if group_by == 'carpenter'
+             else literal('total')).label('grp')
+
+    buckets = []
+    for low, high in BACKLOG_AGE_BUCKETS:
+        condition = age >= low if high is None else age.between(low, high)
+        buckets.append(func.sum(case((condition, 1), else_=0)))
+
+    query = (select(group,
+                    func.count(),
+                    func.avg(age),
+                    func.max(age),
+                    func.sum(case((Order.exit_date < as_of, 1), else_=0)),
+                    *buckets)
+             .where(Order.status != 'concluida')
+             .group_by(group)
+             .order_by(group))
+    if carpenter:
+        query = query.where(Order.carpenter == carpenter)
+
+    result = []
+    for grp, count, avg_age, max_age, overdue, *bucket_counts in db.session.execute(query).all():
+        result.append({
+            'group': grp,
+            'open': count,
+            'avgAgeDays': round(avg_age, 1),
+            'maxAgeDays': round(max_age, 1),
+            'overdue': overdue,
+            'ageBuckets': {
+                (f'{low}-{high}' if high is not None else f'{low}+'): bucket_count
+                for (low, high), bucket_count in zip(BACKLOG_AGE_BUCKETS, bucket_counts)
+            },
+        })
+    return result
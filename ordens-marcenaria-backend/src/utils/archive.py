@@ -0,0 +1,142 @@
+import logging
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import insert, literal, select
+
+from src.models.user import (db, Order, Material, Delivery,
+                             ArchivedOrder, ArchivedMaterial, ArchivedDelivery)
+from src.utils.transactions import immediate_transaction
+from src.utils.jobs import job_handler
+
+logger = logging.getLogger('archive')
+
+# Pares (tabela quente, tabela de arquivo), na ordem de cópia exigida pelas chaves estrangeiras
+ARCHIVE_TABLES = (
+    (Order.__table__, ArchivedOrder.__table__),
+    (Material.__table__, ArchivedMaterial.__table__),
+    (Delivery.__table__, ArchivedDelivery.__table__),
+)
+
+# Colunas que o arquivo não copia. material.id é rowid sem AUTOINCREMENT: depois que os
+# materiais saem da tabela quente o SQLite reusa os ids, então o arquivo gera os seus
+NOT_COPIED = {ArchivedMaterial.__table__: {'id'}}
+
+
+def _copy_rows(source, target, where, archived_at):
+    """INSERT ... SELECT das colunas em comum, preenchendo archived_at"""
+    skipped = NOT_COPIED.get(target, ())
+    columns = [column.name for column in target.columns
+               if column.name in source.columns and column.name not in skipped]
+    query = select(*[source.c[name] for name in columns],
+                   literal(archived_at).label('archived_at')).where(where)
+    return db.session.execute(insert(target).from_select(columns + ['archived_at'], query)).rowcount
+
+
+def _order_filter(table, order_ids):
+    return (table.c.id if table is Order.__table__ else table.c.order_id).in_(order_ids)
+
+
+# Limites do tamanho de lote (cada lote segura o lock de escrita do SQLite)
+MAX_BATCH_SIZE = 5000
+
+
+def archive_parameters(data):
+    """(olderThanDays, batchSize) do corpo da requisição ou do payload do job, com os padrões
+    da configuração; ValueError com a mensagem para o cliente quando inválidos"""
+    config = current_app.config
+    try:
+        older_than_days = int(data.get('olderThanDays', config['ARCHIVE_AFTER_DAYS']))
+        batch_size = int(data.get('batchSize', config['ARCHIVE_BATCH_SIZE']))
+    except (TypeError, ValueError):
+        raise ValueError('olderThanDays e batchSize devem ser números inteiros')
+    if older_than_days < 0 or not 0 < batch_size <= MAX_BATCH_SIZE:
+        raise ValueError(f'olderThanDays não pode ser negativo e batchSize deve estar entre 1 e {MAX_BATCH_SIZE}')
+    return older_than_days, batch_size
+
+
+def eligible_filter(cutoff):
+    # Pela conclusão, não pelo updated_at: editar uma ordem concluída não adia o arquivamento.
+    # Usa o índice (status, completed_at); o upgrade_schema preenche completed_at das antigas
+    return (Order.status == 'concluida') & (Order.completed_at < cutoff)
+
+
+def conflict_filter():
+    """Ordens cujo id, ou o de uma das entregas, já está no arquivo (criadas antes da
+    verificação nas views): ficam na tabela quente em vez de derrubar o lote inteiro"""
+    return (select(ArchivedOrder.id).where(ArchivedOrder.id == Order.id).exists()
+            | select(Delivery.id).join(ArchivedDelivery, ArchivedDelivery.id == Delivery.id)
+            .where(Delivery.order_id == Order.id).exists())
+
+
+def archivable_filter(cutoff):
+    return eligible_filter(cutoff) & ~conflict_filter()
+
+
+def archive_batch(cutoff, batch_size):
+    """Move um lote de ordens concluídas antes de `cutoff` (com materiais e entregas) para o arquivo"""
+    counts = {'orders': 0, 'materials': 0, 'deliveries': 0}
+    with immediate_transaction():
+        order_ids = [row[0] for row in db.session.query(Order.id)
+                     .filter(archivable_filter(cutoff))
+                     .order_by(Order.completed_at)
+                     .limit(batch_size)]
+        if not order_ids:
+            return counts
+
+        archived_at = datetime.utcnow()
+        for (source, target), key in zip(ARCHIVE_TABLES, ('orders', 'materials', 'deliveries')):
+            counts[key] = _copy_rows(source, target, _order_filter(source, order_ids), archived_at)
+
+        # Apaga na ordem inversa (filhos antes da ordem)
+        for source, _ in reversed(ARCHIVE_TABLES):
+            db.session.execute(source.delete().where(_order_filter(source, order_ids)))
+    return counts
+
+
+def archive_completed_orders(older_than_days, batch_size=500, max_batches=None, progress=None):
+    """Arquiva em lotes todas as ordens concluídas há mais de `older_than_days` dias.
+
+    Cada lote é uma transação curta, para não segurar o lock de escrita do
+    SQLite enquanto o arquivo inteiro é processado. `progress(totais)` é chamado
+    após cada lote. Ordens que colidem com o arquivo (conflict_filter) ficam de
+    fora e são contadas em `skipped`.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    totals = {'orders': 0, 'materials': 0, 'deliveries': 0, 'batches': 0}
+    while max_batches is None or totals['batches'] < max_batches:
+        counts = archive_batch(cutoff, batch_size)
+        if not counts['orders']:
+            break
+        for key, value in counts.items():
+            totals[key] += value
+        totals['batches'] += 1
+        if progress:
+            progress(dict(totals))
+
+    totals['skipped'] = db.session.query(Order.id).filter(eligible_filter(cutoff), conflict_filter()).count()
+    db.session.rollback()
+    if totals['skipped']:
+        logger.warning('%d ordem(ns) não arquivada(s): id da ordem ou de uma entrega já está no arquivo',
+                       totals['skipped'])
+    return totals
+
+
+@job_handler('archive_orders')
+def archive_orders_job(payload, context):
+    """Job periódico/manual de arquivamento, com progresso pelo total de ordens elegíveis"""
+    older_than_days, batch_size = archive_parameters(payload)
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    eligible = db.session.query(Order.id).filter(archivable_filter(cutoff)).count()
+    db.session.rollback()
+
+    def progress(totals):
+        context.report_progress(totals['orders'] / eligible if eligible else 1.0,
+                                f"{totals['orders']} de {eligible} ordens arquivadas")
+
+    return archive_completed_orders(older_than_days, batch_size=batch_size, progress=progress)
+
+
+def archived_requested(args):
+    """?archived=true pede os registros arquivados em vez do conjunto ativo"""
+    return args.get('archived', '').lower() in ('1', 'true', 'sim')
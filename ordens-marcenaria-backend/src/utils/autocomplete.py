@@ -0,0 +1,291 @@
+import heapq
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+
+from sqlalchemy import event, func, select, union_all
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, attributes
+
+from src.models.user import (db, Material, MaterialCatalog, Delivery,
+                             ArchivedMaterial, ArchivedDelivery)
+from src.utils.cache import reference_cache
+from src.utils.material_catalog import display_name
+from src.utils.tenancy import DEFAULT_TENANT, current_tenant
+
+# Campo da API -> (modelo, atributo) das tabelas ativas e de arquivo. O arquivo entra na
+# contagem: arquivar uma ordem não muda as sugestões
+FIELDS = {
+    'material': ((Material, 'description'), (ArchivedMaterial, 'description')),
+    'address': ((Delivery, 'delivery_address'), (ArchivedDelivery, 'delivery_address')),
+}
+
+# Só o final do intervalo de prefixos: nenhuma chave normalizada passa deste caractere
+_PREFIX_END = '\uffff'
+
+# Prefixos curtos (o começo da digitação) cobrem boa parte da lista: o resultado
+# fica guardado até o próximo commit que mexe no índice
+MEMO_PREFIX_LENGTH = 2
+
+
+def normalize(value):
+    """Mesma chave do catálogo de materiais: sem acentos, minúsculas e espaços simples"""
+    return MaterialCatalog.normalize(value)
+
+
+class PrefixIndex:
+    """Valores distintos de um campo em uma lista ordenada pela forma normalizada.
+
+    Cada chave guarda a forma exibida e quantas linhas usam o valor; a busca
+    por prefixo é um intervalo da lista (duas buscas binárias) ordenado pela
+    frequência.
+    """
+
+    def __init__(self, version, counts):
+        self.version = version
+        # normalizado -> [forma exibida, usos]
+        self.entries = counts
+        self.keys = sorted(counts)
+        self._memo = {}
+
+    @classmethod
+    def from_rows(cls, version, rows):
+        """rows: (valor como foi digitado, usos); variações do mesmo valor são somadas
+        e a forma mais usada é a exibida"""
+        counts = {}
+        spellings = {}
+        for value, count in rows:
+            normalized = normalize(value)
+            if not normalized:
+                continue
+            spellings.setdefault(normalized, Counter())[display_name(value)] += count
+        for normalized, forms in spellings.items():
+            counts[normalized] = [forms.most_common(1)[0][0], sum(forms.values())]
+        return cls(version, counts)
+
+    def apply(self, deltas):
+        """Soma as variações de uso {valor: +n/-n} vindas de um commit"""
+        self._memo.clear()
+        for value, delta in deltas.items():
+            normalized = normalize(value)
+            if not normalized or not delta:
+                continue
+            entry = self.entries.get(normalized)
+            if entry is None:
+                if delta > 0:
+                    self.entries[normalized] = [display_name(value), delta]
+                    insort(self.keys, normalized)
+                continue
+            entry[1] += delta
+            if entry[1] <= 0:
+                del self.entries[normalized]
+                del self.keys[bisect_left(self.keys, normalized)]
+
+    def search(self, prefix, limit):
+        prefix = normalize(prefix)
+        if len(prefix) > MEMO_PREFIX_LENGTH:
+            return self._search(prefix, limit)
+        result = self._memo.get((prefix, limit))
+        if result is None:
+            result = self._memo[(prefix, limit)] = self._search(prefix, limit)
+        return result
+
+    def _search(self, prefix, limit):
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + _PREFIX_END, start) if prefix else len(self.keys)
+        entries = self.entries
+        best = heapq.nsmallest(limit, self.keys[start:end], key=lambda key: (-entries[key][1], key))
+        return [{'value': entries[key][0], 'count': entries[key][1]} for key in best]
+
+    def __len__(self):
+        return len(self.keys)
+
+
+class AutocompleteIndex:
+    """Sugestões de descrições de materiais e endereços de entrega, em memória.
+
+    O índice de cada campo (por oficina) é montado na primeira consulta, ou no
+    warm() da inicialização, com um GROUP BY nas tabelas ativas e de arquivo.
+    Depois disso os flushes do ORM acumulam na conexão as variações de uso
+    (inserções, alterações, exclusões, inclusive DELETE em lote pela sessão) e
+    o commit as aplica ao índice, sem consultar o banco.
+
+    Cada campo tem uma versão no ReferenceCache, trocada a cada commit que
+    escreve nas suas tabelas. Quando a versão muda sem passar por aqui (outro
+    processo, arquivamento, SQL fora da sessão), o índice é remontado na
+    próxima consulta.
+    """
+
+    def __init__(self, app=None):
+        self._indexes = {}
+        self._lock = threading.Lock()
+        self._rebuilds = Counter()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        # O commit do ReferenceCache troca a versão antes do nosso listener de commit ler a nova
+        for field, sources in FIELDS.items():
+            reference_cache.invalidate_on_write(self.namespace(field),
+                                                *(model.__table__.name for model, _ in sources))
+        for model, _ in (sources[0] for sources in FIELDS.values()):
+            event.listen(model, 'after_insert', self._after_insert)
+            event.listen(model, 'after_update', self._after_update)
+            event.listen(model, 'after_delete', self._after_delete)
+        event.listen(Session, 'do_orm_execute', self._orm_execute)
+        event.listen(Engine, 'commit', self._commit)
+        event.listen(Engine, 'rollback', self._rollback)
+        event.listen(Engine, 'rollback_savepoint', self._rollback_savepoint)
+        app.extensions['autocomplete_index'] = self
+
+    @staticmethod
+    def namespace(field):
+        return f'autocomplete.{field}'
+
+    @staticmethod
+    def _tenant():
+        return current_tenant() or DEFAULT_TENANT
+
+    def _version(self, field):
+        return reference_cache.versions([self.namespace(field)])[0]
+
+    @staticmethod
+    def _load_rows(field):
+        queries = [select(getattr(model, column).label('value'), func.count().label('uses'))
+                   .group_by(getattr(model, column))
+                   for model, column in FIELDS[field]]
+        return db.session.execute(union_all(*queries)).all()
+
+    def index(self, field):
+        """Índice do campo na oficina atual, remontado se a versão mudou"""
+        key = (self._tenant(), field)
+        version = self._version(field)
+        index = self._indexes.get(key)
+        if index is not None and index.version == version:
+            return index
+
+        # A versão é lida antes da consulta: um commit no meio deixa o índice já vencido
+        index = PrefixIndex.from_rows(version, self._load_rows(field))
+        with self._lock:
+            self._indexes[key] = index
+            self._rebuilds[field] += 1
+        return index
+
+    def search(self, field, prefix, limit=10):
+        index = self.index(field)
+        with self._lock:
+            return index.search(prefix, limit)
+
+    def warm(self):
+        """Monta os índices da oficina atual (inicialização do servidor)"""
+        for field in FIELDS:
+            self.index(field)
+
+    # --- variações de uso acumuladas por transação, em conn.info ---
+
+    def _pending(self, connection, field):
+        pending = connection.info.setdefault('autocomplete_pending', {})
+        state = pending.get(field)
+        if state is None:
+            # Primeira escrita da transação no campo: com BEGIN IMMEDIATE o lock de escrita
+            # do SQLite já é nosso, então a versão lida aqui só muda de novo com o nosso commit
+            state = pending[field] = {'tenant': self._tenant(), 'base': self._version(field),
+                                      'deltas': Counter(), 'complete': True}
+        return state
+
+    @staticmethod
+    def _field_of(model):
+        for field, sources in FIELDS.items():
+            if model is sources[0][0]:
+                return field, sources[0][1]
+        return None, None
+
+    def _after_insert(self, mapper, connection, target):
+        field, column = self._field_of(mapper.class_)
+        self._pending(connection, field)['deltas'][getattr(target, column)] += 1
+
+    def _after_update(self, mapper, connection, target):
+        field, column = self._field_of(mapper.class_)
+        history = attributes.get_history(target, column)
+        if not history.has_changes():
+            # Escreveu na tabela sem mudar o campo: só registra a transação (versão esperada)
+            self._pending(connection, field)
+            return
+        deltas = self._pending(connection, field)['deltas']
+        for value in history.deleted:
+            deltas[value] -= 1
+        for value in history.added:
+            deltas[value] += 1
+
+    def _after_delete(self, mapper, connection, target):
+        field, column = self._field_of(mapper.class_)
+        value = attributes.get_history(target, column).deleted or [getattr(target, column)]
+        self._pending(connection, field)['deltas'][value[0]] -= 1
+
+    def _orm_execute(self, orm_execute_state):
+        """INSERT/UPDATE/DELETE executados pela sessão fora do flush (Query.delete(), arquivamento)"""
+        if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+            return
+        statement = orm_execute_state.statement
+        table = getattr(getattr(statement, 'table', None), 'name', None)
+        for field, sources in FIELDS.items():
+            for position, (model, column) in enumerate(sources):
+                if table != model.__table__.name:
+                    continue
+                session = orm_execute_state.session
+                state = self._pending(session.connection(), field)
+                # INSERT em lote (seed, arquivamento) e UPDATE não trazem os valores: remonta depois
+                where = statement.whereclause if orm_execute_state.is_delete else None
+                if position == 0 and where is not None:
+                    # DELETE em lote na tabela ativa: os valores apagados saem da contagem
+                    for value in session.execute(select(getattr(model, column)).where(where)).scalars():
+                        state['deltas'][value] -= 1
+                else:
+                    state['complete'] = False
+
+    def _commit(self, conn):
+        pending = conn.info.pop('autocomplete_pending', None)
+        if not pending:
+            return
+        for field, state in pending.items():
+            key = (state['tenant'], field)
+            with self._lock:
+                index = self._indexes.get(key)
+                if index is None:
+                    continue
+                if state['complete'] and index.version == state['base']:
+                    index.apply(state['deltas'])
+                    index.version = self._version(field)
+                else:
+                    # Alguém escreveu antes sem passar por aqui: remonta na próxima consulta
+                    del self._indexes[key]
+
+    def _rollback(self, conn):
+        conn.info.pop('autocomplete_pending', None)
+
+    def _rollback_savepoint(self, conn, name, context):
+        # O que o savepoint desfez não é separável do resto: remonta depois do commit
+        for state in conn.info.get('autocomplete_pending', {}).values():
+            state['complete'] = False
+
+    def stats(self):
+        with self._lock:
+            return {
+                'indexes': {f'{tenant}.{field}': len(index) for (tenant, field), index in self._indexes.items()},
+                'rebuilds': dict(self._rebuilds),
+            }
+
+    def collect_metrics(self):
+        """Tamanho dos índices e remontagens no formato de RequestMetrics.register_collector"""
+        with self._lock:
+            sizes = [({'tenant': tenant, 'field': field}, len(index))
+                     for (tenant, field), index in sorted(self._indexes.items())]
+            rebuilds = [({'field': field}, self._rebuilds[field]) for field in FIELDS]
+        return [
+            ('autocomplete_index_values', 'gauge', 'Valores distintos no índice de sugestões', sizes),
+            ('autocomplete_index_rebuilds_total', 'counter',
+             'Montagens do índice a partir do banco (inicialização ou escrita de fora da sessão)', rebuilds),
+        ]
+
+
+autocomplete_index = AutocompleteIndex()
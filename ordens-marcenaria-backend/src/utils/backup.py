@@ -0,0 +1,254 @@
+import gzip
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+
+from src.models.user import db
+from src.utils.jobs import job_handler
+from src.utils.tenancy import DEFAULT_TENANT, current_tenant
+
+# <banco>-AAAAMMDD-HHMMSS.db.gz
+BACKUP_NAME_PATTERN = re.compile(r'^(?P<name>.+)-(?P<stamp>\d{8}-\d{6})\.db\.gz$')
+
+# Tabelas que uma cópia precisa ter para ser restaurada
+REQUIRED_TABLES = ('user', 'order', 'material', 'carpenter')
+
+
+class BackupRestarted(Exception):
+    """O banco foi alterado tantas vezes durante a cópia incremental que ela não termina"""
+
+
+class WriteLockProbe:
+    """Mede, em paralelo à cópia, quanto uma escrita espera pelo lock do banco.
+
+    Cada amostra é um BEGIN IMMEDIATE seguido de ROLLBACK: pega o lock de
+    escrita como uma requisição faria, sem alterar nada (uma alteração
+    reiniciaria a cópia).
+    """
+
+    def __init__(self, path, interval=0.1, timeout=30):
+        self.path = path
+        self.interval = interval
+        self.timeout = timeout
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='backup-write-probe', daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+        try:
+            while not self._stop.wait(self.interval):
+                start = time.perf_counter()
+                conn.execute('BEGIN IMMEDIATE')
+                self.samples.append(time.perf_counter() - start)
+                conn.execute('ROLLBACK')
+        finally:
+            conn.close()
+
+    def report(self):
+        samples = sorted(self.samples)
+        if not samples:
+            return {'samples': 0}
+        return {
+            'samples': len(samples),
+            'p50Ms': round(samples[len(samples) // 2] * 1000, 2),
+            'p99Ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000, 2),
+            'maxMs': round(samples[-1] * 1000, 2),
+        }
+
+
+def backup_directory():
+    return current_app.config['BACKUP_DIR']
+
+
+def current_database():
+    """(nome, arquivo) do banco da oficina atual; o principal quando não há multi-oficina"""
+    tenant = current_tenant() or DEFAULT_TENANT
+    return tenant, db.session.get_bind().url.database
+
+
+def copy_database(source_path, target_path, pages=256, sleep=0.05, max_restarts=5):
+    """Cópia online com a API de backup do SQLite, em passos de `pages` páginas.
+
+    Entre um passo e outro o lock de leitura é solto e as requisições continuam
+    escrevendo. Uma escrita feita por outra conexão faz o SQLite recomeçar a
+    cópia; depois de max_restarts recomeços a cópia termina em um passo só
+    (em WAL isso segura apenas um snapshot de leitura, sem bloquear escritas).
+    """
+    stats = {'steps': 0, 'restarts': 0, 'pages': 0, 'singleStep': False}
+    last_remaining = None
+
+    def progress(status, remaining, total):
+        nonlocal last_remaining
+        stats['steps'] += 1
+        stats['pages'] = total
+        # Depois de um recomeço o passo seguinte não avança (ou volta) em relação ao anterior
+        if last_remaining is not None and remaining >= last_remaining:
+            stats['restarts'] += 1
+            if stats['restarts'] > max_restarts:
+                raise BackupRestarted()
+        last_remaining = remaining
+        # O sleep do sqlite3.backup só vale quando o passo volta BUSY; a pausa entre
+        # passos (com os locks soltos) fica aqui
+        if remaining and sleep:
+            time.sleep(sleep)
+
+    source = sqlite3.connect(source_path)
+    try:
+        target = sqlite3.connect(target_path)
+        try:
+            try:
+                source.backup(target, pages=pages, progress=progress)
+            except BackupRestarted:
+                stats['singleStep'] = True
+                source.backup(target, pages=-1)
+        finally:
+            target.close()
+    finally:
+        source.close()
+    return stats
+
+
+def verify_database(path):
+    """integrity_check e presença das tabelas principais; retorna a lista de problemas"""
+    problems = []
+    conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        result = [row[0] for row in conn.execute('PRAGMA integrity_check').fetchall()]
+        if result != ['ok']:
+            problems.extend(result)
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        problems.extend(f'tabela ausente: {name}' for name in REQUIRED_TABLES if name not in tables)
+    except sqlite3.DatabaseError as e:
+        problems.append(str(e))
+    finally:
+        conn.close()
+    return problems
+
+
+def create_backup(source_path, dest_dir, name, pages=256, sleep=0.05, keep=None):
+    """Cópia online + verificação + gzip em dest_dir/<name>-<data>.db.gz; aplica a retenção"""
+    os.makedirs(dest_dir, exist_ok=True)
+    stamp = datetime.utcnow().strftime('%Y%m%d-%H%M%S')
+    archive_path = os.path.join(dest_dir, f'{name}-{stamp}.db.gz')
+    temp_path = os.path.join(dest_dir, f'.{name}-{stamp}.db.tmp')
+
+    started = time.perf_counter()
+    try:
+        with WriteLockProbe(source_path) as probe:
+            stats = copy_database(source_path, temp_path, pages=pages, sleep=sleep)
+        copy_seconds = time.perf_counter() - started
+
+        problems = verify_database(temp_path)
+        if problems:
+            raise RuntimeError(f'Cópia de {name} falhou na verificação: {"; ".join(problems[:5])}')
+
+        with open(temp_path, 'rb') as raw, gzip.open(archive_path + '.tmp', 'wb', compresslevel=6) as packed:
+            shutil.copyfileobj(raw, packed, 1024 * 1024)
+        os.replace(archive_path + '.tmp', archive_path)
+    finally:
+        for path in (temp_path, archive_path + '.tmp'):
+            if os.path.exists(path):
+                os.remove(path)
+
+    removed = prune_backups(dest_dir, name, keep) if keep else []
+    return {
+        'file': archive_path,
+        'databaseBytes': os.path.getsize(source_path),
+        'archiveBytes': os.path.getsize(archive_path),
+        'copySeconds': round(copy_seconds, 3),
+        'totalSeconds': round(time.perf_counter() - started, 3),
+        'writeLockWait': probe.report(),
+        'removed': [os.path.basename(path) for path in removed],
+        **stats,
+    }
+
+
+def list_backups(dest_dir, name=None):
+    """Cópias em dest_dir (todas ou só as de um banco), da mais nova para a mais antiga"""
+    if not os.path.isdir(dest_dir):
+        return []
+    backups = []
+    for filename in os.listdir(dest_dir):
+        match = BACKUP_NAME_PATTERN.match(filename)
+        if not match or (name is not None and match.group('name') != name):
+            continue
+        path = os.path.join(dest_dir, filename)
+        backups.append({
+            'name': match.group('name'),
+            'file': filename,
+            'path': path,
+            'createdAt': datetime.strptime(match.group('stamp'), '%Y%m%d-%H%M%S').isoformat(),
+            'bytes': os.path.getsize(path),
+        })
+    return sorted(backups, key=lambda backup: backup['createdAt'], reverse=True)
+
+
+def prune_backups(dest_dir, name, keep):
+    """Mantém as `keep` cópias mais novas do banco e apaga as demais"""
+    removed = []
+    for backup in list_backups(dest_dir, name)[keep:]:
+        os.remove(backup['path'])
+        removed.append(backup['path'])
+    return removed
+
+
+def restore_backup(archive_path, target_path):
+    """Restaura uma cópia .db.gz sobre target_path, só depois de verificá-la.
+
+    O banco atual é guardado antes como <arquivo>.before-restore-<data>. Rode
+    com o servidor e o worker parados.
+    """
+    temp_path = target_path + '.restore.tmp'
+    try:
+        with gzip.open(archive_path, 'rb') as packed, open(temp_path, 'wb') as raw:
+            shutil.copyfileobj(packed, raw, 1024 * 1024)
+        problems = verify_database(temp_path)
+        if problems:
+            raise RuntimeError(f'Cópia inválida, nada foi alterado: {"; ".join(problems[:5])}')
+
+        safety_path = None
+        if os.path.exists(target_path):
+            safety_path = f'{target_path}.before-restore-{datetime.utcnow().strftime("%Y%m%d-%H%M%S")}'
+            copy_database(target_path, safety_path, pages=-1)
+        # Pela API de backup (e não trocando o arquivo) para não deixar -wal/-shm antigos inconsistentes
+        copy_database(temp_path, target_path, pages=-1)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    problems = verify_database(target_path)
+    if problems:
+        raise RuntimeError(f'Banco restaurado falhou na verificação: {"; ".join(problems[:5])}')
+    return safety_path
+
+
+@job_handler('backup_database', max_attempts=2)
+def backup_database_job(payload, context):
+    """Snapshot periódico/manual do banco da oficina atual, com retenção"""
+    config = current_app.config
+    name, source_path = current_database()
+    db.session.rollback()
+    # Progresso só no final: gravar na tabela job durante a cópia faria ela recomeçar
+    result = create_backup(
+        source_path, backup_directory(), name,
+        pages=int(payload.get('pagesPerStep', config['BACKUP_PAGES_PER_STEP'])),
+        sleep=config['BACKUP_STEP_SLEEP_MS'] / 1000,
+        keep=config['BACKUP_KEEP'],
+    )
+    context.report_progress(1.0, f"Cópia em {result['totalSeconds']}s: {os.path.basename(result['file'])}")
+    return result
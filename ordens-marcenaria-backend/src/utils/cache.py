@@ -0,0 +1,140 @@
+import os
+import re
+import threading
+import tempfile
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from src.utils.tenancy import DEFAULT_TENANT, current_tenant
+
+# Tabela alvo de INSERT/UPDATE/DELETE (inclusive SQL textual e UPDATEs em lote)
+WRITE_STATEMENT = re.compile(
+    r'^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+["`\[]?(\w+)',
+    re.IGNORECASE)
+
+
+class ReferenceCache:
+    """Cache em memória (read-through) para tabelas de referência que quase nunca mudam.
+
+    Cada namespace tem uma versão guardada em um arquivo no diretório do banco.
+    Invalidar um namespace substitui esse arquivo; antes de devolver um valor em
+    cache, cada processo compara a versão com um os.stat, o que mantém vários
+    workers coerentes sem consultar o banco.
+    """
+
+    def __init__(self, app=None):
+        self.version_dir = None
+        self._entries = {}
+        self._lock = threading.Lock()
+        # tabela -> namespaces invalidados quando uma transação que escreveu nela faz commit
+        self._table_watchers = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.version_dir = app.config.get('REFERENCE_CACHE_DIR')
+        if self.version_dir:
+            os.makedirs(self.version_dir, exist_ok=True)
+        app.extensions['reference_cache'] = self
+
+    @staticmethod
+    def _scoped(namespace):
+        """Cada oficina tem seus próprios namespaces; a principal mantém os nomes de sempre"""
+        tenant = current_tenant()
+        return namespace if tenant in (None, DEFAULT_TENANT) else f'{tenant}.{namespace}'
+
+    def _version_path(self, namespace):
+        return os.path.join(self.version_dir, f'{namespace}.version')
+
+    def version(self, namespace):
+        """Versão atual do namespace (muda a cada invalidação, em qualquer processo)"""
+        try:
+            stat = os.stat(self._version_path(namespace))
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def versions(self, namespaces):
+        """Versões atuais de vários namespaces da oficina atual (para caches de fora deste)"""
+        return tuple(self.version(self._scoped(namespace)) for namespace in namespaces)
+
+    def get(self, namespace, key, loader, ttl=None):
+        """Devolve o valor em cache ou chama loader() e guarda o resultado.
+
+        Com ttl (segundos) a entrada também expira sozinha, para dados derivados
+        que podem ficar um pouco desatualizados sem invalidação explícita.
+        """
+        if not self.version_dir:
+            return loader()
+        namespace = self._scoped(namespace)
+
+        # A versão é lida antes do loader: se alguém invalidar no meio da
+        # carga, o valor fica associado à versão antiga e é recarregado depois.
+        version = self.version(namespace)
+        now = time.monotonic()
+        entry = self._entries.get((namespace, key))
+        if entry is not None and entry[0] == version and (entry[2] is None or entry[2] > now):
+            return entry[1]
+
+        value = loader()
+        expires_at = now + ttl if ttl is not None else None
+        with self._lock:
+            if ttl is not None:
+                self._prune_expired(now)
+            self._entries[(namespace, key)] = (version, value, expires_at)
+        return value
+
+    def _prune_expired(self, now):
+        for cache_key in [k for k, entry in self._entries.items()
+                          if entry[2] is not None and entry[2] <= now]:
+            del self._entries[cache_key]
+
+    def invalidate(self, namespace):
+        """Invalida o namespace neste processo e nos demais workers"""
+        namespace = self._scoped(namespace)
+        with self._lock:
+            for cache_key in [k for k in self._entries if k[0] == namespace]:
+                del self._entries[cache_key]
+
+        if not self.version_dir:
+            return
+
+        # Troca atômica do arquivo: o novo inode garante uma versão diferente
+        # mesmo quando duas invalidações caem no mesmo tick do relógio.
+        fd, tmp_path = tempfile.mkstemp(dir=self.version_dir, prefix=f'.{namespace}.')
+        with os.fdopen(fd, 'w') as f:
+            f.write(str(os.getpid()))
+        os.replace(tmp_path, self._version_path(namespace))
+
+    def invalidate_on_write(self, namespace, *tables):
+        """Invalida o namespace a cada commit que escreveu em alguma das tabelas.
+
+        Observa o SQL executado em qualquer engine (ORM, UPDATE em lote, SQL
+        textual, jobs do worker), então não depende de cada rota lembrar de
+        invalidar; o commit de outro processo invalida aqui pelo arquivo de versão.
+        """
+        if not self._table_watchers:
+            event.listen(Engine, 'before_cursor_execute', self._track_write)
+            event.listen(Engine, 'commit', self._invalidate_written)
+            event.listen(Engine, 'rollback', self._discard_written)
+        for table in tables:
+            self._table_watchers.setdefault(table, set()).add(namespace)
+
+    def _track_write(self, conn, cursor, statement, parameters, context, executemany):
+        match = WRITE_STATEMENT.match(statement)
+        if match and match.group(1) in self._table_watchers:
+            conn.info.setdefault('cache_written_tables', set()).add(match.group(1))
+
+    def _invalidate_written(self, conn):
+        tables = conn.info.pop('cache_written_tables', None)
+        if tables:
+            for namespace in set().union(*(self._table_watchers[table] for table in tables)):
+                self.invalidate(namespace)
+
+    def _discard_written(self, conn):
+        conn.info.pop('cache_written_tables', None)
+
+
+reference_cache = ReferenceCache()
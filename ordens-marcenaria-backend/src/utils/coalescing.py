@@ -0,0 +1,154 @@
+import threading
+from collections import defaultdict
+from functools import wraps
+
+from flask import current_app, request
+
+from src.models.user import db
+from src.utils.concurrency import not_modified, versioned
+from src.utils.tenancy import DEFAULT_TENANT, current_tenant
+
+# Métodos sem efeito colateral: só eles podem dividir o resultado entre requisições
+IDEMPOTENT_METHODS = ('GET', 'HEAD')
+
+# Cabeçalhos da resposta do líder repassados às demais; CORS e métricas são
+# acrescentados de novo pelos after_request de cada requisição
+SHARED_HEADERS = ('Content-Type', 'ETag', 'Cache-Control', 'X-Cache')
+
+
+def request_key(current_user, *extra):
+    """Oficina, rota, query string (ordenada) e papel do usuário: o que muda a resposta das leituras"""
+    query = '&'.join(f'{name}={value}' for name, value in sorted(request.args.items(multi=True)))
+    role = current_user.role if current_user is not None else '*'
+    return '|'.join((current_tenant() or DEFAULT_TENANT, request.path, query, role, *extra))
+
+
+def shared_key(current_user):
+    """Chave sem o papel, para leituras que devolvem o mesmo para qualquer usuário"""
+    return request_key(None)
+
+
+def replay_response(body, headers):
+    """Resposta 200 a partir do corpo e cabeçalhos guardados, respeitando o If-None-Match desta requisição"""
+    response = current_app.response_class(body, status=200, headers=headers)
+    etag = response.get_etag()[0]
+    if etag and not_modified(etag):
+        return versioned(current_app.response_class(status=304), etag)
+    return response
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.body = None
+        self.headers = None
+        self.followers = 0
+
+
+class RequestCoalescer:
+    """Single-flight para leituras idênticas e simultâneas.
+
+    A primeira requisição de uma chave (o líder) executa a view; as que chegam
+    com a mesma chave enquanto ela roda esperam e recebem cópias da mesma
+    resposta 200, sem consultar o banco. Respostas que não são 200 (erro, 304
+    do líder) não são divididas: quem esperava executa a view por conta própria.
+    Um seguidor recebe o resultado de uma execução que começou antes dele; para
+    quem precisa enxergar os commits anteriores à chegada, a chave deve incluir
+    a versão dos dados (o cache de respostas faz isso).
+    """
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self.wait_seconds = 30
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._counters = defaultdict(lambda: {'leader': 0, 'coalesced': 0, 'fallback': 0})
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('COALESCE_ENABLED', True)
+        self.wait_seconds = app.config.get('COALESCE_WAIT_SECONDS', 30)
+        app.extensions['request_coalescer'] = self
+
+    def _count(self, endpoint, result):
+        with self._lock:
+            self._counters[endpoint][result] += 1
+
+    def serve(self, view, current_user, args, kwargs, key):
+        """Executa a view como líder ou espera o líder da mesma chave; devolve sempre uma Response nova"""
+        if not self.enabled or request.method not in IDEMPOTENT_METHODS:
+            return view(current_user, *args, **kwargs)
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                flight.followers += 1
+
+        if leader:
+            self._count(request.endpoint, 'leader')
+            try:
+                response = current_app.make_response(view(current_user, *args, **kwargs))
+                if response.status_code == 200 and not response.is_streamed:
+                    flight.headers = [(name, response.headers[name]) for name in SHARED_HEADERS
+                                      if name in response.headers]
+                    flight.body = response.get_data()
+                return response
+            finally:
+                with self._lock:
+                    del self._flights[key]
+                flight.done.set()
+
+        # Devolve a conexão ao pool durante a espera: dezenas de seguidores não
+        # podem segurar o pool de leitura enquanto o líder consulta
+        db.session.rollback()
+        if flight.done.wait(self.wait_seconds) and flight.body is not None:
+            self._count(request.endpoint, 'coalesced')
+            response = replay_response(flight.body, flight.headers)
+            response.headers['X-Coalesced'] = '1'
+            return response
+        self._count(request.endpoint, 'fallback')
+        return view(current_user, *args, **kwargs)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'inFlight': len(self._flights),
+                'endpoints': {endpoint: dict(counts) for endpoint, counts in self._counters.items()},
+            }
+
+    def collect_metrics(self):
+        """Execuções e requisições atendidas por carona no formato de RequestMetrics.register_collector"""
+        stats = self.stats()
+        return [
+            ('request_coalescing_total', 'counter',
+             'Leituras por resultado (leader = executou a view, coalesced = recebeu a resposta do líder, '
+             'fallback = esperou e executou por conta própria)',
+             [({'endpoint': endpoint, 'result': result}, counts[result])
+              for endpoint, counts in sorted(stats['endpoints'].items())
+              for result in ('leader', 'coalesced', 'fallback')]),
+            ('request_coalescing_in_flight', 'gauge', 'Chaves com uma execução em andamento',
+             [({}, stats['inFlight'])]),
+        ]
+
+
+request_coalescer = RequestCoalescer()
+
+
+def coalesced(key=None):
+    """Junta leituras GET idênticas e simultâneas em uma execução; use abaixo de @token_required.
+
+    key(current_user, *args, **kwargs) troca a chave padrão (request_key).
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(current_user, *args, **kwargs):
+            flight_key = key(current_user, *args, **kwargs) if key else request_key(current_user)
+            if flight_key is None:
+                return f(current_user, *args, **kwargs)
+            return request_coalescer.serve(f, current_user, args, kwargs, flight_key)
+        return decorated
+    return decorator
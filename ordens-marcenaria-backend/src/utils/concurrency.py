@@ -0,0 +1,35 @@
+from flask import request, jsonify
+
+
+def if_match_failed(version):
+    """True quando o cliente mandou If-Match e nenhuma das ETags bate com a versão atual.
+
+    Sem If-Match a escrita segue como antes (última escrita vence), para não
+    quebrar clientes antigos.
+    """
+    if 'If-Match' not in request.headers:
+        return False
+    if_match = request.if_match
+    return not (if_match.star_tag or if_match.contains_weak(str(version)))
+
+
+def not_modified(version):
+    """True quando o If-None-Match do cliente já corresponde à versão atual"""
+    return request.if_none_match.contains_weak(str(version))
+
+
+def versioned(response, version):
+    """Anexa a ETag da versão à resposta (aceita a tupla (response, status) das views)"""
+    body = response[0] if isinstance(response, tuple) else response
+    body.set_etag(str(version))
+    return response
+
+
+def precondition_failed(resource_name, current):
+    """412 com a versão atual do recurso, para o cliente refazer a alteração sobre ela"""
+    response = jsonify({
+        'message': 'O registro foi alterado por outra pessoa. Recarregue e tente novamente.',
+        'current': {resource_name: current}
+    })
+    response.set_etag(str(current['version']))
+    return response, 412
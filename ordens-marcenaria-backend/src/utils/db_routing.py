@@ -0,0 +1,129 @@
+import threading
+from contextvars import ContextVar
+
+from flask import current_app, request
+from sqlalchemy import create_engine
+from sqlalchemy.sql.dml import UpdateBase
+
+from src.utils.tenancy import TenantSession
+
+READ_METHODS = ('GET', 'HEAD')
+
+# True enquanto a requisição atual pode ler pelo pool somente leitura
+_read_only_request = ContextVar('read_only_request', default=False)
+
+
+def use_reader(f):
+    """Marca uma view que não é GET, mas só lê (ex.: simulações), para usar o pool de leitura"""
+    f._db_route = 'reader'
+    return f
+
+
+def use_writer(f):
+    """Marca uma view GET que precisa ler e escrever na mesma conexão (pool de escrita)"""
+    f._db_route = 'writer'
+    return f
+
+
+class RoutingSession(TenantSession):
+    """Sessão que manda as leituras de requisições GET para o pool somente leitura"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is None and _read_only_request.get():
+            return db_router.route(self, engine, clause)
+        return engine
+
+
+class ReadWriteRouter:
+    """Dois pools para o mesmo arquivo SQLite em modo WAL: leitura e escrita.
+
+    Leitores (PRAGMA query_only, BEGIN comum/deferred) enxergam o último commit
+    sem esperar o escritor; o pool de escrita tem poucas conexões (padrão 1), então
+    as escritas do processo entram em fila no pool em vez de disputar o lock do
+    SQLite. Requisições GET/HEAD leem pelo pool de leitura; flush, UPDATE/DELETE/
+    INSERT e blocos immediate_transaction() vão sempre para o pool de escrita.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.reader = None
+        self.writer = None
+        self._writing = lambda: False
+        self._lock = threading.Lock()
+        self._reads = 0
+        self._writes = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from src.utils.transactions import configure_sqlite_engine, in_write_transaction
+
+        self.enabled = app.config.get('DB_READ_ROUTING', False)
+        self._writing = in_write_transaction
+        app.extensions['db_routing'] = self
+        if not self.enabled:
+            return
+
+        with app.app_context():
+            self.writer = current_app.extensions['sqlalchemy'].engine
+            if self.writer.dialect.name != 'sqlite' or self.writer.url.database in (None, '', ':memory:'):
+                # Banco em memória não é compartilhado entre conexões: tudo no pool de escrita
+                self.enabled = False
+                return
+
+        pool_size = app.config.get('DB_READ_POOL_SIZE', 4)
+        self.reader = create_engine(self.writer.url, pool_size=pool_size, max_overflow=0,
+                                    pool_timeout=app.config.get('DB_POOL_TIMEOUT', 30))
+        configure_sqlite_engine(self.reader, app.config.get('SQLITE_BUSY_TIMEOUT_MS', 1000),
+                                query_only=True)
+        app.before_request(self.select_pool)
+        app.teardown_request(self.reset_pool)
+
+    def select_pool(self):
+        """before_request: GET/HEAD leem pelo pool de leitura, salvo views marcadas com use_writer"""
+        view = current_app.view_functions.get(request.endpoint)
+        route = getattr(view, '_db_route', None)
+        read_only = route == 'reader' or (route is None and request.method in READ_METHODS)
+        request.environ['db_routing.token'] = _read_only_request.set(read_only)
+
+    def reset_pool(self, exc=None):
+        token = request.environ.pop('db_routing.token', None)
+        if token is not None:
+            _read_only_request.reset(token)
+
+    def route(self, session, engine, clause=None):
+        """Engine de leitura quando a operação é só leitura no banco principal"""
+        if (engine is not self.writer or session._flushing or self._writing()
+                or isinstance(clause, UpdateBase)):
+            with self._lock:
+                self._writes += 1
+            return engine
+        with self._lock:
+            self._reads += 1
+        return self.reader
+
+    def stats(self):
+        with self._lock:
+            stats = {'enabled': self.enabled, 'routed_reads': self._reads, 'routed_writes': self._writes}
+        for name, engine in (('reader', self.reader), ('writer', self.writer)):
+            if engine is not None:
+                stats[f'{name}_pool'] = {'size': engine.pool.size(), 'checked_out': engine.pool.checkedout()}
+        return stats
+
+    def collect_metrics(self):
+        """Escolhas de pool e conexões em uso no formato de RequestMetrics.register_collector"""
+        stats = self.stats()
+        pools = [(name, stats[f'{name}_pool']) for name in ('reader', 'writer') if f'{name}_pool' in stats]
+        return [
+            ('db_routed_operations_total', 'counter',
+             'Operações de requisições GET/HEAD por pool escolhido',
+             [({'pool': 'reader'}, stats['routed_reads']), ({'pool': 'writer'}, stats['routed_writes'])]),
+            ('db_pool_connections_in_use', 'gauge', 'Conexões emprestadas de cada pool',
+             [({'pool': name}, pool['checked_out']) for name, pool in pools]),
+            ('db_pool_size', 'gauge', 'Tamanho configurado de cada pool',
+             [({'pool': name}, pool['size']) for name, pool in pools]),
+        ]
+
+
+db_router = ReadWriteRouter()
@@ -0,0 +1,155 @@
+from datetime import date, datetime, timedelta
+
+from sqlalchemy.orm import load_only
+
+from src.models.user import Order, Delivery
+
+PERIODS = ('today', 'tomorrow', 'week')
+
+NO_CARPENTER = 'Não atribuído'
+
+# Status da entrega -> (emoji, título), na ordem em que aparecem na mensagem
+DELIVERY_STATUS_LABELS = {
+    'pendente': ('⏳', 'Pendentes'),
+    'em_rota': ('🚛', 'Em Rota'),
+    'entregue': ('✅', 'Entregues'),
+    'cancelada': ('❌', 'Canceladas'),
+}
+
+ORDER_TITLES = {'today': 'ORDENS PARA HOJE', 'tomorrow': 'ORDENS PARA AMANHÃ', 'week': 'ORDENS PARA A SEMANA'}
+DELIVERY_TITLES = {'today': 'ENTREGAS PARA HOJE', 'tomorrow': 'ENTREGAS PARA AMANHÃ', 'week': 'ENTREGAS PARA A SEMANA'}
+
+
+def period_range(period, today):
+    """Intervalo de datas (inclusivo): hoje, amanhã ou a semana atual de segunda a domingo"""
+    if period == 'today':
+        return today, today
+    if period == 'tomorrow':
+        tomorrow = today + timedelta(days=1)
+        return tomorrow, tomorrow
+    if period == 'week':
+        monday = today - timedelta(days=today.weekday())
+        return monday, monday + timedelta(days=6)
+    raise ValueError(f"period deve ser um de: {', '.join(PERIODS)}")
+
+
+def seconds_until_tomorrow(now=None):
+    now = now or datetime.now()
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return max(1, int((midnight - now).total_seconds()))
+
+
+def format_date_br(value):
+    return value.strftime('%d/%m/%Y')
+
+
+def _orders_query():
+    # Só as colunas da mensagem: sem materiais e sem o texto das demais colunas
+    return Order.query.options(load_only(Order.id, Order.description, Order.exit_date,
+                                         Order.carpenter, Order.status))
+
+
+def period_orders(period, today):
+    """Ordens em aberto com saída no período e, para hoje, as atrasadas (faixas de exit_date indexadas)"""
+    start, end = period_range(period, today)
+    due = (_orders_query()
+           .filter(Order.exit_date >= start, Order.exit_date <= end, Order.status != 'concluida')
+           .order_by(Order.exit_date, Order.id)
+           .all())
+    overdue = []
+    if period == 'today':
+        overdue = (_orders_query()
+                   .filter(Order.exit_date < today, Order.status != 'concluida')
+                   .order_by(Order.exit_date, Order.id)
+                   .all())
+    return overdue, due
+
+
+def period_deliveries(period, today):
+    start, end = period_range(period, today)
+    return (Delivery.query
+            .filter(Delivery.delivery_date >= start, Delivery.delivery_date <= end)
+            .order_by(Delivery.delivery_date, Delivery.id)
+            .all())
+
+
+def _orders_section(orders, title=None):
+    lines = [title, ''] if title else []
+    by_carpenter = {}
+    for order in orders:
+        by_carpenter.setdefault(order.carpenter or NO_CARPENTER, []).append(order)
+    for carpenter, carpenter_orders in by_carpenter.items():
+        lines.append(f'👷‍♂️ *{carpenter}*')
+        for order in carpenter_orders:
+            lines.append(f'• Ordem {order.id} - {format_date_br(order.exit_date)}')
+            lines.append(f'  📝 {order.description or "Sem descrição"}')
+        lines.append('')
+    return lines
+
+
+def orders_message(period, start, end, overdue, due):
+    """Texto pronto para o WhatsApp, no mesmo formato que o frontend montava"""
+    date_info = format_date_br(start) if start == end else f'{format_date_br(start)} a {format_date_br(end)}'
+    lines = [f'📋 {ORDER_TITLES[period]}', date_info, '']
+    if not overdue and not due:
+        lines.append('✅ Nenhuma ordem programada para este período.')
+        return '\n'.join(lines)
+
+    if overdue:
+        lines += _orders_section(overdue, '⚠️ *ORDENS ATRASADAS*')
+    if due:
+        lines += _orders_section(due, '📅 *ORDENS PROGRAMADAS*' if overdue else None)
+
+    total = f'📊 *Total: {len(overdue) + len(due)} ordem(ns)*'
+    if overdue:
+        total += f' ({len(overdue)} atrasada(s))'
+    lines.append(total)
+    return '\n'.join(lines)
+
+
+def deliveries_message(period, start, end, deliveries):
+    date_info = format_date_br(start) if start == end else f'{format_date_br(start)} a {format_date_br(end)}'
+    lines = [f'🚚 {DELIVERY_TITLES[period]}', date_info, '']
+    if not deliveries:
+        lines.append('✅ Nenhuma entrega programada para este período.')
+        return '\n'.join(lines)
+
+    by_status = {}
+    for delivery in deliveries:
+        by_status.setdefault(delivery.delivery_status or 'pendente', []).append(delivery)
+    for status, status_deliveries in by_status.items():
+        emoji, label = DELIVERY_STATUS_LABELS.get(status, ('📦', status))
+        lines.append(f'{emoji} *{label}*')
+        for delivery in status_deliveries:
+            lines.append(f'• Entrega {delivery.id} - {format_date_br(delivery.delivery_date)}')
+            if delivery.delivery_address:
+                lines.append(f'  📍 {delivery.delivery_address}')
+            if delivery.notes:
+                lines.append(f'  📝 {delivery.notes}')
+        lines.append('')
+
+    lines.append(f'📊 *Total: {len(deliveries)} entrega(s)*')
+    return '\n'.join(lines)
+
+
+def build_digest(period, today=None):
+    """Resumo do período: conjuntos de ordens e entregas e as mensagens já formatadas"""
+    today = today or date.today()
+    start, end = period_range(period, today)
+    overdue, due = period_orders(period, today)
+    deliveries = period_deliveries(period, today)
+    return {
+        'period': period,
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'generatedAt': datetime.utcnow().isoformat(),
+        'orders': {
+            'overdue': [order.to_summary_dict() for order in overdue],
+            'due': [order.to_summary_dict() for order in due],
+        },
+        'deliveries': [delivery.to_dict() for delivery in deliveries],
+        'messages': {
+            'orders': orders_message(period, start, end, overdue, due),
+            'deliveries': deliveries_message(period, start, end, deliveries),
+        },
+    }
@@ -0,0 +1,197 @@
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import current_app, jsonify, make_response, request
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from src.models.user import db, IdempotencyRecord, User
+from src.utils.jobs import job_handler
+from src.utils.transactions import immediate_transaction, is_busy_error, transaction_policy
+
+logger = logging.getLogger('idempotency')
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+# Cabeçalhos da primeira resposta que são devolvidos de novo no replay
+REPLAYED_HEADERS = ('Location', 'ETag')
+
+SWEEP_BATCH_SIZE = 1000
+
+
+def token_user_id():
+    """Usuário do token, sem consultar o banco (token_required valida depois)"""
+    auth_header = request.headers.get('Authorization', '')
+    if not auth_header.startswith('Bearer '):
+        return None
+    payload = User.verify_token(auth_header[len('Bearer '):], current_app.config['SECRET_KEY'])
+    return payload['user_id'] if payload else None
+
+
+def request_fingerprint():
+    """Hash de método, rota e corpo: a mesma chave com outro conteúdo é erro do cliente"""
+    digest = hashlib.sha256()
+    digest.update(f'{request.method} {request.path}\n'.encode())
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def find_record(user_id, key):
+    record = db.session.get(IdempotencyRecord, (user_id, key))
+    # Encerra a leitura: o replay não deve segurar nem pedir lock nenhum
+    db.session.rollback()
+    return record
+
+
+def is_live(record, now):
+    """Registro ainda vale: não expirou e, se em andamento, não foi abandonado"""
+    if record.expires_at <= now:
+        return False
+    if record.status_code is None:
+        lock_seconds = current_app.config['IDEMPOTENCY_LOCK_SECONDS']
+        return record.created_at + timedelta(seconds=lock_seconds) > now
+    return True
+
+
+def replay(record, fingerprint):
+    """Resposta para uma chave já usada: replay, 409 (em andamento) ou 422 (outro corpo)"""
+    if record.request_hash != fingerprint:
+        return jsonify({
+            'message': f'{IDEMPOTENCY_HEADER} já usada em outra requisição com conteúdo diferente'
+        }), 422
+
+    if record.status_code is None:
+        response = jsonify({'message': 'Requisição com esta chave ainda em processamento'})
+        response.headers['Retry-After'] = '1'
+        return response, 409
+
+    response = current_app.response_class(record.response_body, status=record.status_code,
+                                          mimetype='application/json')
+    for name, value in json.loads(record.response_headers or '{}').items():
+        response.headers[name] = value
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def claim(user_id, key, fingerprint, stale):
+    """Grava o marcador "em andamento" antes de executar a view"""
+    now = datetime.utcnow()
+    with immediate_transaction():
+        if stale is not None:
+            IdempotencyRecord.query.filter_by(user_id=user_id, key=key).delete()
+        db.session.add(IdempotencyRecord(
+            user_id=user_id,
+            key=key,
+            request_hash=fingerprint,
+            created_at=now,
+            expires_at=now + timedelta(seconds=current_app.config['IDEMPOTENCY_TTL_SECONDS'])
+        ))
+
+
+def _write_response(user_id, key, response):
+    with immediate_transaction():
+        query = IdempotencyRecord.query.filter_by(user_id=user_id, key=key)
+        if response.status_code >= 500 or response.status_code == 429:
+            query.delete()
+            return
+        headers = {name: response.headers[name] for name in REPLAYED_HEADERS if name in response.headers}
+        query.update({
+            'status_code': response.status_code,
+            'response_body': response.get_data(as_text=True),
+            'response_headers': json.dumps(headers)
+        })
+
+
+def store(user_id, key, response):
+    """Guarda a primeira resposta; erros do servidor liberam a chave para uma nova tentativa.
+
+    A view já fez commit: se a resposta não fosse gravada, a repetição do cliente
+    executaria a view de novo depois de IDEMPOTENCY_LOCK_SECONDS. Por isso banco
+    ocupado aqui é repetido como nas views (@transactional), não só registrado.
+    """
+    try:
+        transaction_policy.retrying(_write_response, user_id, key, response)
+    except OperationalError as e:
+        logger.error('Resposta da chave %s não registrada depois de %d tentativas: %s',
+                     key, transaction_policy.max_retries + 1, e)
+
+
+def release(user_id, key):
+    def delete():
+        with immediate_transaction():
+            IdempotencyRecord.query.filter_by(user_id=user_id, key=key).delete()
+
+    try:
+        transaction_policy.retrying(delete)
+    except OperationalError as e:
+        logger.warning('Não foi possível liberar a chave %s: %s', key, e)
+
+
+def idempotent(f):
+    """Replay da primeira resposta para POSTs repetidos com o mesmo Idempotency-Key.
+
+    Use acima de @transactional: a consulta da chave é uma leitura simples, então
+    uma repetição é respondida sem executar a view nem pegar o lock de escrita.
+    Sem o cabeçalho (ou sem token válido) a view roda normalmente.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return f(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return jsonify({'message': f'{IDEMPOTENCY_HEADER} deve ter no máximo {MAX_KEY_LENGTH} caracteres'}), 400
+
+        user_id = token_user_id()
+        if user_id is None:
+            return f(*args, **kwargs)
+
+        fingerprint = request_fingerprint()
+        record = find_record(user_id, key)
+        if record is not None and is_live(record, datetime.utcnow()):
+            return replay(record, fingerprint)
+
+        try:
+            claim(user_id, key, fingerprint, stale=record)
+        except IntegrityError:
+            # Outra cópia da mesma requisição chegou primeiro
+            return replay(find_record(user_id, key), fingerprint)
+        except OperationalError as e:
+            if not is_busy_error(e):
+                raise
+            response = jsonify({'message': 'Banco de dados ocupado. Tente novamente em instantes.'})
+            response.headers['Retry-After'] = '1'
+            return response, 503
+
+        try:
+            response = make_response(f(*args, **kwargs))
+        except Exception:
+            release(user_id, key)
+            raise
+
+        store(user_id, key, response)
+        return response
+    return decorated
+
+
+def sweep_expired(batch_size=SWEEP_BATCH_SIZE):
+    """Apaga registros expirados em lotes curtos (o lock de escrita fica pouco tempo preso)"""
+    deleted = 0
+    while True:
+        with immediate_transaction():
+            count = db.session.execute(text(
+                'DELETE FROM idempotency_record WHERE rowid IN ('
+                'SELECT rowid FROM idempotency_record WHERE expires_at <= :now LIMIT :limit)'
+            ), {'now': datetime.utcnow(), 'limit': batch_size}).rowcount
+        deleted += count
+        if count < batch_size:
+            return deleted
+
+
+@job_handler('sweep_idempotency_keys')
+def sweep_idempotency_keys_job(payload, context):
+    return {'deleted': sweep_expired(int(payload.get('batchSize', SWEEP_BATCH_SIZE)))}
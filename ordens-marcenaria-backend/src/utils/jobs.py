@@ -0,0 +1,290 @@
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+
+from src.models.user import db, Job
+from src.utils.transactions import immediate_transaction
+from src.utils.tenancy import tenant_registry, tenant_context
+
+logger = logging.getLogger('jobs')
+
+JOB_HANDLERS = {}
+
+
+class JobHandler:
+    def __init__(self, name, func, max_attempts):
+        self.name = name
+        self.func = func
+        self.max_attempts = max_attempts
+
+
+def job_handler(name, max_attempts=3):
+    """Registra uma função como tipo de job: func(payload, context) -> resultado serializável em JSON"""
+    def decorator(func):
+        JOB_HANDLERS[name] = JobHandler(name, func, max_attempts)
+        return func
+    return decorator
+
+
+def enqueue(job_type, payload=None, user_id=None, run_after=None, max_attempts=None):
+    """Cria um job pendente; o commit fica a cargo de quem chama (normalmente a view)"""
+    if job_type not in JOB_HANDLERS:
+        raise ValueError(f'Tipo de job desconhecido: {job_type}')
+    job = Job(
+        id=uuid.uuid4().hex,
+        type=job_type,
+        status='pendente',
+        payload=json.dumps(payload) if payload is not None else None,
+        max_attempts=max_attempts or JOB_HANDLERS[job_type].max_attempts,
+        run_after=run_after or datetime.utcnow(),
+        created_by=user_id,
+    )
+    db.session.add(job)
+    return job
+
+
+class JobContext:
+    """Passado ao handler; permite registrar progresso entre uma transação e outra"""
+
+    def __init__(self, job_id, owner):
+        self.job_id = job_id
+        # locked_by da reserva: se o job foi devolvido e reservado por outro, o progresso é descartado
+        self.owner = owner
+
+    def report_progress(self, fraction, message=None):
+        """Grava o progresso e renova locked_at (heartbeat): o job não é dado como travado
+        enquanto reportar progresso dentro de stale_after"""
+        with immediate_transaction():
+            Job.query.filter_by(id=self.job_id, status='executando', locked_by=self.owner).update(
+                {'progress': max(0.0, min(1.0, fraction)), 'progress_message': message,
+                 'locked_at': datetime.utcnow()},
+                synchronize_session=False,
+            )
+
+
+class PeriodicTask:
+    def __init__(self, job_type, interval_seconds, payload=None):
+        self.job_type = job_type
+        self.interval = timedelta(seconds=interval_seconds)
+        self.payload = payload
+
+
+class JobWorker:
+    """Pool de threads que consome a tabela job, com novas tentativas e agendador periódico.
+
+    Vários processos podem rodar workers sobre o mesmo banco: a reserva de um job
+    é um UPDATE condicional dentro de BEGIN IMMEDIATE, então cada job é
+    executado por um único worker. Com várias oficinas, o worker percorre os
+    bancos de todas elas em rodízio.
+    """
+
+    def __init__(self, app, concurrency=2, poll_interval=2.0, schedule=None,
+                 stale_after_seconds=3600, retry_base_seconds=30):
+        self.app = app
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.schedule = schedule or []
+        self.stale_after = timedelta(seconds=stale_after_seconds)
+        self.retry_base_seconds = retry_base_seconds
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        self.stop_event = threading.Event()
+        self._threads = []
+        self._tenant_offset = 0
+
+    def start(self):
+        for index in range(self.concurrency):
+            thread = threading.Thread(target=self._run_loop, name=f'job-worker-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        scheduler = threading.Thread(target=self._schedule_loop, name='job-scheduler', daemon=True)
+        scheduler.start()
+        self._threads.append(scheduler)
+
+    def stop(self, timeout=30):
+        """Para de pegar jobs novos e espera os que estão em execução terminarem"""
+        self.stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _run_loop(self):
+        while not self.stop_event.is_set():
+            try:
+                ran = self.run_next()
+            except Exception:
+                logger.exception('Erro no loop do worker de jobs')
+                ran = False
+            if not ran:
+                self.stop_event.wait(self.poll_interval)
+
+    def _schedule_loop(self):
+        while not self.stop_event.is_set():
+            try:
+                with self.app.app_context():
+                    for tenant in self.tenants():
+                        with self._tenant(tenant):
+                            self.tick_schedule()
+                            self.requeue_stale()
+            except Exception:
+                logger.exception('Erro no agendador de jobs')
+            self.stop_event.wait(max(self.poll_interval, 30))
+
+    def tenants(self):
+        """Oficinas atendidas (None = só o banco principal, sem multi-oficina)"""
+        if not tenant_registry.enabled:
+            return [None]
+        return tenant_registry.known_tenants()
+
+    def _tenant(self, tenant):
+        return nullcontext() if tenant is None else tenant_context(tenant)
+
+    def lock_owner(self):
+        """Valor de locked_by das reservas desta thread: identifica a execução dona do job"""
+        return f'{self.worker_id}:{threading.current_thread().name}'
+
+    def claim(self):
+        """Reserva o próximo job pendente; retorna o id ou None"""
+        now = datetime.utcnow()
+        with immediate_transaction():
+            row = (db.session.query(Job.id)
+                   .filter(Job.status == 'pendente', Job.run_after <= now)
+                   .order_by(Job.run_after)
+                   .first())
+            if row is None:
+                return None
+            claimed = (Job.query
+                       .filter(Job.id == row[0], Job.status == 'pendente')
+                       .update({'status': 'executando', 'locked_by': self.lock_owner(), 'locked_at': now,
+                                'started_at': now, 'attempts': Job.attempts + 1},
+                               synchronize_session=False))
+        return row[0] if claimed else None
+
+    def run_next(self):
+        """Executa o próximo job pendente, começando cada rodada por uma oficina diferente"""
+        with self.app.app_context():
+            tenants = self.tenants()
+            self._tenant_offset = (self._tenant_offset + 1) % len(tenants)
+            for tenant in tenants[self._tenant_offset:] + tenants[:self._tenant_offset]:
+                with self._tenant(tenant):
+                    if self._run_next_job():
+                        return True
+            return False
+
+    def _run_next_job(self):
+        job_id = self.claim()
+        if job_id is None:
+            return False
+
+        owner = self.lock_owner()
+        job = Job.query.get(job_id)
+        handler = JOB_HANDLERS.get(job.type)
+        payload = json.loads(job.payload) if job.payload else {}
+        attempts, max_attempts = job.attempts, job.max_attempts
+        db.session.rollback()
+
+        start = time.perf_counter()
+        try:
+            if handler is None:
+                raise LookupError(f'Nenhum handler registrado para {job.type}')
+            result = handler.func(payload, JobContext(job_id, owner))
+        except Exception as e:
+            db.session.rollback()
+            self._record_failure(job_id, owner, e, attempts, max_attempts)
+            return True
+
+        with immediate_transaction():
+            finished = self._owned(job_id, owner).update({
+                'status': 'concluido',
+                'result': json.dumps(result, default=str),
+                'error': None,
+                'progress': 1.0,
+                'finished_at': datetime.utcnow(),
+                'locked_by': None,
+            }, synchronize_session=False)
+        if finished:
+            logger.info('Job %s concluído em %.2fs', job_id, time.perf_counter() - start)
+        else:
+            logger.warning('Job %s terminou depois de ser devolvido à fila: resultado descartado', job_id)
+        return True
+
+    @staticmethod
+    def _owned(job_id, owner):
+        """O job, só enquanto ainda é desta execução (requeue_stale pode tê-lo passado a outra)"""
+        return Job.query.filter(Job.id == job_id, Job.status == 'executando', Job.locked_by == owner)
+
+    def _retry_delay(self, attempts):
+        # Backoff exponencial: 30 s, 60 s, 120 s...
+        return self.retry_base_seconds * (2 ** (max(attempts, 1) - 1))
+
+    def _failure_values(self, error, attempts, max_attempts):
+        """Colunas da tentativa que falhou: volta à fila com backoff ou, sem tentativas restantes, falhou"""
+        now = datetime.utcnow()
+        values = {'error': error[-4000:], 'locked_by': None}
+        if attempts < max_attempts:
+            values.update(status='pendente', run_after=now + timedelta(seconds=self._retry_delay(attempts)))
+        else:
+            values.update(status='falhou', finished_at=now)
+        return values
+
+    def _record_failure(self, job_id, owner, error, attempts, max_attempts):
+        values = self._failure_values(f'{error}\n{traceback.format_exc()}', attempts, max_attempts)
+        with immediate_transaction():
+            recorded = self._owned(job_id, owner).update(values, synchronize_session=False)
+        if not recorded:
+            logger.warning('Job %s falhou depois de ser devolvido à fila: falha descartada: %s', job_id, error)
+        elif values['status'] == 'pendente':
+            logger.warning('Job %s falhou (tentativa %d/%d), nova tentativa em %ds: %s',
+                           job_id, attempts, max_attempts, self._retry_delay(attempts), error)
+        else:
+            logger.error('Job %s falhou definitivamente: %s', job_id, error)
+
+    def tick_schedule(self):
+        """Enfileira as tarefas periódicas vencidas (o estado fica no banco, sobrevive a reinícios)"""
+        now = datetime.utcnow()
+        for task in self.schedule:
+            with immediate_transaction():
+                last = (Job.query.filter_by(type=task.job_type)
+                        .order_by(Job.created_at.desc())
+                        .first())
+                if last is not None and (last.status in ('pendente', 'executando')
+                                         or last.created_at > now - task.interval):
+                    continue
+                enqueue(task.job_type, task.payload)
+
+    def requeue_stale(self):
+        """Trata jobs presos em "executando" por um worker que morreu (sem reserva nem progresso
+        reportado há mais de stale_after) como uma tentativa que falhou: voltam à fila com o
+        mesmo backoff, ou falham de vez se já esgotaram as tentativas. Um job que derruba o
+        worker (falta de memória, segfault) não é repetido para sempre.
+        """
+        cutoff = datetime.utcnow() - self.stale_after
+        requeued = failed = 0
+        with immediate_transaction():
+            stale = (db.session.query(Job.id, Job.attempts, Job.max_attempts, Job.locked_by)
+                     .filter(Job.status == 'executando', Job.locked_at < cutoff)
+                     .all())
+            for job_id, attempts, max_attempts, locked_by in stale:
+                values = self._failure_values(
+                    f'Worker {locked_by} parou de responder (sem progresso por mais de '
+                    f'{int(self.stale_after.total_seconds())}s)', attempts, max_attempts)
+                Job.query.filter(Job.id == job_id, Job.status == 'executando').update(
+                    values, synchronize_session=False)
+                if values['status'] == 'pendente':
+                    requeued += 1
+                else:
+                    failed += 1
+        if requeued:
+            logger.warning('%d job(s) travado(s) devolvido(s) à fila', requeued)
+        if failed:
+            logger.error('%d job(s) travado(s) sem tentativas restantes marcados como falhou', failed)
+
+
+def parse_schedule(schedule_config):
+    """JOB_SCHEDULE: {"tipo": segundos} -> [PeriodicTask]"""
+    return [PeriodicTask(job_type, interval) for job_type, interval in schedule_config.items() if interval]
@@ -0,0 +1,85 @@
+from sqlalchemy import event, select, text
+from sqlalchemy.orm import Session, attributes
+
+from src.models.user import MaterialCatalog, Material
+
+
+def display_name(description):
+    return ' '.join((description or '').split())
+
+
+def assign_catalog(session, flush_context, instances):
+    """before_flush: liga materiais novos ou com descrição alterada ao item do catálogo.
+
+    Itens que ainda não existem são criados no mesmo flush; os existentes são
+    buscados em uma única consulta por flush.
+    """
+    materials = [obj for obj in session.new if isinstance(obj, Material)]
+    materials += [obj for obj in session.dirty
+                  if isinstance(obj, Material) and attributes.get_history(obj, 'description').has_changes()]
+    if not materials:
+        return
+
+    wanted = {MaterialCatalog.normalize(material.description) for material in materials}
+    wanted.discard('')
+    with session.no_autoflush:
+        entries = {entry.normalized_name: entry for entry in
+                   session.query(MaterialCatalog).filter(MaterialCatalog.normalized_name.in_(wanted))}
+        # Itens criados neste mesmo flush por outra parte do código
+        for obj in session.new:
+            if isinstance(obj, MaterialCatalog):
+                entries.setdefault(obj.normalized_name, obj)
+
+    for material in materials:
+        normalized = MaterialCatalog.normalize(material.description)
+        if not normalized:
+            material.catalog = None
+            continue
+        entry = entries.get(normalized)
+        if entry is None:
+            entry = MaterialCatalog(name=display_name(material.description), normalized_name=normalized)
+            session.add(entry)
+            entries[normalized] = entry
+        material.catalog = entry
+
+
+def register_catalog_events():
+    """Mantém o catálogo atualizado a cada escrita feita pelo ORM"""
+    if not event.contains(Session, 'before_flush', assign_catalog):
+        event.listen(Session, 'before_flush', assign_catalog)
+
+
+def link_uncataloged_materials(connection):
+    """Liga em lote materiais sem catálogo (bancos antigos e inserções em massa); devolve quantos.
+
+    As inserções via Core (seed, arquivamento) não passam pelo before_flush.
+    """
+    descriptions = connection.execute(text(
+        'SELECT DISTINCT description FROM material WHERE catalog_id IS NULL'
+    )).scalars().all()
+    if not descriptions:
+        return 0
+
+    catalog = dict(connection.execute(
+        select(MaterialCatalog.normalized_name, MaterialCatalog.id)
+    ).all())
+
+    new_entries = {}
+    for description in descriptions:
+        normalized = MaterialCatalog.normalize(description)
+        if normalized and normalized not in catalog and normalized not in new_entries:
+            new_entries[normalized] = display_name(description)
+    if new_entries:
+        connection.execute(MaterialCatalog.__table__.insert(), [
+            {'name': name, 'normalized_name': normalized} for normalized, name in new_entries.items()
+        ])
+        catalog = dict(connection.execute(
+            select(MaterialCatalog.normalized_name, MaterialCatalog.id)
+        ).all())
+
+    params = [{'catalog_id': catalog[MaterialCatalog.normalize(description)], 'description': description}
+              for description in descriptions if MaterialCatalog.normalize(description)]
+    result = connection.execute(text(
+        'UPDATE material SET catalog_id = :catalog_id WHERE catalog_id IS NULL AND description = :description'
+    ), params)
+    return result.rowcount
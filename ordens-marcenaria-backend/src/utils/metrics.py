@@ -0,0 +1,183 @@
+import bisect
+import threading
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+SQL_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+
+
+class Histogram:
+    """Histograma cumulativo no formato do Prometheus (buckets fixos)"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{name}_bucket', {**labels, 'le': _format_value(bound)}, cumulative
+        yield f'{name}_bucket', {**labels, 'le': '+Inf'}, self.count
+        yield f'{name}_sum', labels, self.sum
+        yield f'{name}_count', labels, self.count
+
+
+def _format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    parts = []
+    for key, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+class RequestMetrics:
+    """Latência, status, tamanho de resposta e SQL por rota, expostos no formato do Prometheus.
+
+    O custo por requisição é um perf_counter, alguns incrementos e um lock curto
+    no after_request, o que permite deixar ligado em produção.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._durations = {}
+        self._sizes = {}
+        self._sql_counts = {}
+        self._sql_durations = {}
+        self._statuses = {}
+        self._in_flight = 0
+        self._collectors = []
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        app.extensions['request_metrics'] = self
+
+    def register_collector(self, collector):
+        """Registra uma função que devolve métricas extras: [(nome, tipo, ajuda, amostras)].
+
+        Cada amostra é (labels, valor) ou, para histogramas, (nome_da_amostra, labels, valor).
+        """
+        self._collectors.append(collector)
+
+    def _before_request(self):
+        g._metrics_start = time.perf_counter()
+        g._metrics_sql_count = 0
+        g._metrics_sql_time = 0.0
+        with self._lock:
+            self._in_flight += 1
+
+    def _after_request(self, response):
+        start = g.get('_metrics_start')
+        if start is None:
+            return response
+
+        elapsed = time.perf_counter() - start
+        route = request.url_rule.rule if request.url_rule else '<unmatched>'
+        key = (request.method, route)
+        size = response.content_length or 0
+
+        with self._lock:
+            self._histogram(self._durations, key, LATENCY_BUCKETS).observe(elapsed)
+            self._histogram(self._sizes, key, SIZE_BUCKETS).observe(size)
+            self._histogram(self._sql_counts, key, SQL_COUNT_BUCKETS).observe(g._metrics_sql_count)
+            self._histogram(self._sql_durations, key, LATENCY_BUCKETS).observe(g._metrics_sql_time)
+            status_key = key + (response.status_code,)
+            self._statuses[status_key] = self._statuses.get(status_key, 0) + 1
+        return response
+
+    def _teardown_request(self, exc):
+        # Roda mesmo quando o handler levanta exceção, então o gauge não vaza
+        if g.pop('_metrics_start', None) is not None:
+            with self._lock:
+                self._in_flight -= 1
+
+    @staticmethod
+    def _histogram(store, key, buckets):
+        histogram = store.get(key)
+        if histogram is None:
+            histogram = store[key] = Histogram(buckets)
+        return histogram
+
+    def render(self):
+        """Texto de exposição do Prometheus (version 0.0.4)"""
+        lines = []
+
+        def family(name, metric_type, help_text, samples):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            for sample_name, labels, value in samples:
+                lines.append(f'{sample_name}{_format_labels(labels)} {_format_value(value)}')
+
+        def histogram_samples(name, store):
+            for (method, route), histogram in sorted(store.items()):
+                yield from histogram.samples(name, {'method': method, 'route': route})
+
+        with self._lock:
+            family('http_request_duration_seconds', 'histogram',
+                   'Latência das requisições por rota',
+                   list(histogram_samples('http_request_duration_seconds', self._durations)))
+            family('http_requests_total', 'counter',
+                   'Requisições por rota e status',
+                   [('http_requests_total', {'method': m, 'route': r, 'status': s}, count)
+                    for (m, r, s), count in sorted(self._statuses.items())])
+            family('http_response_size_bytes', 'histogram',
+                   'Tamanho do corpo das respostas por rota',
+                   list(histogram_samples('http_response_size_bytes', self._sizes)))
+            family('http_request_sql_statements', 'histogram',
+                   'Comandos SQL executados por requisição',
+                   list(histogram_samples('http_request_sql_statements', self._sql_counts)))
+            family('http_request_sql_duration_seconds', 'histogram',
+                   'Tempo gasto em SQL por requisição',
+                   list(histogram_samples('http_request_sql_duration_seconds', self._sql_durations)))
+            family('http_requests_in_flight', 'gauge',
+                   'Requisições em andamento',
+                   [('http_requests_in_flight', {}, self._in_flight)])
+
+        for collector in self._collectors:
+            for name, metric_type, help_text, samples in collector():
+                family(name, metric_type, help_text,
+                       [sample if len(sample) == 3 else (name,) + tuple(sample) for sample in samples])
+
+        return '\n'.join(lines) + '\n'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, '_metrics_start', None)
+    if start is None or not has_request_context() or '_metrics_start' not in g:
+        return
+    g._metrics_sql_count += 1
+    g._metrics_sql_time += time.perf_counter() - start
+
+
+request_metrics = RequestMetrics()
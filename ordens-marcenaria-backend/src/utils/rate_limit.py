@@ -0,0 +1,220 @@
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from flask import current_app, jsonify, request
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+# Limites padrão, por endpoint ("blueprint.funcao") ou por blueprint inteiro.
+# Podem ser sobrescritos com app.config['RATE_LIMITS'].
+DEFAULT_RATE_LIMITS = {
+    'auth.login': '10/minute',
+    'auth.register': '5/minute',
+    'auth': '120/minute',
+    'system_config.get_backend_url': '60/minute',
+}
+
+
+class RateLimit:
+    """Um limite no formato "N/periodo": até N requisições de rajada, repostas ao longo do período"""
+
+    def __init__(self, spec):
+        count, _, period = spec.partition('/')
+        if period not in PERIODS:
+            raise ValueError(f'Período inválido no limite "{spec}"')
+        self.spec = spec
+        self.capacity = int(count)
+        self.rate = self.capacity / PERIODS[period]
+
+
+class MemoryBucketStore:
+    """Estado dos token buckets na memória do processo (padrão, um worker).
+
+    No máximo max_keys buckets, em ordem de uso (LRU): acima disso o usado há
+    mais tempo sai, em O(1), mesmo que todos estejam ativos. Um bucket
+    descartado volta cheio, o que só favorece o cliente mais antigo.
+    """
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, limit, now, cost=1):
+        """Tenta gastar `cost` tokens; retorna (permitido, segundos até haver tokens)"""
+        with self._lock:
+            tokens, last = self._buckets.get(key, (limit.capacity, now))
+            tokens = min(limit.capacity, tokens + (now - last) * limit.rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        retry_after = 0.0 if allowed else (cost - tokens) / limit.rate
+        return allowed, retry_after
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class SQLiteBucketStore:
+    """Estado dos buckets em um arquivo SQLite próprio, compartilhado por vários workers"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS rate_limit_bucket '
+            '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)'
+        )
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def consume(self, key, limit, now, cost=1):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT tokens, updated FROM rate_limit_bucket WHERE key = ?', (key,)
+            ).fetchone()
+            tokens, last = row if row else (limit.capacity, now)
+            tokens = min(limit.capacity, tokens + (now - last) * limit.rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            conn.execute(
+                'INSERT OR REPLACE INTO rate_limit_bucket (key, tokens, updated) VALUES (?, ?, ?)',
+                (key, tokens, now),
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        retry_after = 0.0 if allowed else (cost - tokens) / limit.rate
+        return allowed, retry_after
+
+
+def create_store(storage):
+    """Cria o store a partir de RATE_LIMIT_STORAGE ("memory" ou "sqlite:///caminho")"""
+    if not storage or storage == 'memory':
+        return MemoryBucketStore()
+    if storage.startswith('sqlite:///'):
+        return SQLiteBucketStore(storage[len('sqlite:///'):])
+    raise ValueError(f'RATE_LIMIT_STORAGE inválido: {storage}')
+
+
+class RateLimiter:
+    """Token bucket por IP, usuário e rota, aplicado em before_request"""
+
+    def __init__(self, app=None):
+        self.limits = {}
+        self.store = None
+        self.enabled = True
+        self.proxy_hops = 0
+        self._counters = defaultdict(lambda: {'allowed': 0, 'limited': 0})
+        self._counters_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('RATE_LIMIT_ENABLED', True)
+        self.proxy_hops = app.config.get('RATE_LIMIT_PROXY_HOPS', 0)
+        limits = dict(DEFAULT_RATE_LIMITS)
+        limits.update(app.config.get('RATE_LIMITS', {}))
+        self.limits = {name: RateLimit(spec) for name, spec in limits.items() if spec}
+        self.store = create_store(app.config.get('RATE_LIMIT_STORAGE', 'memory'))
+        app.before_request(self.check_request)
+        app.extensions['rate_limiter'] = self
+
+    def limit_for(self, endpoint):
+        """Limite do endpoint; se não houver, o do blueprint dele"""
+        if endpoint in self.limits:
+            return endpoint, self.limits[endpoint]
+        blueprint = endpoint.rpartition('.')[0]
+        if blueprint in self.limits:
+            return blueprint, self.limits[blueprint]
+        return None, None
+
+    def client_ip(self):
+        """IP do cliente: o da conexão ou, atrás de RATE_LIMIT_PROXY_HOPS proxies, o que o
+        proxy mais externo acrescentou ao X-Forwarded-For (como ProxyFix(x_for=N))"""
+        if self.proxy_hops:
+            # Cada proxy acrescenta ao final o IP de quem o chamou; as entradas antes
+            # dessas foram escritas pelo próprio cliente e não servem de chave
+            forwarded = [part.strip() for part in request.headers.get('X-Forwarded-For', '').split(',')
+                         if part.strip()]
+            if len(forwarded) >= self.proxy_hops:
+                return forwarded[-self.proxy_hops]
+        return request.remote_addr or '-'
+
+    def client_user(self):
+        # Apenas decodifica o token; o usuário é validado depois por token_required
+        from src.models.user import User
+
+        auth_header = request.headers.get('Authorization', '')
+        if not auth_header.startswith('Bearer '):
+            return '-'
+        payload = User.verify_token(auth_header[len('Bearer '):], current_app.config['SECRET_KEY'])
+        if not payload:
+            return '-'
+        # Ids de usuário se repetem entre oficinas
+        tenant = payload.get('tenant')
+        return f"{payload['user_id']}@{tenant}" if tenant else str(payload['user_id'])
+
+    def check_request(self):
+        if not self.enabled or request.method == 'OPTIONS' or not request.endpoint:
+            return None
+
+        rule_name, limit = self.limit_for(request.endpoint)
+        if limit is None:
+            return None
+
+        key = f'{request.endpoint}|{self.client_ip()}|{self.client_user()}'
+        allowed, retry_after = self.store.consume(key, limit, time.time())
+
+        with self._counters_lock:
+            self._counters[rule_name]['allowed' if allowed else 'limited'] += 1
+
+        if allowed:
+            return None
+
+        retry_after = max(1, math.ceil(retry_after))
+        response = jsonify({
+            'message': f'Muitas requisições. Tente novamente em {retry_after} segundos.'
+        })
+        response.status_code = 429
+        response.headers['Retry-After'] = str(retry_after)
+        return response
+
+    def stats(self):
+        """Contadores de requisições permitidas e limitadas por regra"""
+        with self._counters_lock:
+            return {
+                name: {'limit': self.limits[name].spec, **counts}
+                for name, counts in self._counters.items()
+            }
+
+    def collect_metrics(self):
+        """Contadores no formato aceito por RequestMetrics.register_collector"""
+        samples = [
+            ({'rule': name, 'result': result}, counts[result])
+            for name, counts in sorted(self.stats().items())
+            for result in ('allowed', 'limited')
+        ]
+        return [('rate_limit_requests_total', 'counter',
+                 'Requisições avaliadas pelo rate limiter', samples)]
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,358 @@
+import cProfile
+import json
+import os
+import pstats
+import random
+import re
+import secrets
+import threading
+import time
+from collections import Counter
+from contextlib import nullcontext
+from datetime import datetime
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from src.utils.sql_profiler import statement_shape
+from src.utils.tenancy import DEFAULT_TENANT, current_tenant
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_ID_HEADER = 'X-Profile-Id'
+
+# Rotas que não valem um profile (e as que listam os profiles, que só poluiriam a lista)
+EXCLUDED_ENDPOINTS = {'health_check', 'metrics', 'serve', 'static',
+                      'profiles.get_profiles', 'profiles.get_profile', 'profiles.download_profile'}
+
+PROFILE_ID_PATTERN = re.compile(r'^\d{8}-\d{6}-\d{6}-[0-9a-f]{4}$')
+
+# Uma requisição com N+1 gera milhares de comandos: a linha do tempo guarda os primeiros
+MAX_TIMELINE_EVENTS = 500
+MAX_DETAIL_CHARS = 300
+
+_NO_PHASE = nullcontext()
+
+
+class RequestProfile:
+    """cProfile e linha do tempo (auth, sql, serialization) de uma requisição"""
+
+    def __init__(self, profile_id, trigger):
+        self.id = profile_id
+        self.trigger = trigger
+        self.started_at = datetime.now()
+        self.profiler = cProfile.Profile()
+        self.events = []
+        self.dropped_events = 0
+        self.totals = Counter()
+        self.counts = Counter()
+        self.status = None
+        self.start = time.perf_counter()
+        self.end = None
+
+    def mark(self, phase, start, end, detail=None):
+        self.totals[phase] += end - start
+        self.counts[phase] += 1
+        if len(self.events) >= MAX_TIMELINE_EVENTS:
+            self.dropped_events += 1
+            return
+        entry = {
+            'phase': phase,
+            'startMs': round((start - self.start) * 1000, 3),
+            'durationMs': round((end - start) * 1000, 3),
+        }
+        if detail:
+            entry['detail'] = detail[:MAX_DETAIL_CHARS]
+        self.events.append(entry)
+
+    def metadata(self, user):
+        return {
+            'id': self.id,
+            'tenant': current_tenant() or DEFAULT_TENANT,
+            'method': request.method,
+            'path': request.path,
+            'query': request.query_string.decode('utf-8', 'replace'),
+            'endpoint': request.endpoint,
+            'status': self.status,
+            'trigger': self.trigger,
+            'user': user,
+            'startedAt': self.started_at.isoformat(timespec='milliseconds'),
+            'durationMs': round((self.end - self.start) * 1000, 3),
+            'phases': {phase: {'ms': round(self.totals[phase] * 1000, 3), 'count': self.counts[phase]}
+                       for phase in ('auth', 'sql', 'serialization')},
+            'timeline': self.events,
+            'timelineDropped': self.dropped_events,
+        }
+
+
+class _Phase:
+    __slots__ = ('name', 'detail', 'profile', 'start')
+
+    def __init__(self, name, detail=None):
+        self.name = name
+        self.detail = detail
+
+    def __enter__(self):
+        self.profile = g.get('_request_profile') if has_request_context() else None
+        if self.profile is not None:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.profile is not None:
+            self.profile.mark(self.name, self.start, time.perf_counter(), self.detail)
+        return False
+
+
+def profile_phase(name, detail=None):
+    """Marca o bloco na linha do tempo do profile da requisição atual.
+
+    Com REQUEST_PROFILING desligado devolve sempre o mesmo nullcontext: não
+    consulta g nem mede tempo.
+    """
+    if not request_profiler.enabled:
+        return _NO_PHASE
+    return _Phase(name, detail)
+
+
+class ProfiledJSONMixin:
+    """Conta a serialização JSON (jsonify, make_response de dict/list) como fase do profile"""
+
+    def dumps(self, obj, **kwargs):
+        with profile_phase('serialization'):
+            return super().dumps(obj, **kwargs)
+
+
+class RequestProfiler:
+    """Profiling sob demanda de requisições, ligado por REQUEST_PROFILING.
+
+    Uma requisição é perfilada quando traz X-Profile: 1 com token de
+    administrador ou quando cai na amostra (REQUEST_PROFILE_SAMPLE_PERCENT).
+    O profile guarda o pstats do cProfile (.prof, abre com snakeviz ou
+    pstats) e uma linha do tempo com os comandos SQL, a validação do token
+    (auth) e a serialização JSON. Os arquivos ficam em REQUEST_PROFILE_DIR,
+    limitados a REQUEST_PROFILE_KEEP profiles e REQUEST_PROFILE_MAX_MB.
+
+    Desligado, init_app não registra hook nenhum. Ligado, uma requisição é
+    perfilada por vez: o cProfile do Python 3.12+ é global ao processo.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.sample_rate = 0.0
+        self.profile_dir = None
+        self.keep = 200
+        self.max_bytes = 100 * 1024 * 1024
+        self._slot = threading.Lock()
+        self._counters = Counter()
+        self._counters_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('REQUEST_PROFILING', False)
+        self.sample_rate = app.config.get('REQUEST_PROFILE_SAMPLE_PERCENT', 0) / 100
+        self.profile_dir = app.config.get('REQUEST_PROFILE_DIR')
+        self.keep = app.config.get('REQUEST_PROFILE_KEEP', 200)
+        self.max_bytes = app.config.get('REQUEST_PROFILE_MAX_MB', 100) * 1024 * 1024
+        app.extensions['request_profiler'] = self
+        if not self.enabled:
+            return
+
+        os.makedirs(self.profile_dir, exist_ok=True)
+        app.json = type(f'Profiled{type(app.json).__name__}', (ProfiledJSONMixin, type(app.json)), {})(app)
+        event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def _count(self, result):
+        with self._counters_lock:
+            self._counters[result] += 1
+
+    @staticmethod
+    def token_payload():
+        # Apenas decodifica o token; o usuário é validado depois por token_required
+        from src.models.user import User
+
+        auth_header = request.headers.get('Authorization', '')
+        if not auth_header.startswith('Bearer '):
+            return None
+        return User.verify_token(auth_header[len('Bearer '):], current_app.config['SECRET_KEY'])
+
+    def trigger(self):
+        """'header', 'sample' ou None (requisição não perfilada)"""
+        if request.headers.get(PROFILE_HEADER) == '1':
+            payload = self.token_payload()
+            if payload and payload.get('role') == 'administrador':
+                return 'header'
+        if self.sample_rate and random.random() < self.sample_rate:
+            return 'sample'
+        return None
+
+    def _before_request(self):
+        if request.method == 'OPTIONS' or not request.endpoint or request.endpoint in EXCLUDED_ENDPOINTS:
+            return None
+        trigger = self.trigger()
+        if trigger is None:
+            return None
+        if not self._slot.acquire(blocking=False):
+            self._count('busy')
+            return None
+
+        # O id começa pela hora (com microssegundos): a ordem dos nomes é a ordem de gravação
+        profile = RequestProfile(f"{datetime.now():%Y%m%d-%H%M%S-%f}-{secrets.token_hex(2)}", trigger)
+        try:
+            profile.profiler.enable()
+        except ValueError:
+            # Outro profiler (sys.setprofile / sys.monitoring) já está ativo neste processo
+            self._slot.release()
+            self._count('busy')
+            return None
+        g._request_profile = profile
+        return None
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None and has_request_context() and '_request_profile' in g:
+            context._request_profile_start = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, '_request_profile_start', None)
+        if start is None:
+            return
+        profile = g.get('_request_profile')
+        if profile is not None:
+            profile.mark('sql', start, time.perf_counter(), statement_shape(statement))
+
+    def _after_request(self, response):
+        profile = g.get('_request_profile')
+        if profile is not None:
+            profile.status = response.status_code
+            response.headers[PROFILE_ID_HEADER] = profile.id
+        return response
+
+    def _teardown_request(self, exc):
+        # teardown roda mesmo com exceção na view: o profiler sempre é desligado
+        profile = g.pop('_request_profile', None)
+        if profile is None:
+            return
+        try:
+            profile.profiler.disable()
+            profile.end = time.perf_counter()
+            if profile.status is None:
+                profile.status = 500
+            payload = self.token_payload()
+            user = payload.get('username') if payload else None
+            save_profile(self.profile_dir, profile, profile.metadata(user))
+            prune_profiles(self.profile_dir, self.keep, self.max_bytes)
+            self._count(profile.trigger)
+        except Exception as e:
+            current_app.logger.warning('Não foi possível salvar o profile %s: %s', profile.id, e)
+            self._count('error')
+        finally:
+            self._slot.release()
+
+    def stats(self):
+        with self._counters_lock:
+            counters = dict(self._counters)
+        return {'enabled': self.enabled, 'sampleRate': self.sample_rate, 'counters': counters}
+
+    def collect_metrics(self):
+        """Profiles gravados no formato de RequestMetrics.register_collector"""
+        counters = self.stats()['counters']
+        return [
+            ('request_profiles_total', 'counter',
+             'Requisições perfiladas por gatilho (header, sample); busy = outro profile em andamento, '
+             'error = falha ao gravar',
+             [({'result': result}, counters.get(result, 0)) for result in ('header', 'sample', 'busy', 'error')]),
+        ]
+
+
+request_profiler = RequestProfiler()
+
+
+def profile_paths(profile_dir, profile_id):
+    """(.json, .prof) do profile, ou None para um id inválido"""
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    base = os.path.join(profile_dir, profile_id)
+    return base + '.json', base + '.prof'
+
+
+def save_profile(profile_dir, profile, metadata):
+    json_path, prof_path = profile_paths(profile_dir, profile.id)
+    profile.profiler.dump_stats(prof_path)
+    metadata['profileBytes'] = os.path.getsize(prof_path)
+    # Escreve em arquivo temporário: a listagem nunca lê um JSON pela metade
+    temp_path = json_path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, ensure_ascii=False)
+    os.replace(temp_path, json_path)
+
+
+def load_profile(profile_dir, profile_id):
+    paths = profile_paths(profile_dir, profile_id)
+    if paths is None or not os.path.exists(paths[0]):
+        return None
+    with open(paths[0], encoding='utf-8') as f:
+        return json.load(f)
+
+
+def list_profiles(profile_dir, tenant=None):
+    """Profiles gravados (todos ou só os de uma oficina), do mais novo para o mais antigo, sem a linha do tempo"""
+    if not profile_dir or not os.path.isdir(profile_dir):
+        return []
+    profiles = []
+    for filename in sorted(os.listdir(profile_dir), reverse=True):
+        if not filename.endswith('.json'):
+            continue
+        try:
+            metadata = load_profile(profile_dir, filename[:-len('.json')])
+        except (OSError, ValueError):
+            continue
+        if metadata is None or (tenant is not None and metadata.get('tenant') != tenant):
+            continue
+        metadata.pop('timeline', None)
+        profiles.append(metadata)
+    return profiles
+
+
+def prune_profiles(profile_dir, keep, max_bytes):
+    """Mantém os `keep` profiles mais novos e no máximo max_bytes em disco; apaga os demais"""
+    ids = sorted((filename[:-len('.json')] for filename in os.listdir(profile_dir)
+                  if filename.endswith('.json')), reverse=True)
+    total = 0
+    removed = []
+    for index, profile_id in enumerate(ids):
+        paths = profile_paths(profile_dir, profile_id)
+        if paths is None:
+            continue
+        size = sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+        total += size
+        if index >= keep or total > max_bytes:
+            for path in paths:
+                if os.path.exists(path):
+                    os.remove(path)
+            removed.append(profile_id)
+    return removed
+
+
+def top_functions(prof_path, sort='cumulative', limit=30):
+    """As `limit` funções com mais tempo no pstats, ordenadas por cumulative ou tottime"""
+    stats = pstats.Stats(prof_path)
+    stats.sort_stats(sort)
+    functions = []
+    for func in stats.fcn_list[:limit]:
+        primitive_calls, total_calls, own_time, cumulative_time, _ = stats.stats[func]
+        filename, line, name = func
+        functions.append({
+            'function': name,
+            'file': filename,
+            'line': line,
+            'calls': total_calls,
+            'primitiveCalls': primitive_calls,
+            'ownMs': round(own_time * 1000, 3),
+            'cumulativeMs': round(cumulative_time * 1000, 3),
+        })
+    return functions
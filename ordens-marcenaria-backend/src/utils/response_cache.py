@@ -0,0 +1,267 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import date
+from functools import wraps
+
+from flask import current_app, request
+
+from src.utils.cache import reference_cache
+from src.utils.coalescing import replay_response, request_coalescer, request_key
+
+# Cabeçalhos da resposta original que fazem parte da entrada; CORS e métricas
+# são acrescentados de novo pelos after_request a cada requisição
+STORED_HEADERS = ('Content-Type', 'ETag', 'Cache-Control')
+
+
+class CachedResponse:
+    def __init__(self, version, headers, body):
+        self.version = version
+        self.headers = headers
+        self.body = body
+
+    @property
+    def size(self):
+        return len(self.body)
+
+
+class MemoryResponseStore:
+    """Respostas na memória do processo, em LRU limitado por quantidade e por bytes"""
+
+    def __init__(self, max_entries=512, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous.size
+            self._entries[key] = entry
+            self.bytes += entry.size
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= evicted.size
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.bytes -= entry.size
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self.bytes, 'evictions': self.evictions}
+
+
+class SQLiteResponseStore:
+    """Respostas em um arquivo SQLite próprio, compartilhado por vários workers.
+
+    O LRU usa a hora do último acesso, atualizada no máximo uma vez por
+    TOUCH_SECONDS por entrada para que leituras em cache não virem escritas.
+    """
+
+    TOUCH_SECONDS = 30
+
+    def __init__(self, path, max_entries=2048, max_bytes=256 * 1024 * 1024):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS response_cache '
+            '(key TEXT PRIMARY KEY, version TEXT NOT NULL, headers TEXT NOT NULL, '
+            'body BLOB NOT NULL, size INTEGER NOT NULL, used REAL NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_response_cache_used ON response_cache (used)')
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self._connection()
+        row = conn.execute('SELECT version, headers, body, used FROM response_cache WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        version, headers, body, used = row
+        now = time.time()
+        if now - used > self.TOUCH_SECONDS:
+            conn.execute('UPDATE response_cache SET used = ? WHERE key = ?', (now, key))
+        return CachedResponse(version, [tuple(line.split(': ', 1)) for line in headers.split('\n') if line], body)
+
+    def put(self, key, entry):
+        if entry.size > self.max_bytes:
+            return
+        conn = self._connection()
+        headers = '\n'.join(f'{name}: {value}' for name, value in entry.headers)
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                'INSERT OR REPLACE INTO response_cache (key, version, headers, body, size, used) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (key, entry.version, headers, entry.body, entry.size, time.time()),
+            )
+            count, total = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM response_cache').fetchone()
+            while count > self.max_entries or total > self.max_bytes:
+                oldest = conn.execute('SELECT key, size FROM response_cache ORDER BY used LIMIT 1').fetchone()
+                conn.execute('DELETE FROM response_cache WHERE key = ?', (oldest[0],))
+                count, total = count - 1, total - oldest[1]
+                self.evictions += 1
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def delete(self, key):
+        self._connection().execute('DELETE FROM response_cache WHERE key = ?', (key,))
+
+    def stats(self):
+        count, total = self._connection().execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM response_cache').fetchone()
+        return {'entries': count, 'bytes': total, 'evictions': self.evictions}
+
+
+def create_store(storage, max_entries, max_bytes):
+    """Cria o store a partir de RESPONSE_CACHE_STORAGE ("memory" ou "sqlite:///caminho")"""
+    if not storage or storage == 'memory':
+        return MemoryResponseStore(max_entries, max_bytes)
+    if storage.startswith('sqlite:///'):
+        return SQLiteResponseStore(storage[len('sqlite:///'):], max_entries, max_bytes)
+    raise ValueError(f'RESPONSE_CACHE_STORAGE inválido: {storage}')
+
+
+class ResponseCache:
+    """Cache das respostas 200 das rotas GET de leitura, por rota, query string, papel,
+    oficina e dia.
+
+    Cada entrada guarda as versões das tabelas de que a rota depende, as mesmas
+    versões em arquivo do ReferenceCache: um commit que escreve numa dessas
+    tabelas (ORM, UPDATE em lote, SQL textual, jobs, outro worker) muda a versão
+    e a entrada deixa de valer. O dia entra na chave porque as listas recalculam
+    status por data.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.store = None
+        self._counters = defaultdict(lambda: {'hit': 0, 'miss': 0, 'stale': 0})
+        self._counters_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        # Sem o diretório de versões não há como saber de escritas: cache desligado
+        self.enabled = app.config.get('RESPONSE_CACHE_ENABLED', True) and bool(reference_cache.version_dir)
+        self.store = create_store(app.config.get('RESPONSE_CACHE_STORAGE', 'memory'),
+                                  app.config.get('RESPONSE_CACHE_MAX_ENTRIES', 512),
+                                  app.config.get('RESPONSE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+        app.extensions['response_cache'] = self
+
+    @staticmethod
+    def namespaces(tables):
+        return [f'response.{table}' for table in tables]
+
+    @staticmethod
+    def key(current_user):
+        return request_key(current_user, date.today().isoformat())
+
+    def _count(self, endpoint, result):
+        with self._counters_lock:
+            self._counters[endpoint][result] += 1
+
+    def serve(self, view, tables, current_user, args, kwargs):
+        if request.method != 'GET':
+            return view(current_user, *args, **kwargs)
+        if not self.enabled:
+            return request_coalescer.serve(view, current_user, args, kwargs, self.key(current_user))
+
+        key = self.key(current_user)
+        # Versões lidas antes da view: uma escrita durante a montagem deixa a entrada já vencida
+        version = repr(reference_cache.versions(self.namespaces(tables)))
+        entry = self.store.get(key)
+        if entry is not None and entry.version == version:
+            self._count(request.endpoint, 'hit')
+            return self._replay(entry)
+
+        self._count(request.endpoint, 'miss' if entry is None else 'stale')
+        if entry is not None:
+            self.store.delete(key)
+
+        # Faltas simultâneas da mesma chave e versão viram uma execução só; quem pegou
+        # carona recebe a resposta do líder, que é quem a guarda
+        response = request_coalescer.serve(view, current_user, args, kwargs, f'{key}|{version}')
+        response = current_app.make_response(response)
+        if response.status_code == 200 and not response.is_streamed and 'X-Coalesced' not in response.headers:
+            headers = [(name, response.headers[name]) for name in STORED_HEADERS if name in response.headers]
+            self.store.put(key, CachedResponse(version, headers, response.get_data()))
+            response.headers['X-Cache'] = 'MISS'
+        return response
+
+    @staticmethod
+    def _replay(entry):
+        response = replay_response(entry.body, entry.headers)
+        response.headers['X-Cache'] = 'HIT'
+        return response
+
+    def stats(self):
+        with self._counters_lock:
+            endpoints = {endpoint: dict(counts) for endpoint, counts in self._counters.items()}
+        return {'enabled': self.enabled, 'endpoints': endpoints, **(self.store.stats() if self.store else {})}
+
+    def collect_metrics(self):
+        """Acertos, faltas e tamanho no formato de RequestMetrics.register_collector"""
+        stats = self.stats()
+        endpoints = sorted(stats['endpoints'].items())
+        ratios = []
+        for endpoint, counts in endpoints:
+            total = sum(counts.values())
+            ratios.append(({'endpoint': endpoint}, round(counts['hit'] / total, 4) if total else 0))
+        return [
+            ('response_cache_requests_total', 'counter',
+             'Requisições às rotas em cache por resultado (hit, miss, stale = invalidada por escrita)',
+             [({'endpoint': endpoint, 'result': result}, counts[result])
+              for endpoint, counts in endpoints for result in ('hit', 'miss', 'stale')]),
+            ('response_cache_hit_ratio', 'gauge', 'Fração das requisições atendidas pelo cache', ratios),
+            ('response_cache_entries', 'gauge', 'Respostas guardadas', [({}, stats.get('entries', 0))]),
+            ('response_cache_bytes', 'gauge', 'Bytes das respostas guardadas', [({}, stats.get('bytes', 0))]),
+            ('response_cache_evictions_total', 'counter', 'Respostas descartadas pelo limite do LRU',
+             [({}, stats.get('evictions', 0))]),
+        ]
+
+
+response_cache = ResponseCache()
+
+
+def cached_response(*tables):
+    """Guarda a resposta da view GET até um commit em alguma das tabelas; use abaixo de @token_required"""
+    for table, namespace in zip(tables, ResponseCache.namespaces(tables)):
+        reference_cache.invalidate_on_write(namespace, table)
+
+    def decorator(f):
+        @wraps(f)
+        def decorated(current_user, *args, **kwargs):
+            return response_cache.serve(f, tables, current_user, args, kwargs)
+        return decorated
+    return decorator
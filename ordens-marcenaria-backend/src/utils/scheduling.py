@@ -0,0 +1,106 @@
+import heapq
+import math
+from datetime import date, timedelta
+
+from sqlalchemy import func, or_, text
+
+from src.models.user import db, Order
+
+# Limite de atribuições aplicadas em um único UPDATE (2 parâmetros por ordem)
+MAX_ASSIGNMENTS_PER_APPLY = 5000
+
+
+def unassigned_filter():
+    return or_(Order.carpenter.is_(None), Order.carpenter == '')
+
+
+def load_unassigned_orders(order_ids=None):
+    """(id, exit_date) das ordens em aberto sem marceneiro, da saída mais próxima para a mais distante"""
+    query = (db.session.query(Order.id, Order.exit_date)
+             .filter(Order.status != 'concluida', unassigned_filter()))
+    if order_ids:
+        query = query.filter(Order.id.in_(order_ids))
+    return query.order_by(Order.exit_date, Order.id).all()
+
+
+def load_workloads(names):
+    """Ordens em aberto por marceneiro (um GROUP BY); marceneiros sem ordens ficam com zero"""
+    workloads = dict.fromkeys(names, 0)
+    if names:
+        rows = (db.session.query(Order.carpenter, func.count(Order.id))
+                .filter(Order.status != 'concluida', Order.carpenter.in_(names))
+                .group_by(Order.carpenter)
+                .all())
+        workloads.update(rows)
+    return workloads
+
+
+def suggest_assignments(orders, workloads, days_per_order, max_per_carpenter=None, today=None):
+    """Distribui as ordens (já em ordem de prazo) entre os marceneiros com um heap de carga.
+
+    Cada ordem, da saída mais próxima para a mais distante, vai para o marceneiro
+    com menos ordens em aberto naquele momento: O(n log m). A previsão de término
+    supõe days_per_order dias por ordem na fila do marceneiro; ordens cuja
+    previsão passa da data de saída voltam marcadas com atRisk.
+    """
+    today = today or date.today()
+    heap = [(load, name) for name, load in workloads.items()]
+    heapq.heapify(heap)
+    added = dict.fromkeys(workloads, 0)
+
+    assignments, left_over = [], []
+    for order_id, exit_date in orders:
+        while heap and max_per_carpenter is not None and added[heap[0][1]] >= max_per_carpenter:
+            heapq.heappop(heap)
+        if not heap:
+            left_over.append(order_id)
+            continue
+
+        load, name = heapq.heappop(heap)
+        load += 1
+        added[name] += 1
+        projected_finish = today + timedelta(days=math.ceil(load * days_per_order))
+        assignments.append({
+            'orderId': order_id,
+            'carpenter': name,
+            'exitDate': exit_date.isoformat(),
+            'queuePosition': load,
+            'projectedFinish': projected_finish.isoformat(),
+            'atRisk': projected_finish > exit_date
+        })
+        heapq.heappush(heap, (load, name))
+
+    workload_after = {name: workloads[name] + added[name] for name in workloads}
+    return assignments, left_over, workload_after
+
+
+def apply_assignments(assignments, updated_at):
+    """Grava o plano em um único UPDATE ... FROM (VALUES ...); não faz commit.
+
+    Só ordens que continuam em aberto e sem marceneiro são alteradas; devolve o
+    número de linhas atualizadas para quem chama conferir se o plano inteiro valeu.
+    Cada linha do plano é achada pela chave primária, em vez de um CASE com um
+    ramo por ordem avaliado para cada linha.
+    """
+    params = {'updated_at': updated_at}
+    rows = []
+    for index, assignment in enumerate(assignments):
+        params[f'o{index}'] = assignment['orderId']
+        params[f'c{index}'] = assignment['carpenter']
+        rows.append(f'(:o{index}, :c{index})')
+
+    # No SQLite as colunas de um VALUES se chamam column1, column2...
+    statement = text(
+        'UPDATE "order" SET carpenter = plan.column2, updated_at = :updated_at, version = version + 1 '
+        f'FROM (VALUES {", ".join(rows)}) AS plan '
+        'WHERE "order".id = plan.column1 AND "order".status != \'concluida\' '
+        'AND ("order".carpenter IS NULL OR "order".carpenter = \'\')'
+    )
+    return db.session.execute(statement, params).rowcount
+
+
+def conflicting_orders(order_ids):
+    """Ordens do plano que já não estão disponíveis (atribuídas, concluídas ou removidas)"""
+    available = {row.id for row in db.session.query(Order.id)
+                 .filter(Order.id.in_(order_ids), Order.status != 'concluida', unassigned_filter())}
+    return [order_id for order_id in order_ids if order_id not in available]
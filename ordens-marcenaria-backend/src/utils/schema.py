@@ -0,0 +1,72 @@
+from sqlalchemy import inspect, text
+
+from src.models.user import db
+from src.utils.material_catalog import link_uncataloged_materials
+
+# Preenchimento de colunas novas em bancos que já existiam; roda só quando a coluna é criada.
+# Cada valor é um UPDATE em SQL ou uma função que recebe a conexão.
+BACKFILLS = {
+    # Sem histórico da conclusão, a última alteração da ordem é a melhor aproximação
+    ('order', 'completed_at'): "UPDATE \"order\" SET completed_at = updated_at WHERE status = 'concluida'",
+    ('archived_order', 'completed_at'): "UPDATE archived_order SET completed_at = updated_at WHERE status = 'concluida'",
+    ('material', 'catalog_id'): link_uncataloged_materials,
+}
+
+# Correções que rodam a cada upgrade_schema, idempotentes e servidas por índice
+REPAIRS = (
+    # Concluídas sem completed_at (SQL fora do ORM): o arquivamento filtra só por ele
+    "UPDATE \"order\" SET completed_at = updated_at WHERE status = 'concluida' AND completed_at IS NULL",
+)
+
+
+def add_missing_columns(engine):
+    """Adiciona (ALTER TABLE ADD COLUMN) colunas declaradas nos modelos que faltam no banco"""
+    quote = engine.dialect.identifier_preparer.quote
+    added = []
+
+    with engine.begin() as connection:
+        # Inspeção na mesma conexão: o pool de escrita pode ter uma conexão só
+        inspector = inspect(connection)
+        for table in db.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                if not column.nullable and column.server_default is None:
+                    print(f"⚠️  Coluna {table.name}.{column.name} é obrigatória e precisa de migração manual")
+                    continue
+
+                ddl = f'ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} ' \
+                      f'{column.type.compile(dialect=engine.dialect)}'
+                if column.server_default is not None:
+                    # Linhas existentes recebem o valor padrão, então a coluna pode ser NOT NULL
+                    default = column.server_default.arg
+                    default = f"'{default}'" if isinstance(default, str) else str(default)
+                    ddl += f' NOT NULL DEFAULT {default}' if not column.nullable else f' DEFAULT {default}'
+                connection.execute(text(ddl))
+                backfill = BACKFILLS.get((table.name, column.name))
+                if callable(backfill):
+                    backfill(connection)
+                elif backfill:
+                    connection.execute(text(backfill))
+                added.append(f'{table.name}.{column.name}')
+
+    return added
+
+
+def upgrade_schema(engine=None):
+    """Cria tabelas, colunas e índices que faltam (no banco principal ou no de uma oficina).
+
+    db.create_all() só cria tabelas novas; colunas e índices declarados depois
+    em tabelas que já existem no banco precisam ser criados à parte.
+    """
+    engine = engine if engine is not None else db.engine
+    db.metadata.create_all(bind=engine)
+    for name in add_missing_columns(engine):
+        print(f"Coluna adicionada ao banco {engine.url.database}: {name}")
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    with engine.begin() as connection:
+        for statement in REPAIRS:
+            connection.execute(text(statement))
@@ -0,0 +1,99 @@
+import os
+import signal
+import threading
+import time
+
+from werkzeug.serving import make_server
+from werkzeug.wsgi import ClosingIterator
+
+
+class InFlightCounter:
+    """Middleware WSGI que conta as requisições em andamento para o desligamento gracioso.
+
+    Durante a drenagem as respostas saem com Connection: close, para que o
+    proxy (ngrok) abra a próxima conexão no socket compartilhado, já atendido
+    pelo processo novo.
+    """
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        self.count = 0
+        self.draining = False
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+
+    def __call__(self, environ, start_response):
+        with self._lock:
+            self.count += 1
+
+        def tracked_start_response(status, headers, exc_info=None):
+            if self.draining:
+                headers = [(name, value) for name, value in headers if name.lower() != 'connection']
+                headers.append(('Connection', 'close'))
+            return start_response(status, headers, exc_info)
+
+        try:
+            # ClosingIterator: a requisição só termina quando o corpo foi todo enviado
+            return ClosingIterator(self.wsgi_app(environ, tracked_start_response), self._finished)
+        except BaseException:
+            self._finished()
+            raise
+
+    def _finished(self):
+        with self._lock:
+            self.count -= 1
+            if self.count == 0:
+                self._idle.notify_all()
+
+    def wait_idle(self, timeout):
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while self.count:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+
+def health_self_check(app):
+    """GET /api/health dentro do próprio processo: pelo socket compartilhado a
+    requisição poderia cair no processo antigo"""
+    with app.test_client() as client:
+        return client.get('/api/health').status_code == 200
+
+
+def serve_supervised(app, fd, host='0.0.0.0', port=5000, ready_fd=None, drain_seconds=30):
+    """Atende no socket aberto pelo start_server.py (herdado no descritor fd).
+
+    Depois do autoteste escreve "ready" em ready_fd. No SIGTERM para de aceitar
+    conexões, espera as requisições em andamento (até drain_seconds) e sai; o
+    socket continua aberto no supervisor e no processo novo, então nenhuma
+    conexão é recusada durante o reload.
+    """
+    counter = InFlightCounter(app.wsgi_app)
+    server = make_server(host, port, counter, threaded=True, fd=fd)
+
+    if not health_self_check(app):
+        raise SystemExit('Autoteste de /api/health falhou')
+    if ready_fd is not None:
+        os.write(ready_fd, b'ready\n')
+        os.close(ready_fd)
+
+    def handle_stop(signum, frame):
+        counter.draining = True
+        # shutdown() espera o serve_forever terminar: não pode rodar na thread dele
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, handle_stop)
+    signal.signal(signal.SIGINT, handle_stop)
+
+    print(f'🚀 Servidor atendendo no socket do supervisor (pid {os.getpid()})', flush=True)
+    server.serve_forever()
+    server.socket.close()
+
+    started = time.monotonic()
+    if counter.wait_idle(drain_seconds):
+        print(f'✅ Requisições em andamento concluídas em {time.monotonic() - started:.1f}s', flush=True)
+    else:
+        print(f'⚠️  {counter.count} requisição(ões) ainda em andamento após {drain_seconds}s', flush=True)
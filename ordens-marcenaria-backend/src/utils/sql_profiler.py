@@ -0,0 +1,151 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('sql_profiler')
+
+_IN_LIST = re.compile(r'\((?:\s*\?\s*,)+\s*\?\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+_TRANSACTION_CONTROL = re.compile(r'^\s*(BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE)\b', re.I)
+
+
+def statement_shape(statement):
+    """Normaliza o SQL para comparar "o mesmo comando" (listas IN de tamanhos diferentes contam igual)"""
+    return _IN_LIST.sub('(?)', _WHITESPACE.sub(' ', statement.strip()))
+
+
+class SQLProfiler:
+    """Modo de profiling de SQL ligado por SQL_PROFILING.
+
+    - Loga comandos acima de SQL_SLOW_QUERY_MS com parâmetros e EXPLAIN QUERY PLAN.
+    - Avisa quando o mesmo formato de comando se repete SQL_N_PLUS_ONE_THRESHOLD
+      vezes ou mais em uma requisição (provável N+1).
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.slow_query_seconds = 0.1
+        self.n_plus_one_threshold = 5
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('SQL_PROFILING', False)
+        self.slow_query_seconds = app.config.get('SQL_SLOW_QUERY_MS', 100) / 1000
+        self.n_plus_one_threshold = app.config.get('SQL_N_PLUS_ONE_THRESHOLD', 5)
+        app.extensions['sql_profiler'] = self
+        if not self.enabled:
+            return
+
+        event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+    def _before_request(self):
+        g._profiler_shapes = Counter()
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._profiler_start = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, '_profiler_start', None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+
+        if has_request_context() and '_profiler_shapes' in g:
+            g._profiler_shapes[statement_shape(statement)] += 1
+
+        if elapsed >= self.slow_query_seconds:
+            plan = None if executemany else self._query_plan(cursor, statement, parameters)
+            logger.warning(
+                'Query lenta (%.1f ms) em %s: %s | parâmetros=%r%s',
+                elapsed * 1000,
+                request.path if has_request_context() else '-',
+                _WHITESPACE.sub(' ', statement.strip()),
+                parameters,
+                '\n  plano: ' + '\n  plano: '.join(plan) if plan else '',
+            )
+
+    @staticmethod
+    def _query_plan(cursor, statement, parameters):
+        if not statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+            return None
+        try:
+            # Cursor novo na mesma conexão DBAPI, para não mexer no resultado pendente
+            rows = cursor.connection.execute('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+        except Exception as e:
+            return [f'(não foi possível obter o plano: {e})']
+        return [str(row[-1]) for row in rows]
+
+    def _after_request(self, response):
+        shapes = g.pop('_profiler_shapes', None)
+        if not shapes:
+            return response
+
+        for shape, count in shapes.items():
+            if count >= self.n_plus_one_threshold:
+                logger.warning(
+                    'Provável N+1 em %s %s: %d execuções de: %s',
+                    request.method, request.path, count, shape,
+                )
+        return response
+
+
+class QueryRecorder:
+    """Guarda os comandos SQL executados enquanto está ativo"""
+
+    def __init__(self):
+        self.statements = []
+
+    def __len__(self):
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        # BEGIN/COMMIT emitidos pelo controle de transação não contam como queries
+        if not _TRANSACTION_CONTROL.match(statement):
+            self.statements.append(statement)
+
+    def shapes(self):
+        return Counter(statement_shape(s) for s in self.statements)
+
+
+@contextmanager
+def count_queries():
+    """Conta os comandos SQL de qualquer engine dentro do bloco (independe de SQL_PROFILING)"""
+    recorder = QueryRecorder()
+    event.listen(Engine, 'after_cursor_execute', recorder._record)
+    try:
+        yield recorder
+    finally:
+        event.remove(Engine, 'after_cursor_execute', recorder._record)
+
+
+@contextmanager
+def assert_max_queries(max_queries):
+    """Falha com AssertionError se o bloco executar mais de max_queries comandos SQL"""
+    with count_queries() as recorder:
+        yield recorder
+    if len(recorder) > max_queries:
+        listing = '\n'.join(f'  {count}x {shape}' for shape, count in recorder.shapes().most_common())
+        raise AssertionError(
+            f'Esperado no máximo {max_queries} queries, executadas {len(recorder)}:\n{listing}'
+        )
+
+
+def assert_endpoint_max_queries(client, method, url, max_queries, **kwargs):
+    """Chama o endpoint pelo test client do Flask e verifica o número de queries"""
+    with assert_max_queries(max_queries):
+        response = client.open(url, method=method, **kwargs)
+    return response
+
+
+sql_profiler = SQLProfiler()
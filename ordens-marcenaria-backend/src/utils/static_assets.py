@@ -0,0 +1,166 @@
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+
+from flask import jsonify, request, send_file
+
+try:
+    import brotli
+except ImportError:  # opcional: sem ele, só .br já gerados no build são servidos
+    brotli = None
+
+logger = logging.getLogger('static_assets')
+
+# Vite gera assets/<nome>-<hash>.<ext>: o conteúdo nunca muda sob o mesmo nome
+HASHED_NAME_PATTERN = re.compile(r'^assets/.+-[A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$')
+
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml',
+                      'image/x-icon', 'image/vnd.microsoft.icon', 'application/manifest+json')
+MIN_COMPRESS_BYTES = 1024
+
+# Extensão do arquivo pré-compactado -> Content-Encoding, na ordem de preferência
+ENCODINGS = (('.br', 'br'), ('.gz', 'gzip'))
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+class StaticAsset:
+    def __init__(self, path, full_path, mimetype, etag, cache_control, variants):
+        self.path = path
+        self.full_path = full_path
+        self.mimetype = mimetype
+        self.etag = etag
+        self.cache_control = cache_control
+        # Content-Encoding -> (arquivo, etag)
+        self.variants = variants
+
+
+def file_digest(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as handle:
+        for chunk in iter(lambda: handle.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:20]
+
+
+def precompress(full_path):
+    """Gera <arquivo>.gz (e .br, com o pacote brotli) quando faltam ou estão desatualizados"""
+    source_mtime = os.path.getmtime(full_path)
+    data = None
+    for extension, compress in (('.gz', lambda raw: gzip.compress(raw, compresslevel=9, mtime=0)),
+                                ('.br', brotli.compress if brotli else None)):
+        target = full_path + extension
+        if compress is None or (os.path.exists(target) and os.path.getmtime(target) >= source_mtime):
+            continue
+        if data is None:
+            with open(full_path, 'rb') as handle:
+                data = handle.read()
+        compressed = compress(data)
+        if len(compressed) >= len(data):
+            continue
+        try:
+            with open(target + '.tmp', 'wb') as handle:
+                handle.write(compressed)
+            os.replace(target + '.tmp', target)
+        except OSError as e:
+            logger.warning('Não foi possível gravar %s: %s', target, e)
+
+
+class StaticAssets:
+    """Manifesto dos arquivos do frontend (dist) montado uma vez na inicialização.
+
+    Para cada arquivo guarda tipo, ETag (hash do conteúdo) e Cache-Control: os
+    assets com hash no nome são imutáveis por um ano e o index.html é revalidado
+    a cada visita (no-cache + ETag -> 304). Variantes .br/.gz ao lado do arquivo
+    são servidas conforme o Accept-Encoding; são geradas no build (ver __main__)
+    ou aqui, com STATIC_PRECOMPRESS.
+    """
+
+    def __init__(self, app=None):
+        self.directory = None
+        self.default_max_age = 3600
+        self.assets = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.directory = app.config.get('STATIC_DIR') or app.static_folder
+        self.default_max_age = app.config.get('STATIC_MAX_AGE', 3600)
+        self.build(precompress_files=app.config.get('STATIC_PRECOMPRESS', False))
+        app.extensions['static_assets'] = self
+
+    def build(self, precompress_files=True):
+        assets = {}
+        if self.directory and os.path.isdir(self.directory):
+            for root, _, files in os.walk(self.directory):
+                for filename in files:
+                    if filename.endswith(('.gz', '.br', '.tmp')):
+                        continue
+                    full_path = os.path.join(root, filename)
+                    path = os.path.relpath(full_path, self.directory).replace(os.sep, '/')
+                    assets[path] = self._asset(path, full_path, precompress_files)
+        self.assets = assets
+        logger.info('%d arquivos estáticos no manifesto (%s)', len(assets), self.directory)
+
+    def _asset(self, path, full_path, precompress_files):
+        mimetype = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+        if (precompress_files and mimetype.startswith(COMPRESSIBLE_TYPES)
+                and os.path.getsize(full_path) >= MIN_COMPRESS_BYTES):
+            precompress(full_path)
+
+        etag = file_digest(full_path)
+        variants = {}
+        for extension, encoding in ENCODINGS:
+            variant_path = full_path + extension
+            if os.path.exists(variant_path) and os.path.getmtime(variant_path) >= os.path.getmtime(full_path):
+                variants[encoding] = (variant_path, f'{etag}-{encoding}')
+
+        if HASHED_NAME_PATTERN.match(path):
+            cache_control = IMMUTABLE
+        elif mimetype == 'text/html':
+            cache_control = 'no-cache'
+        else:
+            cache_control = f'public, max-age={self.default_max_age}'
+        return StaticAsset(path, full_path, mimetype, etag, cache_control, variants)
+
+    def lookup(self, path):
+        """Arquivo do manifesto; rotas do SPA (sem arquivo) caem no index.html"""
+        return self.assets.get(path) or self.assets.get('index.html')
+
+    def response(self, path):
+        asset = self.lookup(path)
+        if asset is None:
+            return jsonify({'message': 'API do Sistema de Ordens de Marcenaria'}), 200
+
+        accepted = request.accept_encodings
+        file_path, etag, encoding = asset.full_path, asset.etag, None
+        for _, candidate in ENCODINGS:
+            if candidate in asset.variants and accepted[candidate]:
+                file_path, etag = asset.variants[candidate]
+                encoding = candidate
+                break
+
+        response = send_file(file_path, mimetype=asset.mimetype, etag=etag, conditional=True, max_age=None)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if asset.variants:
+            response.vary.add('Accept-Encoding')
+        response.headers['Cache-Control'] = asset.cache_control
+        return response
+
+
+static_assets = StaticAssets()
+
+
+if __name__ == '__main__':
+    # Pré-compactação no build: python -m src.utils.static_assets ../ordens-marcenaria-frontend/dist
+    import sys
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    assets = StaticAssets()
+    for directory in sys.argv[1:]:
+        assets.directory = directory
+        assets.build()
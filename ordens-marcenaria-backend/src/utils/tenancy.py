@@ -0,0 +1,231 @@
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import jwt
+from flask import current_app, jsonify, request
+from flask_sqlalchemy.session import Session as FlaskSession
+from sqlalchemy import create_engine
+
+DEFAULT_TENANT = 'default'
+TENANT_HEADER = 'X-Tenant-ID'
+TENANT_NAME_PATTERN = re.compile(r'^[a-z0-9][a-z0-9_-]{0,62}$')
+
+_current_tenant = ContextVar('current_tenant', default=None)
+
+
+def current_tenant():
+    """Oficina da requisição/contexto atual (None = banco principal, sem multi-oficina)"""
+    return _current_tenant.get()
+
+
+def token_payload_tenant(payload):
+    """Oficina de um token decodificado; sem a claim "tenant", a principal"""
+    return payload.get('tenant') or DEFAULT_TENANT
+
+
+def valid_tenant_name(name):
+    return bool(name) and TENANT_NAME_PATTERN.match(name) is not None
+
+
+class TenantSession(FlaskSession):
+    """Sessão do Flask-SQLAlchemy que direciona cada consulta ao banco da oficina atual"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        tenant = _current_tenant.get()
+        if bind is None and tenant not in (None, DEFAULT_TENANT):
+            return tenant_registry.engine(tenant)
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class TenantRegistry:
+    """Um arquivo SQLite (e uma engine com seu pool) por oficina, com LRU das engines abertas.
+
+    A oficina "default" é o banco principal configurado no app. As demais ficam
+    em TENANTS_DIR/<nome>.db; as engines são abertas sob demanda e, acima de
+    TENANT_MAX_ENGINES, as menos usadas recentemente e sem requisições em
+    andamento são fechadas (dispose).
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.directory = None
+        self.base_domain = None
+        self.max_engines = 32
+        self.pool_size = 5
+        self._engines = OrderedDict()
+        self._in_use = Counter()
+        self._setup_hooks = []
+        self._lock = threading.RLock()
+        self._opened = 0
+        self._evictions = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('TENANCY_ENABLED', False)
+        self.directory = app.config.get('TENANTS_DIR')
+        self.base_domain = app.config.get('TENANT_BASE_DOMAIN')
+        self.max_engines = app.config.get('TENANT_MAX_ENGINES', 32)
+        self.pool_size = app.config.get('TENANT_POOL_SIZE', 5)
+        if self.enabled:
+            os.makedirs(self.directory, exist_ok=True)
+            app.before_request(self.resolve_request)
+            app.teardown_request(self.release_request)
+        app.extensions['tenancy'] = self
+
+    def add_engine_setup(self, func):
+        """Registra func(engine), chamada uma vez para cada engine de oficina aberta (PRAGMAs, migração)"""
+        self._setup_hooks.append(func)
+
+    def database_path(self, tenant):
+        return os.path.join(self.directory, f'{tenant}.db')
+
+    def exists(self, tenant):
+        return tenant == DEFAULT_TENANT or os.path.exists(self.database_path(tenant))
+
+    def known_tenants(self):
+        """Oficina principal mais todas as que têm arquivo em TENANTS_DIR"""
+        names = []
+        if self.directory and os.path.isdir(self.directory):
+            names = sorted(name[:-3] for name in os.listdir(self.directory)
+                           if name.endswith('.db') and valid_tenant_name(name[:-3]))
+        return [DEFAULT_TENANT] + [name for name in names if name != DEFAULT_TENANT]
+
+    def engine(self, tenant):
+        """Engine da oficina, abrindo (e preparando) na primeira vez"""
+        with self._lock:
+            engine = self._engines.get(tenant)
+            if engine is not None:
+                self._engines.move_to_end(tenant)
+                return engine
+
+            engine = create_engine(f'sqlite:///{self.database_path(tenant)}',
+                                   pool_size=self.pool_size, max_overflow=self.pool_size)
+            for setup in self._setup_hooks:
+                setup(engine)
+            self._engines[tenant] = engine
+            self._opened += 1
+            self._evict_idle()
+            return engine
+
+    def _evict_idle(self):
+        while len(self._engines) > self.max_engines:
+            # OrderedDict em ordem de uso: o primeiro ocioso é o menos usado recentemente
+            victim = next((name for name in self._engines if not self._in_use[name]), None)
+            if victim is None:
+                return
+            self._engines.pop(victim).dispose()
+            self._evictions += 1
+
+    def acquire(self, tenant):
+        """Marca a oficina em uso (não é descartada pelo LRU) e abre a engine já aqui,
+        fora de qualquer transação, para a preparação (migração) não disputar locks"""
+        with self._lock:
+            self._in_use[tenant] += 1
+            if tenant != DEFAULT_TENANT:
+                self.engine(tenant)
+
+    def release(self, tenant):
+        with self._lock:
+            self._in_use[tenant] -= 1
+            if self._in_use[tenant] <= 0:
+                del self._in_use[tenant]
+            self._evict_idle()
+
+    def token_tenant(self):
+        """Oficina gravada no token (claim "tenant"); o token é validado depois por token_required.
+
+        Token válido sem a claim (emitido antes de TENANCY_ENABLED) é da oficina principal.
+        """
+        auth_header = request.headers.get('Authorization', '')
+        if not auth_header.startswith('Bearer '):
+            return None
+        try:
+            payload = jwt.decode(auth_header[len('Bearer '):], current_app.config['SECRET_KEY'],
+                                 algorithms=['HS256'])
+        except jwt.InvalidTokenError:
+            return None
+        return token_payload_tenant(payload)
+
+    def subdomain_tenant(self):
+        """<oficina>.TENANT_BASE_DOMAIN -> oficina"""
+        if not self.base_domain:
+            return None
+        host = request.host.split(':')[0].lower()
+        suffix = '.' + self.base_domain.lower()
+        if host.endswith(suffix):
+            return host[:-len(suffix)] or None
+        return None
+
+    def resolve_request(self):
+        """before_request: escolhe a oficina pelo token, cabeçalho X-Tenant-ID ou subdomínio"""
+        if request.method == 'OPTIONS':
+            return None
+
+        claimed = self.token_tenant()
+        hinted = request.headers.get(TENANT_HEADER) or self.subdomain_tenant()
+        if claimed and hinted and claimed != hinted:
+            return jsonify({'message': 'Token pertence a outra oficina'}), 403
+
+        tenant = claimed or hinted or DEFAULT_TENANT
+        if not valid_tenant_name(tenant):
+            return jsonify({'message': 'Identificador de oficina inválido'}), 400
+        if not self.exists(tenant):
+            return jsonify({'message': 'Oficina não encontrada'}), 404
+
+        self.acquire(tenant)
+        request.environ['tenancy.tenant'] = tenant
+        _current_tenant.set(tenant)
+        return None
+
+    def release_request(self, exc=None):
+        tenant = request.environ.pop('tenancy.tenant', None)
+        if tenant is None:
+            return
+        # Devolve a conexão ao pool antes de a engine poder ser descartada
+        current_app.extensions['sqlalchemy'].session.remove()
+        _current_tenant.set(None)
+        self.release(tenant)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'open_engines': len(self._engines),
+                'in_use': dict(self._in_use),
+                'opened': self._opened,
+                'evictions': self._evictions,
+            }
+
+    def collect_metrics(self):
+        """Engines abertas e descartes por LRU no formato de RequestMetrics.register_collector"""
+        stats = self.stats()
+        return [
+            ('tenant_engines_open', 'gauge', 'Engines de oficinas abertas neste processo',
+             [({}, stats['open_engines'])]),
+            ('tenant_engines_opened_total', 'counter', 'Engines de oficinas abertas desde o início',
+             [({}, stats['opened'])]),
+            ('tenant_engine_evictions_total', 'counter', 'Engines ociosas fechadas pelo limite do LRU',
+             [({}, stats['evictions'])]),
+        ]
+
+
+@contextmanager
+def tenant_context(tenant):
+    """Executa um bloco (CLI, jobs) no banco de uma oficina; requer app context"""
+    session = current_app.extensions['sqlalchemy'].session
+    session.remove()
+    tenant_registry.acquire(tenant)
+    previous = _current_tenant.set(tenant)
+    try:
+        yield
+    finally:
+        session.remove()
+        _current_tenant.reset(previous)
+        tenant_registry.release(tenant)
+
+
+tenant_registry = TenantRegistry()
@@ -0,0 +1,198 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app, jsonify
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from src.models.user import db
+from src.utils.metrics import Histogram, LATENCY_BUCKETS
+
+BUSY_MESSAGES = ('database is locked', 'database is busy', 'database table is locked')
+
+_local = threading.local()
+
+
+def is_busy_error(error):
+    """True para os erros de lock do SQLite que valem uma nova tentativa"""
+    return isinstance(error, OperationalError) and any(m in str(error).lower() for m in BUSY_MESSAGES)
+
+
+def in_write_transaction():
+    """True dentro de @transactional() ou immediate_transaction() nesta thread"""
+    return getattr(_local, 'immediate', False)
+
+
+def configure_sqlite_engine(engine, busy_timeout_ms=1000, journal_mode=None, query_only=False):
+    """Assume o controle do BEGIN do pysqlite para poder emitir BEGIN IMMEDIATE.
+
+    Receita da documentação do SQLAlchemy: o driver deixa de abrir transações
+    sozinho e o evento "begin" emite BEGIN ou BEGIN IMMEDIATE conforme a
+    transação em andamento nesta thread foi marcada como escrita. journal_mode
+    ('WAL') fica gravado no arquivo; query_only recusa qualquer escrita na conexão.
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _on_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        dbapi_connection.execute(f'PRAGMA busy_timeout = {int(busy_timeout_ms)}')
+        if journal_mode:
+            dbapi_connection.execute(f'PRAGMA journal_mode = {journal_mode}')
+        if query_only:
+            dbapi_connection.execute('PRAGMA query_only = 1')
+
+    @event.listens_for(engine, 'begin')
+    def _on_begin(connection):
+        connection.exec_driver_sql('BEGIN IMMEDIATE' if getattr(_local, 'immediate', False) else 'BEGIN')
+
+
+class TransactionPolicy:
+    """Transações de escrita com BEGIN IMMEDIATE e novas tentativas com jitter quando o banco está ocupado"""
+
+    def __init__(self, app=None):
+        self.max_retries = 5
+        self.base_delay = 0.02
+        self.max_delay = 0.5
+        self.immediate_enabled = True
+        self._lock = threading.Lock()
+        self._commit_latency = Histogram(LATENCY_BUCKETS)
+        self._retries = 0
+        self._exhausted = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_retries = app.config.get('TRANSACTION_MAX_RETRIES', 5)
+        self.base_delay = app.config.get('TRANSACTION_RETRY_BASE_MS', 20) / 1000
+        self.max_delay = app.config.get('TRANSACTION_RETRY_MAX_MS', 500) / 1000
+        self.immediate_enabled = app.config.get('TRANSACTION_IMMEDIATE', True)
+        with app.app_context():
+            configure_sqlite_engine(db.engine, app.config.get('SQLITE_BUSY_TIMEOUT_MS', 1000),
+                                    journal_mode=app.config.get('SQLITE_JOURNAL_MODE'))
+        event.listen(Session, 'before_commit', self._before_commit)
+        event.listen(Session, 'after_commit', self._after_commit)
+        app.extensions['transaction_policy'] = self
+
+    def _before_commit(self, session):
+        session.info['_commit_start'] = time.perf_counter()
+
+    def _after_commit(self, session):
+        start = session.info.pop('_commit_start', None)
+        if start is not None:
+            with self._lock:
+                self._commit_latency.observe(time.perf_counter() - start)
+
+    def retry_delay(self, attempt):
+        # Backoff exponencial com jitter para os workers não tentarem juntos de novo
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.5)
+
+    def run(self, func, args, kwargs, immediate):
+        attempt = 0
+        while True:
+            _local.immediate = immediate and self.immediate_enabled
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as e:
+                db.session.rollback()
+                if not is_busy_error(e):
+                    return jsonify({'message': f'Erro interno: {str(e)}'}), 500
+                if attempt >= self.max_retries:
+                    with self._lock:
+                        self._exhausted += 1
+                    response = jsonify({'message': 'Banco de dados ocupado. Tente novamente em instantes.'})
+                    response.headers['Retry-After'] = '1'
+                    return response, 503
+                with self._lock:
+                    self._retries += 1
+                time.sleep(self.retry_delay(attempt))
+                attempt += 1
+            finally:
+                _local.immediate = False
+
+    def retrying(self, func, *args, **kwargs):
+        """Executa func (que abre e fecha a própria transação) repetindo em banco ocupado com o
+        mesmo backoff das views; esgotadas as tentativas, o OperationalError propaga"""
+        attempt = 0
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as e:
+                db.session.rollback()
+                if not is_busy_error(e) or attempt >= self.max_retries:
+                    raise
+                with self._lock:
+                    self._retries += 1
+                time.sleep(self.retry_delay(attempt))
+                attempt += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'commits': self._commit_latency.count,
+                'commit_seconds_total': self._commit_latency.sum,
+                'retries': self._retries,
+                'exhausted': self._exhausted,
+            }
+
+    def collect_metrics(self):
+        """Latência de commit e novas tentativas no formato de RequestMetrics.register_collector"""
+        with self._lock:
+            histogram = list(self._commit_latency.samples('db_commit_duration_seconds', {}))
+            retries, exhausted = self._retries, self._exhausted
+        return [
+            ('db_commit_duration_seconds', 'histogram', 'Duração dos commits (flush + COMMIT)', histogram),
+            ('db_transaction_retries_total', 'counter',
+             'Novas tentativas de transação por banco ocupado', [({}, retries)]),
+            ('db_transaction_busy_failures_total', 'counter',
+             'Transações que esgotaram as tentativas (503)', [({}, exhausted)]),
+        ]
+
+
+def transactional(immediate=True):
+    """Executa a view em uma transação; use acima de @token_required.
+
+    Com immediate=True a transação começa com BEGIN IMMEDIATE (o lock de escrita
+    é pego logo no início, em vez de falhar no meio ao promover um lock de
+    leitura). Erros de banco ocupado fazem rollback e repetem a view inteira
+    com backoff; as views precisam deixar OperationalError propagar.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            policy = current_app.extensions.get('transaction_policy')
+            if policy is None:
+                return f(*args, **kwargs)
+            return policy.run(f, args, kwargs, immediate)
+        return decorated
+    return decorator
+
+
+@contextmanager
+def immediate_transaction():
+    """Bloco de escrita em uma transação nova, com BEGIN IMMEDIATE, e commit no final.
+
+    Encerra a transação de leitura em andamento (rollback, que expira os objetos
+    carregados): promover um lock de leitura para escrita no SQLite falha na
+    hora quando outro processo já está escrevendo.
+    """
+    db.session.rollback()
+    previous = getattr(_local, 'immediate', False)
+    _local.immediate = True
+    try:
+        yield
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        _local.immediate = previous
+
+
+transaction_policy = TransactionPolicy()
@@ -0,0 +1,39 @@
+import os
+import sys
+import signal
+import logging
+# Mesmo ajuste de path do main.py, para rodar como "python src/worker.py"
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from src.main import app
+from src.utils.jobs import JobWorker, parse_schedule
+
+
+def main():
+    """Processo de jobs em segundo plano (iniciado e supervisionado pelo start_server.py)"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(name)s] %(levelname)s %(message)s')
+
+    worker = JobWorker(
+        app,
+        concurrency=app.config['JOB_WORKERS'],
+        poll_interval=app.config['JOB_POLL_SECONDS'],
+        schedule=parse_schedule(app.config['JOB_SCHEDULE']),
+    )
+
+    def handle_stop(signum, frame):
+        print('🛑 Worker de jobs finalizando (aguardando jobs em execução)...')
+        worker.stop_event.set()
+
+    signal.signal(signal.SIGINT, handle_stop)
+    signal.signal(signal.SIGTERM, handle_stop)
+
+    worker.start()
+    print(f'⚙️  Worker de jobs iniciado ({worker.concurrency} threads, id {worker.worker_id})')
+    while not worker.stop_event.wait(1):
+        pass
+    worker.stop()
+    print('✅ Worker de jobs finalizado')
+
+
+if __name__ == '__main__':
+    main()
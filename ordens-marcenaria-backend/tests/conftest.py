@@ -0,0 +1,97 @@
+"""Fixtures dos testes: a aplicação real apontando para um banco temporário.
+
+src.main configura tudo no import, então as variáveis de ambiente são
+definidas aqui, antes do primeiro import (um banco por sessão do pytest).
+"""
+
+import os
+import sys
+import tempfile
+import uuid
+from datetime import date, timedelta
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TEST_DIR = tempfile.mkdtemp(prefix='ordens-tests-')
+
+os.environ['DATABASE_PATH'] = os.path.join(_TEST_DIR, 'ordens_marcenaria.db')
+os.environ.setdefault('RATE_LIMIT_ENABLED', '0')
+os.environ.setdefault('ADMISSION_ENABLED', '0')
+# Com multi-oficina ligada: sem cabeçalho, as requisições continuam na oficina principal
+os.environ.setdefault('TENANCY_ENABLED', '1')
+sys.path.insert(0, BACKEND_DIR)
+
+from src.main import app as flask_app  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def app():
+    return flask_app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture(scope='session')
+def admin_headers(app):
+    response = app.test_client().post('/api/auth/login', json={'username': 'admin', 'password': 'admin_password'})
+    return {'Authorization': f"Bearer {response.get_json()['token']}"}
+
+
+@pytest.fixture(scope='session')
+def other_tenant(app):
+    """Oficina "other" com o próprio administrador (como em python src/tenants.py create)"""
+    from src.models.user import db, User
+    from src.utils.tenancy import tenant_context
+
+    with app.app_context(), tenant_context('other'):
+        admin = User(username='admin-other', email='admin@other.example.com', role='administrador')
+        admin.set_password('other_password')
+        db.session.add(admin)
+        db.session.commit()
+    return 'other'
+
+
+@pytest.fixture
+def no_response_cache(monkeypatch):
+    """Leituras sempre pela view (sem cache de respostas nem coalescing), para contar queries"""
+    from src.utils.coalescing import request_coalescer
+    from src.utils.response_cache import response_cache
+
+    monkeypatch.setattr(response_cache, 'enabled', False)
+    monkeypatch.setattr(request_coalescer, 'enabled', False)
+
+
+def unique_id(prefix):
+    return f'{prefix}-{uuid.uuid4().hex[:10]}'
+
+
+def create_order(client, headers, materials=(), **fields):
+    """Cria uma ordem pela API e devolve o JSON dela"""
+    today = date.today()
+    data = {
+        'id': unique_id('T'),
+        'description': 'Ordem de teste',
+        'entryDate': today.isoformat(),
+        'exitDate': (today + timedelta(days=10)).isoformat(),
+        'materials': [{'description': description, 'quantity': 1} for description in materials],
+    }
+    data.update(fields)
+    response = client.post('/api/orders', json=data, headers=headers)
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['order']
+
+
+def create_delivery(client, headers, order_id=None, address='Rua de Teste, 1'):
+    data = {
+        'id': unique_id('E'),
+        'orderId': order_id,
+        'deliveryDate': (date.today() + timedelta(days=5)).isoformat(),
+        'deliveryAddress': address,
+    }
+    response = client.post('/api/deliveries', json=data, headers=headers)
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['delivery']
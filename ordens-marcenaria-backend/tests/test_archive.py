@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from conftest import create_delivery, create_order
+from src.models.user import db, Order, ArchivedOrder
+from src.utils.archive import archive_orders_job, eligible_filter
+from src.utils.schema import upgrade_schema
+
+
+def completed_order(client, headers, completed_days_ago, updated_days_ago):
+    order = create_order(client, headers)
+    assert client.patch(f"/api/orders/{order['id']}", json={'status': 'concluida'},
+                        headers=headers).status_code == 200
+    now = datetime.utcnow()
+    with client.application.app_context():
+        Order.query.filter_by(id=order['id']).update({
+            'completed_at': now - timedelta(days=completed_days_ago) if completed_days_ago is not None else None,
+            'updated_at': now - timedelta(days=updated_days_ago),
+        })
+        db.session.commit()
+    return order['id']
+
+
+def test_archive_uses_completion_date(client, admin_headers):
+    edited_after_completion = completed_order(client, admin_headers, completed_days_ago=30, updated_days_ago=1)
+    recently_completed = completed_order(client, admin_headers, completed_days_ago=1, updated_days_ago=30)
+    legacy = completed_order(client, admin_headers, completed_days_ago=None, updated_days_ago=30)
+    # Concluídas sem completed_at recebem o updated_at na atualização do schema
+    with client.application.app_context():
+        upgrade_schema()
+
+    response = client.post('/api/archive/run', json={'olderThanDays': 7}, headers=admin_headers)
+    assert response.status_code == 200, response.get_json()
+
+    with client.application.app_context():
+        assert db.session.get(ArchivedOrder, edited_after_completion) is not None
+        assert db.session.get(Order, recently_completed) is not None
+        assert db.session.get(ArchivedOrder, legacy) is not None
+
+
+def test_material_ids_reused_after_archiving(client, admin_headers):
+    # O último material arquivado libera o maior rowid de material para a próxima ordem
+    first = completed_order(client, admin_headers, completed_days_ago=30, updated_days_ago=30)
+    client.post(f'/api/orders/{first}/materials', json={'description': 'Cola PVA'}, headers=admin_headers)
+    assert client.post('/api/archive/run', json={'olderThanDays': 7}, headers=admin_headers).status_code == 200
+
+    second = create_order(client, admin_headers, materials=['Cola PVA'])['id']
+    assert client.patch(f'/api/orders/{second}', json={'status': 'concluida'},
+                        headers=admin_headers).status_code == 200
+    response = client.post('/api/archive/run', json={'olderThanDays': 0}, headers=admin_headers)
+    assert response.status_code == 200, response.get_json()
+
+    with client.application.app_context():
+        materials = [db.session.get(ArchivedOrder, order_id).materials for order_id in (first, second)]
+    assert [[material.description for material in order] for order in materials] == [['Cola PVA'], ['Cola PVA']]
+
+
+def test_archived_ids_cannot_be_reused(client, admin_headers):
+    order_id = completed_order(client, admin_headers, completed_days_ago=30, updated_days_ago=30)
+    delivery = create_delivery(client, admin_headers, order_id=order_id)
+    assert client.post('/api/archive/run', json={'olderThanDays': 7}, headers=admin_headers).status_code == 200
+
+    response = client.post('/api/orders', headers=admin_headers, json={
+        'id': order_id, 'description': 'Repetida', 'entryDate': '2026-01-01', 'exitDate': '2026-01-10'})
+    assert response.status_code == 400
+    response = client.post('/api/deliveries', headers=admin_headers, json={
+        'id': delivery['id'], 'deliveryDate': '2026-01-10', 'deliveryAddress': 'Rua Repetida, 1'})
+    assert response.status_code == 400
+
+
+def test_conflicting_order_does_not_block_the_batch(client, admin_headers):
+    archived = completed_order(client, admin_headers, completed_days_ago=30, updated_days_ago=30)
+    assert client.post('/api/archive/run', json={'olderThanDays': 7}, headers=admin_headers).status_code == 200
+
+    # Ordem com o id de uma arquivada, criada antes da verificação na view
+    with client.application.app_context():
+        old = datetime.utcnow() - timedelta(days=60)
+        db.session.add(Order(id=archived, description='Legada', entry_date=old.date(), exit_date=old.date(),
+                             status='concluida', completed_at=old, updated_at=old))
+        db.session.commit()
+    other = completed_order(client, admin_headers, completed_days_ago=30, updated_days_ago=30)
+
+    response = client.post('/api/archive/run', json={'olderThanDays': 7}, headers=admin_headers)
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['archived']['skipped'] == 1
+
+    with client.application.app_context():
+        assert db.session.get(ArchivedOrder, other) is not None
+        legacy = db.session.get(Order, archived)
+        assert legacy is not None
+        db.session.delete(legacy)
+        db.session.commit()
+
+
+def test_batch_selection_uses_the_completion_index(app):
+    with app.app_context():
+        query = (db.session.query(Order.id).filter(eligible_filter(datetime.utcnow()))
+                 .order_by(Order.completed_at).limit(500))
+        statement = query.statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+        plan = ' '.join(row[-1] for row in db.session.execute(text(f'EXPLAIN QUERY PLAN {statement}')))
+    assert 'ix_order_status_completed_at' in plan
+    assert 'TEMP B-TREE' not in plan
+
+
+@pytest.mark.parametrize('payload', [{'batchSize': 0}, {'batchSize': 10 ** 9}, {'olderThanDays': -1},
+                                     {'olderThanDays': 'muitos'}])
+def test_job_validates_parameters(app, payload):
+    with app.app_context(), pytest.raises(ValueError):
+        archive_orders_job(payload, context=None)
+
+
+def test_route_validates_parameters(client, admin_headers):
+    response = client.post('/api/archive/run', json={'batchSize': 10 ** 9}, headers=admin_headers)
+    assert response.status_code == 400
@@ -0,0 +1,63 @@
+from src.models.user import db, Material, ArchivedOrder
+
+from conftest import create_delivery, create_order, unique_id
+
+
+def suggestions(client, headers, field, prefix):
+    response = client.get('/api/autocomplete', query_string={'field': field, 'prefix': prefix}, headers=headers)
+    assert response.status_code == 200
+    return {item['value']: item['count'] for item in response.get_json()['suggestions']}
+
+
+def test_incremental_updates_follow_order_writes(client, admin_headers):
+    name = unique_id('Chapa')
+    # Variações do mesmo valor somam; a grafia mais usada é a exibida
+    order = create_order(client, admin_headers, materials=[name, name, name.upper()])
+    assert suggestions(client, admin_headers, 'material', name) == {name: 3}
+
+    response = client.put(f"/api/orders/{order['id']}", json={'materials': [{'description': f'{name} b'}]},
+                          headers=admin_headers)
+    assert response.status_code == 200
+    assert suggestions(client, admin_headers, 'material', name) == {f'{name} b': 1}
+
+    assert client.delete(f"/api/orders/{order['id']}", headers=admin_headers).status_code == 200
+    assert suggestions(client, admin_headers, 'material', name) == {}
+
+
+def test_address_suggestions(client, admin_headers):
+    street = unique_id('Rua Teste')
+    create_delivery(client, admin_headers, address=f'{street}, 10')
+    assert suggestions(client, admin_headers, 'address', street.lower()) == {f'{street}, 10': 1}
+
+
+def test_archive_run_keeps_suggestions(client, admin_headers):
+    name = unique_id('Verniz')
+    order = create_order(client, admin_headers, materials=[name])
+    create_delivery(client, admin_headers, order_id=order['id'])
+    assert client.patch(f"/api/orders/{order['id']}", json={'status': 'concluida'},
+                        headers=admin_headers).status_code == 200
+    assert suggestions(client, admin_headers, 'material', name) == {name: 1}
+
+    # INSERT ... SELECT em lote nas tabelas de arquivo (antes: 500 no listener do índice)
+    response = client.post('/api/archive/run', json={'olderThanDays': 0}, headers=admin_headers)
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['archived']['orders'] >= 1
+
+    with client.application.app_context():
+        assert db.session.get(ArchivedOrder, order['id']) is not None
+    assert suggestions(client, admin_headers, 'material', name) == {name: 1}
+
+
+def test_core_bulk_insert_rebuilds_index(app, client, admin_headers):
+    order = create_order(client, admin_headers)
+    name = unique_id('Cola')
+    assert suggestions(client, admin_headers, 'material', name) == {}
+
+    with app.app_context():
+        db.session.execute(Material.__table__.insert(), [
+            {'description': name, 'quantity': 1, 'order_id': order['id']},
+            {'description': name, 'quantity': 2, 'order_id': order['id']},
+        ])
+        db.session.commit()
+
+    assert suggestions(client, admin_headers, 'material', name) == {name: 2}
@@ -0,0 +1,31 @@
+from sqlalchemy.exc import OperationalError
+
+from conftest import create_order, unique_id
+from src.utils import idempotency
+
+
+def test_busy_database_while_storing_the_response_is_retried(client, admin_headers, monkeypatch):
+    order = create_order(client, admin_headers)
+    write_response = idempotency._write_response
+    failures = []
+
+    def busy_twice(*args):
+        if len(failures) < 2:
+            failures.append(1)
+            raise OperationalError('UPDATE idempotency_record', {}, Exception('database is locked'))
+        return write_response(*args)
+
+    monkeypatch.setattr(idempotency, '_write_response', busy_twice)
+    headers = {**admin_headers, 'Idempotency-Key': unique_id('chave')}
+    url = f"/api/orders/{order['id']}/materials"
+
+    first = client.post(url, json={'description': 'Puxador'}, headers=headers)
+    assert first.status_code == 201
+    assert len(failures) == 2
+
+    retry = client.post(url, json={'description': 'Puxador'}, headers=headers)
+    assert retry.status_code == 201
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert retry.get_json() == first.get_json()
+    materials = client.get(f"/api/orders/{order['id']}", headers=admin_headers).get_json()['order']['materials']
+    assert [material['description'] for material in materials] == ['Puxador']
@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.models.user import db, Job
+from src.utils.jobs import JOB_HANDLERS, JobContext, JobWorker, enqueue, job_handler
+
+
+@pytest.fixture
+def worker(app):
+    job_handler('test_long_job')(lambda payload, context: None)
+    yield JobWorker(app, stale_after_seconds=60)
+    JOB_HANDLERS.pop('test_long_job', None)
+
+
+def claimed_job(worker, started_minutes_ago, max_attempts=None):
+    job = enqueue('test_long_job', max_attempts=max_attempts)
+    db.session.commit()
+    assert worker.claim() == job.id
+    Job.query.filter_by(id=job.id).update(
+        {'locked_at': datetime.utcnow() - timedelta(minutes=started_minutes_ago)})
+    db.session.commit()
+    return job.id
+
+
+def job_status(job_id):
+    db.session.expire_all()
+    return db.session.get(Job, job_id).status
+
+
+def test_progress_keeps_a_long_running_job_claimed(app, worker):
+    with app.app_context():
+        alive = claimed_job(worker, started_minutes_ago=10)
+        JobContext(alive, worker.lock_owner()).report_progress(0.5, 'metade')
+        dead = claimed_job(worker, started_minutes_ago=10)
+
+        worker.requeue_stale()
+        assert job_status(alive) == 'executando'
+        assert job_status(dead) == 'pendente'
+
+        # Um job já devolvido à fila não volta a parecer vivo pelo worker antigo
+        JobContext(dead, worker.lock_owner()).report_progress(0.9)
+        assert job_status(dead) == 'pendente'
+        assert db.session.get(Job, dead).progress == 0.0
+        Job.query.filter(Job.id.in_([alive, dead])).delete()
+        db.session.commit()
+
+
+def test_stale_jobs_count_as_failed_attempts(app, worker):
+    with app.app_context():
+        retried = claimed_job(worker, started_minutes_ago=10, max_attempts=2)
+        exhausted = claimed_job(worker, started_minutes_ago=10, max_attempts=1)
+
+        worker.requeue_stale()
+        db.session.expire_all()
+        job = db.session.get(Job, retried)
+        assert job.status == 'pendente'
+        assert job.run_after > datetime.utcnow() + timedelta(seconds=worker.retry_base_seconds - 5)
+        job = db.session.get(Job, exhausted)
+        assert job.status == 'falhou'
+        assert 'parou de responder' in job.error
+        assert job.finished_at is not None
+        Job.query.filter(Job.id.in_([retried, exhausted])).delete()
+        db.session.commit()
+
+
+def test_requeued_job_result_belongs_to_the_new_claim(app, worker):
+    """A primeira execução termina depois de o job ter sido devolvido e reservado por outra"""
+    with app.app_context():
+        job = enqueue('test_long_job')
+        db.session.commit()
+        job_id = job.id
+
+        def slow_job(payload, context):
+            # Enquanto roda, o job é dado como travado e outra execução o reserva
+            Job.query.filter_by(id=job_id).update({'status': 'pendente', 'locked_by': None,
+                                                   'run_after': datetime.utcnow() - timedelta(seconds=1)})
+            db.session.commit()
+            other = JobWorker(app)
+            other.worker_id = 'outro-host:1'
+            assert other.claim() == job_id
+            context.report_progress(0.5)
+            return {'run': 'first'}
+
+        JOB_HANDLERS['test_long_job'].func, original = slow_job, JOB_HANDLERS['test_long_job'].func
+        try:
+            assert worker._run_next_job()
+        finally:
+            JOB_HANDLERS['test_long_job'].func = original
+
+        db.session.expire_all()
+        job = db.session.get(Job, job_id)
+        assert job.status == 'executando'
+        assert job.locked_by.startswith('outro-host:1:')
+        assert job.result is None and job.progress == 0.0
+        db.session.delete(job)
+        db.session.commit()
@@ -0,0 +1,18 @@
+from conftest import create_order, unique_id
+
+
+def catalog_names(client, headers, search):
+    response = client.get('/api/materials/catalog', query_string={'q': search}, headers=headers)
+    assert response.status_code == 200
+    return {entry['name'] for entry in response.get_json()['catalog']}
+
+
+def test_catalog_search_treats_wildcards_as_text(client, admin_headers):
+    tag = unique_id('lixa').lower()
+    create_order(client, admin_headers, materials=[f'{tag} 100%', f'{tag} 100x', f'{tag}_a', f'{tag}ba'])
+
+    assert catalog_names(client, admin_headers, f'{tag} 100%') == {f'{tag} 100%'}
+    assert catalog_names(client, admin_headers, f'{tag}_') == {f'{tag}_a'}
+    assert catalog_names(client, admin_headers, '%') >= {f'{tag} 100%'}
+    assert f'{tag}ba' not in catalog_names(client, admin_headers, '%')
+    assert len(catalog_names(client, admin_headers, tag)) == 4
@@ -0,0 +1,39 @@
+from conftest import create_order
+
+
+def order_etag(client, headers, order_id):
+    response = client.get(f'/api/orders/{order_id}', headers=headers)
+    assert response.status_code == 200
+    return response.headers['ETag']
+
+
+def test_material_writes_change_the_order_etag(client, admin_headers, no_response_cache):
+    order = create_order(client, admin_headers, materials=['Compensado 15mm'])
+    etag = order_etag(client, admin_headers, order['id'])
+
+    response = client.post(f'/api/orders/{order["id"]}/materials', headers=admin_headers,
+                           json={'description': 'Dobradiça', 'quantity': 4})
+    assert response.status_code == 201
+    assert response.headers['ETag'] != etag
+    material_id = response.get_json()['material']['id']
+
+    # A ETag antiga não vale mais nem para a ordem nem para os materiais
+    stale = {**admin_headers, 'If-Match': etag}
+    assert client.patch(f'/api/orders/{order["id"]}', headers=stale,
+                        json={'description': 'Outra'}).status_code == 412
+    assert client.put(f'/api/orders/{order["id"]}/materials/{material_id}', headers=stale,
+                      json={'quantity': 6}).status_code == 412
+    assert client.get(f'/api/orders/{order["id"]}',
+                      headers={**admin_headers, 'If-None-Match': etag}).status_code == 200
+
+    etag = order_etag(client, admin_headers, order['id'])
+    response = client.put(f'/api/orders/{order["id"]}/materials/{material_id}',
+                          headers={**admin_headers, 'If-Match': etag}, json={'quantity': 6})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+    etag = order_etag(client, admin_headers, order['id'])
+    response = client.delete(f'/api/orders/{order["id"]}/materials/{material_id}', headers=admin_headers)
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert order_etag(client, admin_headers, order['id']) == response.headers['ETag']
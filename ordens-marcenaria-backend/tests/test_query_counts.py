@@ -0,0 +1,68 @@
+import pytest
+
+from conftest import create_delivery, create_order, unique_id
+from src.utils.sql_profiler import assert_endpoint_max_queries, count_queries
+
+
+# Consultas por endpoint, independentes do número de linhas: o usuário do token,
+# a lista e, quando há, um SELECT ... IN ou GROUP BY para os relacionados
+ENDPOINT_QUERIES = [
+    ('/api/orders', 3),
+    ('/api/orders?archived=true', 3),
+    ('/api/deliveries', 2),
+    ('/api/deliveries?archived=true', 2),
+    ('/api/deliveries?include=order', 2),
+    ('/api/carpenters', 3),
+]
+
+
+def create_carpenter(client, headers):
+    name = unique_id('Marceneiro')
+    response = client.post('/api/carpenters', json={'name': name}, headers=headers)
+    assert response.status_code == 201, response.get_json()
+    return name
+
+
+def create_deliveries_with_orders(client, headers, count):
+    for _ in range(count):
+        order = create_order(client, headers, materials=['MDF 18mm'])
+        create_delivery(client, headers, order_id=order['id'])
+
+
+def test_deliveries_include_order_does_not_query_per_delivery(client, admin_headers, no_response_cache):
+    create_deliveries_with_orders(client, admin_headers, 3)
+    with count_queries() as baseline:
+        response = client.get('/api/deliveries?include=order', headers=admin_headers)
+    assert response.status_code == 200
+    assert len(baseline) <= 3, baseline.statements
+
+    # Com N entregas o resumo da ordem continua vindo do mesmo SELECT
+    create_deliveries_with_orders(client, admin_headers, 25)
+    response = assert_endpoint_max_queries(client, 'GET', '/api/deliveries?include=order', len(baseline),
+                                           headers=admin_headers)
+    assert response.status_code == 200
+    deliveries = response.get_json()['deliveries']
+    assert len(deliveries) >= 28
+    assert all(delivery['order'] for delivery in deliveries if delivery['order_id'])
+
+
+@pytest.fixture(scope='module')
+def populated(app, admin_headers):
+    """Marceneiros com ordens (várias com materiais), entregas e ordens arquivadas"""
+    client = app.test_client()
+    for _ in range(5):
+        carpenter = create_carpenter(client, admin_headers)
+        for status in ('recebida', 'emProcesso', 'concluida'):
+            order = create_order(client, admin_headers, materials=['Compensado', 'Cola', 'Parafuso'],
+                                 carpenter=carpenter, status=status)
+            create_delivery(client, admin_headers, order_id=order['id'])
+    response = client.post('/api/archive/run', json={'olderThanDays': 0}, headers=admin_headers)
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['archived']['orders'] >= 5
+
+
+@pytest.mark.parametrize('url, max_queries', ENDPOINT_QUERIES)
+def test_list_endpoints_query_count(client, admin_headers, no_response_cache, populated, url, max_queries):
+    response = assert_endpoint_max_queries(client, 'GET', url, max_queries, headers=admin_headers)
+    assert response.status_code == 200
+    assert all(response.get_json().values())
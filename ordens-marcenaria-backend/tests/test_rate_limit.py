@@ -0,0 +1,44 @@
+import pytest
+
+from src.utils.rate_limit import MemoryBucketStore, RateLimit, rate_limiter
+
+
+@pytest.fixture
+def login_limited(monkeypatch):
+    monkeypatch.setattr(rate_limiter, 'enabled', True)
+    monkeypatch.setattr(rate_limiter, 'store', type(rate_limiter.store)())
+
+
+def failed_login(client, **headers):
+    return client.post('/api/auth/login', json={'username': 'admin', 'password': 'errada'},
+                       headers=headers, environ_base={'REMOTE_ADDR': '203.0.113.7'})
+
+
+def test_forwarded_for_is_ignored_without_proxy(client, login_limited):
+    statuses = [failed_login(client, **{'X-Forwarded-For': f'10.0.0.{n}'}).status_code for n in range(12)]
+    assert statuses.count(429) == 2
+
+
+def test_behind_proxy_uses_the_entry_the_proxy_appended(client, login_limited, monkeypatch):
+    monkeypatch.setattr(rate_limiter, 'proxy_hops', 1)
+    # O cliente troca a primeira entrada a cada tentativa; o proxy acrescenta o IP real no fim
+    statuses = [failed_login(client, **{'X-Forwarded-For': f'10.0.0.{n}, 198.51.100.9'}).status_code
+                for n in range(12)]
+    assert statuses.count(429) == 2
+
+    # Outro cliente atrás do mesmo proxy tem o próprio bucket
+    assert failed_login(client, **{'X-Forwarded-For': '198.51.100.10'}).status_code == 401
+
+
+def test_memory_store_is_capped_and_evicts_the_least_recently_used():
+    store = MemoryBucketStore(max_keys=3)
+    limit = RateLimit('1/minute')
+    for key in ('a', 'b', 'c'):
+        assert store.consume(key, limit, 1000.0)[0]
+    # "a" usado de novo passa a ser o mais recente: o novo "d" tira o "b"
+    assert not store.consume('a', limit, 1001.0)[0]
+    store.consume('d', limit, 1002.0)
+    assert len(store) == 3
+    assert not store.consume('a', limit, 1003.0)[0]
+    assert store.consume('b', limit, 1003.0)[0]
+    assert len(store) == 3
@@ -0,0 +1,23 @@
+from flask import Flask
+
+from src.utils.static_assets import StaticAssets
+
+
+def static_app(directory, **config):
+    app = Flask(__name__)
+    app.config.update(STATIC_DIR=str(directory), **config)
+    return app
+
+
+def test_init_app_does_not_write_into_the_static_dir(tmp_path):
+    (tmp_path / 'index.html').write_text('<html>' + 'x' * 4096 + '</html>')
+    assets = StaticAssets(static_app(tmp_path))
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['index.html']
+    assert assets.lookup('index.html').variants == {}
+
+
+def test_build_step_precompresses(tmp_path):
+    (tmp_path / 'index.html').write_text('<html>' + 'x' * 4096 + '</html>')
+    assets = StaticAssets(static_app(tmp_path, STATIC_PRECOMPRESS=True))
+    assert (tmp_path / 'index.html.gz').exists()
+    assert 'gzip' in assets.lookup('index.html').variants
@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta
+
+import jwt
+
+
+def legacy_token(app, user_id=1, role='administrador'):
+    """Token emitido antes de TENANCY_ENABLED: sem a claim "tenant\""""
+    payload = {'user_id': user_id, 'username': 'admin', 'role': role,
+               'exp': datetime.utcnow() + timedelta(hours=1)}
+    return jwt.encode(payload, app.config['SECRET_KEY'], algorithm='HS256')
+
+
+def test_token_without_tenant_claim_is_rejected_in_other_tenant(app, client, other_tenant):
+    headers = {'Authorization': f'Bearer {legacy_token(app)}'}
+    assert client.get('/api/auth/users', headers=headers).status_code == 200
+
+    response = client.get('/api/auth/users', headers={**headers, 'X-Tenant-ID': other_tenant})
+    assert response.status_code == 403
+
+
+def test_token_from_default_tenant_is_rejected_in_other_tenant(client, admin_headers, other_tenant):
+    response = client.get('/api/auth/users', headers={**admin_headers, 'X-Tenant-ID': other_tenant})
+    assert response.status_code == 403
+
+
+def test_token_works_in_its_own_tenant(client, other_tenant):
+    response = client.post('/api/auth/login', json={'username': 'admin-other', 'password': 'other_password'},
+                           headers={'X-Tenant-ID': other_tenant})
+    assert response.status_code == 200
+    headers = {'Authorization': f"Bearer {response.get_json()['token']}"}
+
+    # Sem cabeçalho a oficina vem do próprio token
+    users = client.get('/api/auth/users', headers=headers).get_json()
+    assert [user['username'] for user in users['users']] == ['admin-other']
+    assert client.get('/api/auth/users', headers={**headers, 'X-Tenant-ID': 'default'}).status_code == 403
@@ -5,6 +5,7 @@ import { Input } from '@/components/ui/input.jsx';
 import { Label } from '@/components/ui/label.jsx';
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@/components/ui/select.jsx';
 import { Textarea } from '@/components/ui/textarea.jsx';
+import { useAutocomplete } from '@/hooks/use-autocomplete.js';
 
 export function AddDeliveryModal({ isOpen, onClose, onAddDelivery, orders }) {
   const [formData, setFormData] = useState({
@@ -17,6 +18,9 @@ export function AddDeliveryModal({ isOpen, onClose, onAddDelivery, orders }) {
   });
 
   const [errors, setErrors] = useState({});
+  const addressSuggestions = useAutocomplete('address', formData.deliveryAddress, isOpen)
+    // O endereço já escolhido não aparece de novo como sugestão
+    .filter(suggestion => suggestion.value !== formData.deliveryAddress.trim());
 
   useEffect(() => {
     if (isOpen) {
@@ -165,6 +169,22 @@ export function AddDeliveryModal({ isOpen, onClose, onAddDelivery, orders }) {
               className={errors.deliveryAddress ? 'border-red-500' : ''}
               rows={3}
             />
+            {formData.deliveryAddress.trim() && addressSuggestions.length > 0 && (
+              <div className="mt-1 flex flex-wrap gap-1">
+                {addressSuggestions.slice(0, 4).map(suggestion => (
+                  <Button
+                    key={suggestion.value}
+                    type="button"
+                    variant="outline"
+                    size="sm"
+                    className="h-auto py-1 text-xs font-normal whitespace-normal text-left"
+                    onClick={() => handleInputChange('deliveryAddress', suggestion.value)}
+                  >
+                    {suggestion.value}
+                  </Button>
+                ))}
+              </div>
+            )}
             {errors.deliveryAddress && <p className="text-red-500 text-sm mt-1">{errors.deliveryAddress}</p>}
           </div>
 
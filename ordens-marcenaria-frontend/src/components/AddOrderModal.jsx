@@ -5,6 +5,7 @@ import { Textarea } from '@/components/ui/textarea.jsx'
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@/components/ui/select.jsx'
 import { Dialog, DialogContent, DialogHeader, DialogTitle, DialogFooter } from '@/components/ui/dialog.jsx'
 import { Plus, X } from 'lucide-react'
+import { useAutocomplete } from '@/hooks/use-autocomplete.js'
 
 export function AddOrderModal({ isOpen, onClose, onAddOrder, carpenters }) {
   const [formData, setFormData] = useState({
@@ -16,6 +17,7 @@ export function AddOrderModal({ isOpen, onClose, onAddOrder, carpenters }) {
     materials: []
   })
   const [newMaterial, setNewMaterial] = useState({ description: '', quantity: 1 })
+  const materialSuggestions = useAutocomplete('material', newMaterial.description, isOpen)
 
   const handleSubmit = (e) => {
     e.preventDefault()
@@ -194,7 +196,14 @@ export function AddOrderModal({ isOpen, onClose, onAddOrder, carpenters }) {
                 value={newMaterial.description}
                 onChange={(e) => setNewMaterial(prev => ({ ...prev, description: e.target.value }))}
                 className="flex-1"
+                list="material-suggestions"
+                autoComplete="off"
               />
+              <datalist id="material-suggestions">
+                {materialSuggestions.map(suggestion => (
+                  <option key={suggestion.value} value={suggestion.value} />
+                ))}
+              </datalist>
               <Input
                 type="number"
                 min="1"
@@ -0,0 +1,32 @@
+import * as React from "react"
+import { autocompleteAPI } from "../services/api.js"
+
+const DEBOUNCE_MS = 150
+
+// Sugestões do backend para o texto digitado (field: "material" ou "address")
+export function useAutocomplete(field, value, enabled = true) {
+  const [suggestions, setSuggestions] = React.useState([])
+
+  React.useEffect(() => {
+    if (!enabled) {
+      setSuggestions([])
+      return
+    }
+    let cancelled = false
+    const timer = setTimeout(async () => {
+      try {
+        const response = await autocompleteAPI.get(field, value.trim())
+        if (!cancelled) setSuggestions(response.data.suggestions)
+      } catch (error) {
+        // Sem sugestões o formulário continua funcionando normalmente
+        if (!cancelled) setSuggestions([])
+      }
+    }, DEBOUNCE_MS)
+    return () => {
+      cancelled = true
+      clearTimeout(timer)
+    }
+  }, [field, value, enabled])
+
+  return suggestions
+}
@@ -184,6 +184,10 @@ const api = axios.create({
   },
 });
 
+// Diferença entre o relógio do servidor (cabeçalho Date) e o deste navegador, para o
+// X-Request-Deadline ser calculado no relógio do servidor
+let serverClockOffset = 0;
+
 // Interceptador para adicionar token de autenticação
 api.interceptors.request.use((config) => {
   const token = localStorage.getItem("token");
@@ -197,15 +201,41 @@ api.interceptors.request.use((config) => {
   config.headers["Content-Type"] = "application/json";
   config.headers["X-Requested-With"] = "XMLHttpRequest";
   
+  // Prazo da requisição: se ela esperar na fila do servidor além do timeout, o backend
+  // recusa (503) em vez de processar uma resposta que ninguém vai ler
+  if (config.timeout) {
+    config.headers["X-Request-Deadline"] = String(Date.now() + serverClockOffset + config.timeout);
+  }
+  
   return config;
 });
 
 // Interceptador para tratar erros
 api.interceptors.response.use(
   (response) => {
+    const serverDate = Date.parse(response.headers?.date);
+    if (!Number.isNaN(serverDate)) {
+      serverClockOffset = serverDate - Date.now();
+    }
     return response;
   },
   (error) => {
+    // Falha de rede (túnel instável): POSTs com Idempotency-Key podem ser repetidos com
+    // segurança, porque o backend devolve a resposta original em vez de criar de novo
+    const config = error.config;
+    if (!error.response && config?.headers?.["Idempotency-Key"] && (config._idempotentRetries || 0) < 2) {
+      config._idempotentRetries = (config._idempotentRetries || 0) + 1;
+      return new Promise((resolve) => setTimeout(resolve, 1000 * config._idempotentRetries)).then(() => api(config));
+    }
+    
+    // Servidor sobrecarregado (503 + Retry-After): leituras e escritas idempotentes tentam de novo
+    const retryAfter = Number(error.response?.headers?.["retry-after"]);
+    const retriable = config?.method === "get" || config?.headers?.["Idempotency-Key"];
+    if (error.response?.status === 503 && retryAfter && retriable && (config._overloadRetries || 0) < 2) {
+      config._overloadRetries = (config._overloadRetries || 0) + 1;
+      return new Promise((resolve) => setTimeout(resolve, retryAfter * 1000)).then(() => api(config));
+    }
+    
     console.error("❌ Erro na API:", error.response?.data || error.message);
     
     if (error.response?.status === 401) {
@@ -219,13 +249,25 @@ api.interceptors.response.use(
 );
 
 // Funções para gerenciar ordens
+// Envia If-Match com a versão lida; o backend responde 412 se o registro mudou nesse meio tempo
+const ifMatch = (version) => (version ? { headers: { "If-Match": `"${version}"` } } : {});
+
+// Uma chave por operação: repetir a chamada com a mesma chave devolve a resposta original
+// em vez de criar um registro duplicado
+export const newIdempotencyKey = () =>
+  window.crypto?.randomUUID ? window.crypto.randomUUID() : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+const idempotent = (key) => ({ headers: { "Idempotency-Key": key } });
+
 export const ordersAPI = {
   getAll: () => api.get("/orders"),
+  getArchived: () => api.get("/orders", { params: { archived: true } }),
   getById: (id) => api.get(`/orders/${id}`),
-  create: (order) => api.post("/orders", order),
+  create: (order, key = newIdempotencyKey()) => api.post("/orders", order, idempotent(key)),
   update: (id, order) => api.put(`/orders/${id}`, order),
+  patch: (id, changes, version) => api.patch(`/orders/${id}`, changes, ifMatch(version)),
   delete: (id) => api.delete(`/orders/${id}`),
-  addMaterial: (orderId, material) => api.post(`/orders/${orderId}/materials`, material),
+  addMaterial: (orderId, material, key = newIdempotencyKey()) =>
+    api.post(`/orders/${orderId}/materials`, material, idempotent(key)),
   updateMaterial: (orderId, materialId, material) => api.put(`/orders/${orderId}/materials/${materialId}`, material),
   deleteMaterial: (orderId, materialId) => api.delete(`/orders/${orderId}/materials/${materialId}`),
 };
@@ -252,13 +294,46 @@ export const testConnection = async () => {
 // Funções para gerenciar entregas
 export const deliveriesAPI = {
   getAll: () => api.get("/deliveries"),
+  getAllWithOrders: () => api.get("/deliveries", { params: { include: "order" } }),
+  getArchived: () => api.get("/deliveries", { params: { archived: true } }),
   getById: (id) => api.get(`/deliveries/${id}`),
-  create: (delivery) => api.post("/deliveries", delivery),
+  create: (delivery, key = newIdempotencyKey()) => api.post("/deliveries", delivery, idempotent(key)),
   update: (id, delivery) => api.put(`/deliveries/${id}`, delivery),
+  patch: (id, changes, version) => api.patch(`/deliveries/${id}`, changes, ifMatch(version)),
   delete: (id) => api.delete(`/deliveries/${id}`),
 };
 
 // Funções para gerenciar configurações do sistema
+// Lista de materiais agregada; params: { status: "recebida,emProcesso", carpenter, dueFrom, dueTo }
+export const materialsAPI = {
+  getRollup: (params) => api.get("/materials/rollup", { params }),
+  getCatalog: (q) => api.get("/materials/catalog", { params: q ? { q } : {} }),
+};
+
+// Sugestão de marceneiros para ordens sem responsável; apply grava o plano inteiro ou nada (409)
+export const schedulingAPI = {
+  suggest: (options = {}) => api.post("/scheduling/suggest", options),
+  apply: (assignments) => api.post("/scheduling/apply", { assignments }),
+};
+
+// Relatórios de produção; params: { from, to, carpenter, groupBy }
+export const analyticsAPI = {
+  getLeadTimes: (params) => api.get("/analytics/lead-times", { params }),
+  getOnTime: (params) => api.get("/analytics/on-time", { params }),
+  getThroughput: (params) => api.get("/analytics/throughput", { params }),
+  getBacklog: (params) => api.get("/analytics/backlog", { params }),
+};
+
+// Resumo de hoje/amanhã/semana com as mensagens do WhatsApp já montadas pelo backend
+export const digestAPI = {
+  get: (period) => api.get("/digest", { params: { period } }),
+};
+
+// Sugestões de descrições de materiais e endereços já usados, das mais usadas para as menos
+export const autocompleteAPI = {
+  get: (field, prefix, limit = 8) => api.get("/autocomplete", { params: { field, prefix, limit } }),
+};
+
 export const systemConfigAPI = {
   getAll: () => api.get("/system/config"),
   getConfig: (key) => api.get(`/system/config/${key}`),
@@ -2,16 +2,25 @@
 """
 Script para iniciar automaticamente o backend Flask e o ngrok
 Atualiza automaticamente a URL do ngrok no frontend
+
+Os processos ficam sob supervisão: a saída vai para logs rotativos em logs/,
+quem cai é reiniciado com backoff exponencial e o backend pode ser recarregado
+sem derrubar requisições (SIGHUP ou "python start_server.py reload").
 """
 
 import os
 import sys
 import json
 import time
+import select
+import socket
+import logging
 import subprocess
 import threading
 import requests
 import signal
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
 from pathlib import Path
 
 # Configurações
@@ -19,12 +28,283 @@ CONFIG_FILE = "config.json"
 FLASK_DIR = "ordens-marcenaria-backend"
 FRONTEND_API_FILE = "ordens-marcenaria-frontend/src/services/api.js"
 
+# Seção "supervisor" do config.json (todas opcionais)
+SUPERVISOR_DEFAULTS = {
+    "log_dir": "logs",
+    "log_max_bytes": 5 * 1024 * 1024,
+    "log_backup_count": 5,
+    "echo_output": False,
+    "backoff_initial": 1,
+    "backoff_max": 60,
+    "stable_seconds": 60,
+    "ready_timeout": 60,
+    "drain_seconds": 30,
+}
+STATUS_FILE = "supervisor.json"
+
+
+def stop_process(process, timeout):
+    """SIGTERM, espera até timeout e então SIGKILL"""
+    if process.poll() is not None:
+        return
+    try:
+        process.terminate()
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+class SupervisedProcess:
+    """Processo filho supervisionado.
+
+    A saída (stdout + stderr) é drenada por uma thread para um log rotativo, então
+    um filho falante nunca trava escrevendo num PIPE cheio. Quando o processo cai
+    ele volta depois de um backoff exponencial (1s, 2s, 4s... até backoff_max),
+    zerado quando a execução anterior durou mais que stable_seconds.
+    """
+
+    def __init__(self, manager, name, command, cwd=None, env=None, on_restart=None):
+        self.manager = manager
+        self.name = name
+        self.command = command
+        self.cwd = cwd
+        # Função que monta o ambiente a cada início (o config.json pode ter mudado)
+        self.env = env
+        self.on_restart = on_restart
+        self.logger = manager.process_logger(name)
+        self.process = None
+        self.started_at = None
+        self.started_monotonic = None
+        self.restarts = 0
+        self.reloads = 0
+        self.failures = 0
+        self.next_start = None
+        self.last_exit = None
+
+    def spawn(self, extra_env=None, pass_fds=()):
+        env = self.env() if self.env else os.environ.copy()
+        env.update(extra_env or {})
+        env['PYTHONUNBUFFERED'] = '1'
+        process = subprocess.Popen(
+            self.command,
+            cwd=self.cwd,
+            env=env,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            pass_fds=pass_fds,
+            # Grupo próprio: o Ctrl+C do terminal chega só ao supervisor, que finaliza os filhos em ordem
+            start_new_session=(os.name == 'posix'),
+            universal_newlines=True,
+            encoding='utf-8',
+            errors='replace',
+            bufsize=1
+        )
+        threading.Thread(target=self._drain, args=(process,), name=f'{self.name}-output', daemon=True).start()
+        return process
+
+    def _drain(self, process):
+        for line in process.stdout:
+            self.logger.info('[%s] %s', process.pid, line.rstrip())
+        process.stdout.close()
+
+    def _adopt(self, process):
+        self.process = process
+        self.started_at = time.time()
+        self.started_monotonic = time.monotonic()
+
+    def start(self):
+        """Inicia o processo; retorna False se ele não subiu"""
+        try:
+            self._adopt(self.spawn())
+            return True
+        except OSError as e:
+            print(f"❌ Erro ao iniciar {self.name}: {e}")
+            self._schedule_restart(f'erro ao iniciar: {e}', None)
+            return False
+
+    def _schedule_restart(self, reason, uptime):
+        settings = self.manager.settings
+        if uptime is not None and uptime >= settings['stable_seconds']:
+            self.failures = 0
+        self.failures += 1
+        delay = min(settings['backoff_max'], settings['backoff_initial'] * 2 ** (self.failures - 1))
+        self.next_start = time.monotonic() + delay
+        print(f"❌ {self.name} {reason}; reiniciando em {delay:.0f}s (falha consecutiva nº {self.failures})")
+
+    def check(self):
+        """Chamado a cada volta do supervisor: detecta a saída e reinicia com backoff"""
+        if self.process is not None and self.process.poll() is not None:
+            uptime = time.monotonic() - self.started_monotonic
+            code = self.process.returncode
+            self.last_exit = {
+                'code': code,
+                'at': datetime.now().isoformat(timespec='seconds'),
+                'uptimeSeconds': round(uptime, 1),
+            }
+            self.process = None
+            self._schedule_restart(f"saiu com código {code} após {uptime:.0f}s", uptime)
+
+        if self.process is None and self.next_start is not None and time.monotonic() >= self.next_start:
+            self.next_start = None
+            self.restarts += 1
+            if self.start():
+                print(f"🔄 {self.name} reiniciado (pid {self.process.pid}, reinício nº {self.restarts})")
+                if self.on_restart:
+                    self.on_restart()
+
+    def reload(self):
+        """Processos sem requisições (worker, ngrok): parar e iniciar de novo"""
+        self.stop(timeout=30)
+        self.reloads += 1
+        return self.start()
+
+    def stop(self, timeout=10):
+        self.next_start = None
+        if self.process is not None:
+            stop_process(self.process, timeout)
+            self.process = None
+
+    def running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def status(self):
+        running = self.running()
+        return {
+            'pid': self.process.pid if running else None,
+            'running': running,
+            'startedAt': datetime.fromtimestamp(self.started_at).isoformat(timespec='seconds') if running else None,
+            'uptimeSeconds': round(time.monotonic() - self.started_monotonic, 1) if running else 0,
+            'restarts': self.restarts,
+            'reloads': self.reloads,
+            'consecutiveFailures': self.failures,
+            'restartInSeconds': round(max(0, self.next_start - time.monotonic()), 1) if self.next_start else None,
+            'lastExit': self.last_exit,
+        }
+
+
+class FlaskProcess(SupervisedProcess):
+    """Backend Flask atendendo num socket aberto uma única vez pelo supervisor.
+
+    Cada geração do servidor herda o socket (SERVER_FD). No reload o processo
+    novo sobe no mesmo socket e avisa pelo pipe SERVER_READY_FD depois do
+    autoteste de /api/health; só então o antigo recebe SIGTERM, para de aceitar
+    conexões e termina as requisições em andamento. A fila de conexões do socket
+    nunca fica sem quem a atenda (ver src/utils/serving.py).
+
+    No Windows não há herança de descritores: cada processo abre a porta e o
+    reload vira parar + iniciar.
+    """
+
+    def __init__(self, manager, name, command, cwd, env, host, port):
+        super().__init__(manager, name, command, cwd=cwd, env=env)
+        self.host = host
+        self.port = port
+        self.listen_socket = None
+        if os.name == 'posix':
+            self.listen_socket = socket.create_server((host, port), backlog=128)
+
+    def spawn_ready(self):
+        """Inicia uma geração do servidor e espera ela ficar saudável: (processo, pronto)"""
+        timeout = self.manager.settings['ready_timeout']
+        if self.listen_socket is None:
+            process = self.spawn({'PORT': str(self.port)})
+            return process, self._wait_http_health(process, timeout)
+
+        listen_fd = self.listen_socket.fileno()
+        read_fd, write_fd = os.pipe()
+        try:
+            try:
+                process = self.spawn({
+                    'PORT': str(self.port),
+                    'SERVER_FD': str(listen_fd),
+                    'SERVER_READY_FD': str(write_fd),
+                    'SERVER_DRAIN_SECONDS': str(self.manager.settings['drain_seconds']),
+                }, pass_fds=(listen_fd, write_fd))
+            finally:
+                os.close(write_fd)
+            readable, _, _ = select.select([read_fd], [], [], timeout)
+            # Fim do pipe sem "ready": o processo morreu antes de terminar o autoteste
+            return process, bool(readable) and os.read(read_fd, 16).startswith(b'ready')
+        finally:
+            os.close(read_fd)
+
+    def _wait_http_health(self, process, timeout):
+        deadline = time.monotonic() + timeout
+        url = f'http://127.0.0.1:{self.port}/api/health'
+        while time.monotonic() < deadline and process.poll() is None:
+            try:
+                if requests.get(url, timeout=2).status_code == 200:
+                    return True
+            except requests.RequestException:
+                pass
+            time.sleep(0.5)
+        return False
+
+    def start(self):
+        try:
+            process, ready = self.spawn_ready()
+        except OSError as e:
+            print(f"❌ Erro ao iniciar {self.name}: {e}")
+            self._schedule_restart(f'erro ao iniciar: {e}', None)
+            return False
+        # Mesmo sem ficar pronto ele é adotado: se morreu, o check() agenda o reinício
+        self._adopt(process)
+        if not ready and process.poll() is None:
+            print(f"⚠️  {self.name} não respondeu ao health check em {self.manager.settings['ready_timeout']}s")
+        return ready
+
+    def reload(self):
+        """Sobe um processo novo, espera ficar saudável e só então aposenta o atual"""
+        if self.listen_socket is None or not self.running():
+            return super().reload()
+
+        old = self.process
+        print(f"🔄 Recarregando {self.name}: iniciando novo processo ao lado do pid {old.pid}...")
+        try:
+            new, ready = self.spawn_ready()
+        except OSError as e:
+            print(f"❌ Erro ao iniciar o novo processo: {e}; mantendo o atual")
+            return False
+        if not ready:
+            stop_process(new, 5)
+            print(f"❌ Novo processo não ficou saudável; mantendo o atual (pid {old.pid})")
+            return False
+
+        self._adopt(new)
+        self.reloads += 1
+        self.failures = 0
+        print(f"✅ {self.name} recarregado (pid {new.pid}); pid {old.pid} terminando as requisições em andamento")
+        drain_timeout = self.manager.settings['drain_seconds'] + 5
+        threading.Thread(target=stop_process, args=(old, drain_timeout), name=f'{self.name}-retire', daemon=True).start()
+        return True
+
+    def stop(self, timeout=None):
+        super().stop(timeout or self.manager.settings['drain_seconds'] + 5)
+
+    def close(self):
+        if self.listen_socket is not None:
+            self.listen_socket.close()
+            self.listen_socket = None
+
+
 class ServerManager:
     def __init__(self):
         self.config = self.load_config()
+        self.project_root = Path(__file__).parent.absolute()
+        self.settings = {**SUPERVISOR_DEFAULTS, **self.config.get('supervisor', {})}
+        self.log_dir = self.project_root / self.settings['log_dir']
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.status_path = self.log_dir / STATUS_FILE
         self.flask_process = None
         self.ngrok_process = None
-        self.project_root = Path(__file__).parent.absolute()
+        self.worker_process = None
+        self.ngrok_url = None
+        self.started_at = time.time()
+        self.supervising = False
+        self.stop_event = threading.Event()
+        self.reload_event = threading.Event()
         
     def load_config(self):
         """Carrega configurações do arquivo JSON"""
@@ -102,46 +382,76 @@ class ServerManager:
             print("⚠️  Timeout ao configurar token do ngrok")
             return False
     
+    def process_logger(self, name):
+        """Log rotativo logs/<nome>.log com a saída do processo filho"""
+        logger = logging.getLogger(f'supervisor.{name}')
+        if not logger.handlers:
+            handler = RotatingFileHandler(
+                self.log_dir / f'{name}.log',
+                maxBytes=self.settings['log_max_bytes'],
+                backupCount=self.settings['log_backup_count'],
+                encoding='utf-8'
+            )
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            logger.addHandler(handler)
+            if self.settings['echo_output']:
+                console = logging.StreamHandler(sys.stdout)
+                console.setFormatter(logging.Formatter(f'[{name}] %(message)s'))
+                logger.addHandler(console)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+        return logger
+    
+    def flask_env(self):
+        """Ambiente do backend; "flask.env" do config.json vale a partir do próximo reload"""
+        flask_config = self.config.get('flask', {})
+        env = os.environ.copy()
+        env['PYTHONPATH'] = str(self.project_root / FLASK_DIR)
+        # O túnel do ngrok é o único proxy na frente do Flask: o IP do cliente é a
+        # última entrada do X-Forwarded-For (ver RATE_LIMIT_PROXY_HOPS no main.py)
+        env.setdefault('RATE_LIMIT_PROXY_HOPS', '1')
+        if flask_config.get('debug', True):
+            env['FLASK_ENV'] = 'development'
+            env['FLASK_DEBUG'] = '1'
+        env.update({key: str(value) for key, value in flask_config.get('env', {}).items()})
+        return env
+    
     def start_flask(self):
         """Inicia o servidor Flask"""
         print("🚀 Iniciando servidor Flask...")
         
         flask_dir = self.project_root / FLASK_DIR
         flask_main = flask_dir / "src" / "main.py"
+        flask_config = self.config.get('flask', {})
         
-        # Configurar ambiente
-        env = os.environ.copy()
-        env['PYTHONPATH'] = str(flask_dir)
-        env['FLASK_ENV'] = 'development'
-        env['FLASK_DEBUG'] = '1'
-        
-        # Iniciar Flask
         try:
-            self.flask_process = subprocess.Popen(
-                [sys.executable, str(flask_main)],
-                cwd=str(flask_dir),
-                env=env,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                universal_newlines=True,
-                bufsize=1
+            self.flask_process = FlaskProcess(
+                self, 'flask', [sys.executable, str(flask_main)], str(flask_dir), self.flask_env,
+                host=flask_config.get('host', '0.0.0.0'), port=int(flask_config.get('port', 5000))
             )
-            
-            # Aguardar Flask inicializar
-            print("⏳ Aguardando Flask inicializar...")
-            time.sleep(5)
-            
-            # Verificar se Flask está rodando
-            if self.flask_process.poll() is None:
-                print("✅ Flask iniciado com sucesso!")
-                return True
-            else:
-                print("❌ Erro ao iniciar Flask!")
-                return False
-                
-        except Exception as e:
-            print(f"❌ Erro ao iniciar Flask: {e}")
+        except OSError as e:
+            print(f"❌ Erro ao abrir a porta do Flask: {e}")
             return False
+        
+        print("⏳ Aguardando Flask inicializar...")
+        if self.flask_process.start():
+            print(f"✅ Flask iniciado com sucesso! (pid {self.flask_process.process.pid}, log em {self.log_dir / 'flask.log'})")
+            return True
+        print(f"❌ Erro ao iniciar Flask! Veja {self.log_dir / 'flask.log'}")
+        return False
+    
+    def start_worker(self):
+        """Inicia o processo de jobs em segundo plano (arquivamento, atualização de status...)"""
+        print("⚙️  Iniciando worker de jobs...")
+        
+        flask_dir = self.project_root / FLASK_DIR
+        worker_main = flask_dir / "src" / "worker.py"
+        
+        # Jobs interrompidos por uma queda ou reload voltam para a fila sozinhos
+        self.worker_process = SupervisedProcess(
+            self, 'worker', [sys.executable, str(worker_main)], cwd=str(flask_dir), env=self.flask_env
+        )
+        return self.worker_process.start()
     
     def start_ngrok(self):
         """Inicia o ngrok"""
@@ -150,31 +460,38 @@ class ServerManager:
         port = self.config.get('flask', {}).get('port', 5000)
         region = self.config.get('ngrok', {}).get('region', 'us')
         
-        try:
-            # Iniciar ngrok
-            self.ngrok_process = subprocess.Popen(
-                ['ngrok', 'http', str(port), '--region', region],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True
-            )
-            
-            # Aguardar ngrok inicializar
-            print("⏳ Aguardando ngrok inicializar...")
-            time.sleep(8)
-            
-            # Obter URL do ngrok
+        # Reiniciado depois de uma queda, o ngrok pode ganhar outra URL pública
+        self.ngrok_process = SupervisedProcess(
+            self, 'ngrok', ['ngrok', 'http', str(port), '--region', region, '--log', 'stdout'],
+            on_restart=self.refresh_ngrok_url
+        )
+        if not self.ngrok_process.start():
+            return None
+        
+        print("⏳ Aguardando ngrok inicializar...")
+        ngrok_url = self.wait_ngrok_url()
+        if ngrok_url:
+            print(f"✅ ngrok iniciado: {ngrok_url}")
+            self.ngrok_url = ngrok_url
+            return ngrok_url
+        print("❌ Erro ao obter URL do ngrok!")
+        return None
+    
+    def wait_ngrok_url(self, timeout=20):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and self.ngrok_process.running():
+            time.sleep(2)
             ngrok_url = self.get_ngrok_url()
             if ngrok_url:
-                print(f"✅ ngrok iniciado: {ngrok_url}")
                 return ngrok_url
-            else:
-                print("❌ Erro ao obter URL do ngrok!")
-                return None
-                
-        except Exception as e:
-            print(f"❌ Erro ao iniciar ngrok: {e}")
-            return None
+        return None
+    
+    def refresh_ngrok_url(self):
+        ngrok_url = self.wait_ngrok_url()
+        if ngrok_url and ngrok_url != self.ngrok_url:
+            print(f"🌐 Nova URL do ngrok: {ngrok_url}")
+            self.ngrok_url = ngrok_url
+            self.update_frontend_api(ngrok_url)
     
     def get_ngrok_url(self):
         """Obtém a URL pública do ngrok"""
@@ -235,56 +552,82 @@ class ServerManager:
             print(f"❌ Erro ao atualizar arquivo da API: {e}")
             return False
     
+    def children(self):
+        return [child for child in (self.flask_process, self.worker_process, self.ngrok_process) if child]
+    
+    def reload(self):
+        """Recarrega o config.json, o backend (sem derrubar requisições) e o worker"""
+        print("🔄 Recarregando...")
+        try:
+            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+                self.config = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"⚠️  Mantendo a configuração anterior: {e}")
+        
+        if self.flask_process:
+            self.flask_process.reload()
+        if self.worker_process:
+            self.worker_process.reload()
+    
+    def write_status(self):
+        """Estado do supervisor em logs/supervisor.json (lido por "start_server.py status")"""
+        status = {
+            'pid': os.getpid(),
+            'startedAt': datetime.fromtimestamp(self.started_at).isoformat(timespec='seconds'),
+            'uptimeSeconds': round(time.time() - self.started_at, 1),
+            'updatedAt': datetime.now().isoformat(timespec='seconds'),
+            'supervising': self.supervising,
+            'ngrokUrl': self.ngrok_url,
+            'processes': {child.name: child.status() for child in self.children()},
+        }
+        temp_path = self.status_path.with_suffix('.tmp')
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(status, f, indent=2, ensure_ascii=False)
+            os.replace(temp_path, self.status_path)
+        except OSError as e:
+            print(f"⚠️  Erro ao gravar {self.status_path}: {e}")
+    
     def monitor_processes(self):
-        """Monitora os processos Flask e ngrok"""
+        """Supervisiona os processos: reinicia quem caiu, atende o reload e grava o status"""
         print("👁️  Monitorando processos...")
+        self.supervising = True
         
-        while True:
-            try:
-                # Verificar Flask
-                if self.flask_process and self.flask_process.poll() is not None:
-                    print("❌ Flask parou de funcionar!")
-                    break
-                
-                # Verificar ngrok
-                if self.ngrok_process and self.ngrok_process.poll() is not None:
-                    print("❌ ngrok parou de funcionar!")
-                    break
-                
-                # Aguardar antes da próxima verificação
-                time.sleep(10)
-                
-            except KeyboardInterrupt:
-                print("\n🛑 Interrompido pelo usuário")
-                break
+        while not self.stop_event.is_set():
+            if self.reload_event.is_set():
+                self.reload_event.clear()
+                self.reload()
+            
+            for child in self.children():
+                if not self.stop_event.is_set():
+                    child.check()
+            
+            self.write_status()
+            self.stop_event.wait(1)
+        
+        print("\n🛑 Interrompido pelo usuário")
+        self.supervising = False
     
     def cleanup(self):
         """Limpa os processos"""
         print("🧹 Finalizando processos...")
         
+        if self.worker_process:
+            # O worker termina os jobs em execução antes de sair
+            self.worker_process.stop(timeout=30)
+            print("✅ Worker de jobs finalizado")
+        
         if self.flask_process:
-            try:
-                self.flask_process.terminate()
-                self.flask_process.wait(timeout=5)
-                print("✅ Flask finalizado")
-            except:
-                try:
-                    self.flask_process.kill()
-                    print("⚠️  Flask forçadamente finalizado")
-                except:
-                    pass
+            # SIGTERM: o Flask para de aceitar conexões e conclui as requisições em andamento
+            self.flask_process.stop()
+            self.flask_process.close()
+            print("✅ Flask finalizado")
         
         if self.ngrok_process:
-            try:
-                self.ngrok_process.terminate()
-                self.ngrok_process.wait(timeout=5)
-                print("✅ ngrok finalizado")
-            except:
-                try:
-                    self.ngrok_process.kill()
-                    print("⚠️  ngrok forçadamente finalizado")
-                except:
-                    pass
+            self.ngrok_process.stop(timeout=5)
+            print("✅ ngrok finalizado")
+        
+        self.write_status()
     
     def run(self):
         """Executa o servidor completo"""
@@ -304,6 +647,10 @@ class ServerManager:
             if not self.start_flask():
                 return False
             
+            # Iniciar worker de jobs
+            if not self.start_worker():
+                print("⚠️  Continuando sem worker de jobs...")
+            
             # Iniciar ngrok
             ngrok_url = self.start_ngrok()
             if not ngrok_url:
@@ -317,10 +664,13 @@ class ServerManager:
             print("🎉 SISTEMA INICIADO COM SUCESSO!")
             print(f"🌐 URL Pública: {ngrok_url}")
             print(f"🏠 URL Local: http://localhost:{self.config.get('flask', {}).get('port', 5000)}")
+            print(f"📄 Logs: {self.log_dir}")
             print("=" * 50)
             print("💡 Dicas:")
             print("- Use a URL pública para acessar de outros dispositivos")
             print("- O frontend no Vercel deve usar a URL pública")
+            print("- python start_server.py status mostra reinícios e tempo no ar")
+            print("- python start_server.py reload recarrega o backend sem derrubar requisições")
             print("- Pressione Ctrl+C para parar o servidor")
             print("=" * 50)
             
@@ -336,18 +686,90 @@ class ServerManager:
         
         return True
 
+def read_status():
+    """Conteúdo de logs/supervisor.json (ou None se o supervisor nunca rodou)"""
+    try:
+        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+            log_dir = json.load(f).get('supervisor', {}).get('log_dir', SUPERVISOR_DEFAULTS['log_dir'])
+    except (OSError, json.JSONDecodeError):
+        log_dir = SUPERVISOR_DEFAULTS['log_dir']
+    try:
+        with open(Path(__file__).parent.absolute() / log_dir / STATUS_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+def supervisor_alive(status):
+    if not status or not status.get('supervising'):
+        return False
+    try:
+        os.kill(status['pid'], 0)
+        return True
+    except OSError:
+        return False
+
+def show_status():
+    """python start_server.py status"""
+    status = read_status()
+    if not supervisor_alive(status):
+        print("⚪ Supervisor não está rodando")
+        if not status:
+            return
+    else:
+        print(f"🟢 Supervisor pid {status['pid']}, no ar há {status['uptimeSeconds']:.0f}s (atualizado em {status['updatedAt']})")
+    if status.get('ngrokUrl'):
+        print(f"🌐 {status['ngrokUrl']}")
+    for name, process in status['processes'].items():
+        state = f"pid {process['pid']}, no ar há {process['uptimeSeconds']:.0f}s" if process['running'] else "parado"
+        if process.get('restartInSeconds') is not None:
+            state += f", reinício em {process['restartInSeconds']:.0f}s"
+        print(f"  {name:7} {state} | reinícios: {process['restarts']} | reloads: {process['reloads']}")
+        if process.get('lastExit'):
+            last = process['lastExit']
+            print(f"          última saída: código {last['code']} em {last['at']} após {last['uptimeSeconds']:.0f}s")
+
+def request_reload():
+    """python start_server.py reload: SIGHUP para o supervisor em execução"""
+    if not hasattr(signal, 'SIGHUP'):
+        print("❌ Reload não suportado neste sistema; reinicie o servidor")
+        sys.exit(1)
+    status = read_status()
+    if not supervisor_alive(status):
+        print("❌ Supervisor não está rodando")
+        sys.exit(1)
+    os.kill(status['pid'], signal.SIGHUP)
+    print(f"🔄 Reload solicitado ao supervisor (pid {status['pid']}); acompanhe com: python start_server.py status")
+
 def main():
     """Função principal"""
-    # Configurar handler para sinais
+    command = sys.argv[1] if len(sys.argv) > 1 else 'start'
+    if command == 'status':
+        return show_status()
+    if command == 'reload':
+        return request_reload()
+    if command != 'start':
+        print("Uso: python start_server.py [start|status|reload]")
+        sys.exit(2)
+    
+    manager = ServerManager()
+    
+    # Configurar handler para sinais: durante a inicialização interrompe na hora;
+    # com os processos no ar, o laço de supervisão termina e finaliza os filhos
     def signal_handler(signum, frame):
         print("\n🛑 Recebido sinal de interrupção...")
-        sys.exit(0)
+        manager.stop_event.set()
+        if not manager.supervising:
+            raise KeyboardInterrupt
+    
+    def reload_handler(signum, frame):
+        manager.reload_event.set()
     
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, reload_handler)
     
     # Executar servidor
-    manager = ServerManager()
     success = manager.run()
     
     if success:
@@ -358,4 +780,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-